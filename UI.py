@@ -3,11 +3,15 @@ import pandas as pd
 from modules.planner.tpn_planner import *
 from modules.patients.adult_patient import *
 from modules.conditions.adult_conditions import *
+from modules.conditions.registry import ADULT_CONDITIONS, ConditionRegistry
+from modules import guidelines
 
 st.set_page_config(page_title="TPN Worksheet", layout="wide")
 
 # --- Custom CSS for styling ---
-st.markdown("""
+@st.cache_resource
+def load_css() -> str:
+    return """
     <style>
     /* Main container styling */
     .main-container {
@@ -224,62 +228,89 @@ st.markdown("""
         font-size: 0.9rem;
     }
     </style>
-""", unsafe_allow_html=True)
-
-# --- Reference data for nutrients ---
-NUTRIENT_REFERENCES = {
-    "Protein": {
-        "reference": "ASPEN Guidelines 2016",
-        "details": "Critical Care: 1.2-2.0 g/kg/day, Maintenance: 0.8-1.0 g/kg/day"
-    },
-    "Dextrose": {
-        "reference": "McClave SA et al. JPEN 2016",
-        "details": "Initial: 150-200 g/day, Max: 4-5 mg/kg/min (7 g/kg/day)"
-    },
-    "Lipids": {
-        "reference": "ESPEN Guidelines 2019",
-        "details": "20-30% total calories, Max: 1.0-1.5 g/kg/day"
-    },
-    "Sodium": {
-        "reference": "ASPEN Fluid/Electrolytes 2020",
-        "details": "1-2 mEq/kg/day, adjust for losses and serum levels"
-    },
-    "Potassium": {
-        "reference": "ASPEN Fluid/Electrolytes 2020",
-        "details": "1-2 mEq/kg/day, adjust for renal function and serum levels"
-    },
-    "Calcium": {
-        "reference": "ASPEN Micronutrients 2015",
-        "details": "10-15 mEq/day, monitor with phosphate"
-    },
-    "Magnesium": {
-        "reference": "ASPEN Micronutrients 2015",
-        "details": "8-20 mEq/day, adjust for serum levels"
-    },
-    "Phosphate": {
-        "reference": "ASPEN Micronutrients 2015",
-        "details": "20-40 mmol/day, monitor refeeding syndrome risk"
-    },
-    "MVIs": {
-        "reference": "FDA MVI Guidelines 2000",
-        "details": "1 vial daily for adults, provide essential vitamins"
-    },
-    "Trace Elements": {
-        "reference": "ASPEN Trace Elements 2012",
-        "details": "Zinc, copper, manganese, chromium, selenium daily"
+"""
+
+
+st.markdown(load_css(), unsafe_allow_html=True)
+
+# --- Reference data (static, built once per server process) ---
+@st.cache_resource
+def load_references():
+    nutrient_references = {
+        "Protein": {
+            "reference": "ASPEN Guidelines 2016",
+            "details": "Critical Care: 1.2-2.0 g/kg/day, Maintenance: 0.8-1.0 g/kg/day"
+        },
+        "Dextrose": {
+            "reference": "McClave SA et al. JPEN 2016",
+            "details": "Initial: 150-200 g/day, Max: 4-5 mg/kg/min (7 g/kg/day)"
+        },
+        "Lipids": {
+            "reference": "ESPEN Guidelines 2019",
+            "details": "20-30% total calories, Max: 1.0-1.5 g/kg/day"
+        },
+        "Sodium": {
+            "reference": "ASPEN Fluid/Electrolytes 2020",
+            "details": "1-2 mEq/kg/day, adjust for losses and serum levels"
+        },
+        "Potassium": {
+            "reference": "ASPEN Fluid/Electrolytes 2020",
+            "details": "1-2 mEq/kg/day, adjust for renal function and serum levels"
+        },
+        "Calcium": {
+            "reference": "ASPEN Micronutrients 2015",
+            "details": "10-15 mEq/day, monitor with phosphate"
+        },
+        "Magnesium": {
+            "reference": "ASPEN Micronutrients 2015",
+            "details": "8-20 mEq/day, adjust for serum levels"
+        },
+        "Phosphate": {
+            "reference": "ASPEN Micronutrients 2015",
+            "details": "20-40 mmol/day, monitor refeeding syndrome risk"
+        },
+        "MVIs": {
+            "reference": "FDA MVI Guidelines 2000",
+            "details": "1 vial daily for adults, provide essential vitamins"
+        },
+        "Trace Elements": {
+            "reference": "ASPEN Trace Elements 2012",
+            "details": "Zinc, copper, manganese, chromium, selenium daily"
+        }
     }
-}
 
-# --- Reference papers list ---
-REFERENCES = [
-    "American Society for Parenteral and Enteral Nutrition. (2016). Guidelines for the Provision and Assessment of Nutrition Support Therapy in the Adult Critically Ill Patient. Journal of Parenteral and Enteral Nutrition, 40(2), 159-211.",
-    "McClave, S. A., Taylor, B. E., Martindale, R. G., et al. (2016). Guidelines for the Provision and Assessment of Nutrition Support Therapy in the Adult Critically Ill Patient. JPEN, 40(2), 159-211.",
-    "Singer, P., Blaser, A. R., Berger, M. M., et al. (2019). ESPEN guideline on clinical nutrition in the intensive care unit. Clinical Nutrition, 38(1), 48-79.",
-    "Boullata, J. I., Gilbert, K., Sacks, G., et al. (2014). A.S.P.E.N. clinical guidelines: parenteral nutrition ordering, order review, compounding, labeling, and dispensing. JPEN, 38(3), 334-377.",
-    "Vanek, V. W., Borum, P., Buchman, A., et al. (2012). A.S.P.E.N. position paper: recommendations for changes in commercially available parenteral multivitamin and multi-trace element products. Nutrition in Clinical Practice, 27(4), 440-491.",
-    "Driscoll, D. F. (2015). Compounding TPN admixtures: then and now. JPEN, 39(1 Suppl), 25S-31S.",
-    "Mirtallo, J., Canada, T., Johnson, D., et al. (2004). Safe practices for parenteral nutrition. JPEN, 28(6), S39-S70."
-]
+    # --- Reference papers list ---
+    references = [
+        "American Society for Parenteral and Enteral Nutrition. (2016). Guidelines for the Provision and Assessment of Nutrition Support Therapy in the Adult Critically Ill Patient. Journal of Parenteral and Enteral Nutrition, 40(2), 159-211.",
+        "McClave, S. A., Taylor, B. E., Martindale, R. G., et al. (2016). Guidelines for the Provision and Assessment of Nutrition Support Therapy in the Adult Critically Ill Patient. JPEN, 40(2), 159-211.",
+        "Singer, P., Blaser, A. R., Berger, M. M., et al. (2019). ESPEN guideline on clinical nutrition in the intensive care unit. Clinical Nutrition, 38(1), 48-79.",
+        "Boullata, J. I., Gilbert, K., Sacks, G., et al. (2014). A.S.P.E.N. clinical guidelines: parenteral nutrition ordering, order review, compounding, labeling, and dispensing. JPEN, 38(3), 334-377.",
+        "Vanek, V. W., Borum, P., Buchman, A., et al. (2012). A.S.P.E.N. position paper: recommendations for changes in commercially available parenteral multivitamin and multi-trace element products. Nutrition in Clinical Practice, 27(4), 440-491.",
+        "Driscoll, D. F. (2015). Compounding TPN admixtures: then and now. JPEN, 39(1 Suppl), 25S-31S.",
+        "Mirtallo, J., Canada, T., Johnson, D., et al. (2004). Safe practices for parenteral nutrition. JPEN, 28(6), S39-S70."
+    ]
+    return nutrient_references, references
+
+
+@st.cache_resource
+def references_html() -> str:
+    items = "".join(
+        f"""
+    <div class="reference-item">
+        <strong>[{i}]</strong> {ref}
+    </div>
+    """
+        for i, ref in enumerate(load_references()[1], 1)
+    )
+    return f"""
+<div class="references-section">
+    <h3>References</h3>
+{items}
+</div>
+"""
+
+
+NUTRIENT_REFERENCES, REFERENCES = load_references()
 
 # --- Main Worksheet Layout ---
 st.markdown('<div class="worksheet-header">Total Parenteral Nutrition Worksheet</div>', unsafe_allow_html=True)
@@ -304,8 +335,9 @@ with col6:
     route = st.selectbox("Route of Administration", ["Central", "Peripheral"])
 with col7:
     st.write("Fluid Restriction:")
-    fluid_no = st.checkbox("No", key="fluid_no")
-    fluid_yes = st.checkbox("Yes", key="fluid_yes")
+    # Recorded on the worksheet only: no condition maps fluid restriction, so the plan ignores it
+    fluid_no = st.checkbox("No", key="fluid_no", help="Not used by the planner")
+    fluid_yes = st.checkbox("Yes", key="fluid_yes", help="Not used by the planner")
 with col8:
     if fluid_yes:
         fluid_ml = st.number_input("mL/24 hours", min_value=0, value=2000)
@@ -331,7 +363,8 @@ with col_left:
     height = st.number_input("Ht (in)", min_value=0.0, value=67.0, key="height")
     weight = st.number_input("Wt (kg)", min_value=0.0, value=70.0, key="weight")
     gender = st.selectbox("Gender", ["Male", "Female"], key="gender")
-    ventilator = st.checkbox("Ventilator", key="ventilator")
+    # Recorded on the worksheet only: no condition maps ventilation, so the plan ignores it
+    ventilator = st.checkbox("Ventilator", key="ventilator", help="Not used by the planner")
     minute_ventilation = st.number_input("Minute ventilation (L/min)", min_value=0.0, value=0.0, key="minute_vent")
     temp_max = st.number_input("T max (F°) last 24 hours", min_value=90.0, max_value=110.0, value=98.6, key="temp_max")
 
@@ -363,6 +396,19 @@ with col_right:
     heart_failure = st.checkbox("Heart Failure", key="heart_failure")
     st.markdown('</div>', unsafe_allow_html=True)
 
+@st.cache_resource
+def condition_registry() -> ConditionRegistry:
+    """Checkbox key -> condition class registry, with single conditions and pairs pre-resolved.
+
+    Only the condition boxes are mapped; Ventilator and the Fluid Restriction boxes
+    (fluid_no/fluid_yes) have no condition and do not change the plan.
+    """
+    return ConditionRegistry(ADULT_CONDITIONS)
+
+
+CONDITIONS = condition_registry()
+condition_mask = CONDITIONS.mask(key for key in CONDITIONS.keys if st.session_state[key])
+
 # --- Instructions Box ---
 st.markdown("""
 <div class="instructions-box">
@@ -378,104 +424,159 @@ st.markdown("""
     <strong>Note: You can only enter numbers into the yellow boxes.</strong>
 </div>
 """, unsafe_allow_html=True)
+# --- Results table rendering ---
+CATEGORY_LABELS = {
+    "macro": "Macronutrients",
+    "electrolyte": "Electrolytes",
+    "vitamins": "Vitamins",
+    "trace_elements": "Trace Elements",
+}
+
+# Planner nutrient key -> NUTRIENT_REFERENCES entry (vitamins/trace elements fall back to their category)
+REFERENCE_KEYS = {
+    "protein_amino_acids": "Protein",
+    "dextrose": "Dextrose",
+    "lipid_emulsion": "Lipids",
+    "sodium": "Sodium",
+    "potassium": "Potassium",
+    "calcium": "Calcium",
+    "magnesium": "Magnesium",
+    "phosphorus": "Phosphate",
+}
+CATEGORY_REFERENCE_KEYS = {"vitamins": "MVIs", "trace_elements": "Trace Elements"}
+DEFAULT_REFERENCE = {"reference": "Clinical Practice Guidelines", "details": "Standard clinical practice"}
+
+CATEGORY_CELL_TEMPLATE = '<td class="category-cell" rowspan="{rowspan}">{label}</td>'
+ROW_TEMPLATE = """
+<tr>{category_cell}
+    <td style='text-align: left;'>
+        <span class="nutrient-with-tooltip">
+            {label} ({unit})
+            <span class="nutrient-tooltip">
+                <strong>Reference:</strong> {reference}<br>
+                <strong>Details:</strong> {details}
+            </span>
+        </span>
+    </td>{cells}
+</tr>"""
+
+
+def rendered_rows() -> dict:
+    """This session's rendered <tr> HTML by row content, so unchanged rows skip formatting on reruns.
+
+    Kept per browser session, not shared between sessions. The table itself is still
+    assembled and sent whole on every rerun.
+    """
+    return st.session_state.setdefault("rendered_rows", {})
+
+
+def format_value(value) -> str:
+    return "–" if pd.isna(value) else f"{value:g}"
+
+
+def render_row(category: str, rowspan: int, nutrient: str, unit: str, cells: tuple) -> str:
+    key = (category, rowspan, nutrient, unit, cells)
+    cache = rendered_rows()
+    html = cache.get(key)
+    if html is None:
+        ref_data = NUTRIENT_REFERENCES.get(
+            REFERENCE_KEYS.get(nutrient) or CATEGORY_REFERENCE_KEYS.get(category, ""), DEFAULT_REFERENCE)
+        html = ROW_TEMPLATE.format(
+            category_cell=CATEGORY_CELL_TEMPLATE.format(rowspan=rowspan, label=CATEGORY_LABELS.get(category, category)) if rowspan else "",
+            label=nutrient.replace("_", " ").capitalize(),
+            unit=unit,
+            reference=ref_data["reference"],
+            details=ref_data["details"],
+            cells="".join(f"<td>{cell}</td>" for cell in cells),
+        )
+        if len(cache) > 2_000:
+            cache.clear()
+        cache[key] = html
+    return html
+
+
+def render_results_table(df: pd.DataFrame, units: dict) -> str:
+    """HTML table of a pivoted plan, reusing this session's rendered HTML of rows that did not change."""
+    header = "".join(f"<th>Day {day}</th>" for day in df.columns)
+    categories = df.index.get_level_values("Category")
+    rowspans = categories.value_counts()
+    rows = []
+    previous = None
+    for (category, nutrient), values in zip(df.index, df.to_numpy()):
+        rowspan = int(rowspans[category]) if category != previous else 0
+        previous = category
+        rows.append(render_row(category, rowspan, nutrient, units[(category, nutrient)],
+                               tuple(format_value(v) for v in values)))
+    return f"""
+<table class="results-table">
+    <tr><th>Category</th><th>Nutrient</th>{header}</tr>
+    {"".join(rows)}
+</table>"""
+
+
+# --- Planning (cached on the inputs that change the plan) ---
+@st.cache_data(show_spinner=False, max_entries=256)
+def compute_plan(age: int, height_cm: float, weight: float, is_male: bool,
+                 condition_mask: int, guideline_version: int, total_days: int = 7):
+    """Build the patient and its daily plan; reruns with the same inputs return from cache.
+
+    condition_mask is a CONDITIONS bitmask of the checked condition boxes. guideline_version
+    (guidelines.version()) is only part of the cache key, so edited guidelines are not served
+    from plans cached before the edit.
+    """
+    patient = AdultPatient(
+        name="worksheet",
+        age=age,
+        height=height_cm,
+        weight=weight,
+        gender=is_male,
+        conditions=CONDITIONS.conditions(condition_mask)
+    )
+    # Patches come from the registry's per-mask cache instead of being resolved per plan
+    planner = TpnPlanner(patient, total_days=total_days, patches=CONDITIONS.patches(condition_mask))
+    df = planner.generate_daily_plan()
+    packed = planner.prepare()
+    units = {
+        (category, nutrient): f"{unit}/{per}"
+        for category, nutrient, unit, per in zip(packed.categories, packed.nutrients, packed.units, packed.per)
+    }
+    return df, units, planner.formatted_notes()
+
+
 # --- Generate Plan Button ---
+# Results are shown for the inputs they were calculated from. Changing an input that feeds the
+# plan clears them until the button is pressed again; other widgets leave them on screen.
+plan_inputs = (age, height, weight, gender, condition_mask)
 if st.button("Calculate TPN Formulation", type="primary"):
+    st.session_state.calculated = plan_inputs
+elif st.session_state.get("calculated") not in (None, plan_inputs):
+    st.session_state.calculated = None
+    st.info("Inputs changed. Press Calculate TPN Formulation to update the results.")
+
+# Reruns with the calculated inputs are served from compute_plan's cache
+if st.session_state.get("calculated") == plan_inputs:
     with st.spinner("Calculating TPN formulation..."):
-        # Create patient object
-        patient = AdultPatient(
-            name=patient_name or "Unknown",
-            age=age,
-            height=height * 2.54,  # Convert inches to cm
-            weight=weight,
-            gender=(gender == "Male"),
-            conditions={}
+        df, units, plan_notes = compute_plan(
+            age,
+            height * 2.54,  # Convert inches to cm
+            weight,
+            gender == "Male",
+            condition_mask,
+            guidelines.version(),
         )
 
-        # Run planner
-        planner = TpnPlanner(patient, total_days=7)
-        df = planner.generate_daily_plan()
-
         st.success("TPN formulation calculated successfully!")
 
         # Display results in a table format
         st.markdown('<div class="section-header">TPN FORMULATION RESULTS</div>', unsafe_allow_html=True)
-
-        # Sample data - in a real app, this would come from the planner
-        sample_data = {
-            "Macronutrients": {
-                "Protein": [70, 70, 70, 70, 70, 70, 70],
-                "Dextrose": [150, 200, 250, 250, 250, 250, 250],
-                "Lipids": [25, 40, 50, 50, 50, 50, 50]
-            },
-            "Electrolytes": {
-                "Sodium": [80, 80, 80, 80, 80, 80, 80],
-                "Potassium": [40, 40, 40, 40, 40, 40, 40],
-                "Calcium": [10, 10, 10, 10, 10, 10, 10],
-                "Magnesium": [8, 8, 8, 8, 8, 8, 8],
-                "Phosphate": [15, 15, 15, 15, 15, 15, 15]
-            },
-            "Vitamins & Trace Elements": {
-                "MVIs": [1, 1, 1, 1, 1, 1, 1],
-                "Trace Elements": [1, 1, 1, 1, 1, 1, 1]
-            },
-            "Summary": {
-                "Total Calories": [1200, 1500, 1600, 1600, 1600, 1600, 1600],
-                "Total Volume": [1500, 1800, 2000, 2000, 2000, 2000, 2000],
-                "Protein % of Calories": [23.3, 18.7, 17.5, 17.5, 17.5, 17.5, 17.5]
-            }
-        }
-
-        # Create HTML table for results with hover tooltips
-        html_table = """
-        <table class="results-table">
-            <tr>
-                <th>Category</th>
-                <th>Nutrient</th>
-                <th>Day 1</th>
-                <th>Day 2</th>
-                <th>Day 3</th>
-                <th>Day 4</th>
-                <th>Day 5</th>
-                <th>Day 6</th>
-                <th>Day 7</th>
-            </tr>
-        """
-
-        for category, nutrients in sample_data.items():
-            first_row = True
-            for nutrient, values in nutrients.items():
-                html_table += "<tr>"
-                if first_row:
-                    html_table += f'<td class="category-cell" rowspan="{len(nutrients)}">{category}</td>'
-                    first_row = False
-
-                # Add nutrient with hover tooltip
-                ref_data = NUTRIENT_REFERENCES.get(nutrient, {"reference": "Clinical Practice Guidelines",
-                                                              "details": "Standard clinical practice"})
-                html_table += f"""
-                <td style='text-align: left;'>
-                    <span class="nutrient-with-tooltip">
-                        {nutrient} ({'g' if nutrient in ['Protein', 'Dextrose', 'Lipids'] else 'mEq' if nutrient in ['Sodium', 'Potassium', 'Calcium', 'Magnesium'] else 'mmol' if nutrient == 'Phosphate' else 'vial' if nutrient in ['MVIs', 'Trace Elements'] else 'kcal' if 'Calories' in nutrient else 'mL' if 'Volume' in nutrient else '%'})
-                        <span class="nutrient-tooltip">
-                            <strong>Reference:</strong> {ref_data['reference']}<br>
-                            <strong>Details:</strong> {ref_data['details']}
-                        </span>
-                    </span>
-                </td>
-                """
-
-                for val in values:
-                    html_table += f"<td>{val}</td>"
-                html_table += "</tr>"
-
-        html_table += "</table>"
-
-        st.markdown(html_table, unsafe_allow_html=True)
+        st.markdown(render_results_table(df, units), unsafe_allow_html=True)
 
         # Add clinical notes
-        st.markdown("""
+        planner_notes = "".join(f"- {note}<br>" for note in plan_notes)
+        st.markdown(f"""
         <div class="note-box">
             <strong>Clinical Notes:</strong><br>
+            {planner_notes}
             - TPN formulation meets estimated energy requirements<br>
             - Protein provision appropriate for patient's clinical status<br>
             - Electrolytes within normal ranges for TPN<br>
@@ -485,16 +586,4 @@ if st.button("Calculate TPN Formulation", type="primary"):
         """, unsafe_allow_html=True)
 
 # --- References Section ---
-st.markdown("""
-<div class="references-section">
-    <h3>References</h3>
-""", unsafe_allow_html=True)
-
-for i, ref in enumerate(REFERENCES, 1):
-    st.markdown(f"""
-    <div class="reference-item">
-        <strong>[{i}]</strong> {ref}
-    </div>
-    """, unsafe_allow_html=True)
-
-st.markdown("</div>", unsafe_allow_html=True)
+st.markdown(references_html(), unsafe_allow_html=True)
@@ -0,0 +1,67 @@
+"""Per-patient TpnPlanner loop vs BatchPlanner on a synthetic adult census.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch --patients 10000
+    python -m benchmarks.bench_batch --patients 50000 --workers 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import time
+from modules.patients.adult_patient import AdultPatient
+from modules.planner.batch_planner import BatchPlanner
+from modules.planner.tpn_planner import TpnPlanner
+
+
+def make_patients(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        AdultPatient(
+            name=f"patient_{i}",
+            age=rng.randint(18, 90),
+            height=rng.uniform(150, 195),
+            weight=rng.uniform(45, 130),
+            gender=rng.random() < 0.5,
+        )
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--loop-sample", type=int, default=1_000,
+                        help="patients timed in the per-patient loop, extrapolated to --patients")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="process pool size for the parallel run")
+    args = parser.parse_args()
+
+    patients = make_patients(args.patients)
+    sample = patients[:min(args.loop_sample, args.patients)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for patient in sample:
+            TpnPlanner(patient, args.days).generate_daily_plan()
+        loop_time = (time.perf_counter() - start) * len(patients) / len(sample)
+
+    start = time.perf_counter()
+    BatchPlanner(args.days).plan(patients)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    BatchPlanner(args.days).plan(patients, workers=args.workers)
+    parallel_time = time.perf_counter() - start
+
+    print(f"patients:          {len(patients)}")
+    print(f"per-patient loop:  {loop_time:.3f} s (extrapolated from {len(sample)})")
+    print(f"BatchPlanner:      {batch_time:.3f} s")
+    print(f"speedup:           {loop_time / batch_time:.1f}x")
+    print(f"BatchPlanner x{args.workers}:   {parallel_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Reproducible benchmark suite for the planner, patient models and condition handling.
+
+Run from the repository root and compare the JSON files across commits:
+    python -m benchmarks.suite --output bench_results.json
+    python -m benchmarks.suite --sizes 1000 10000 --repeat 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from modules.conditions import adult_conditions
+from modules.conditions.children_conditions import ChildrenCriticalIllness
+from modules.patients.adult_patient import AdultPatient
+from modules.patients.child_patient import ChildPatient
+from modules.patients.preterm_infant_patient import PretermInfantPatient
+from modules.patients.term_infant_patient import TermInfantPatient
+from modules.planner.batch_planner import BatchPlanner
+from modules.planner.tpn_planner import TpnPlanner
+
+ADULT_CONDITIONS = [
+    adult_conditions.TraumaticBrainInjury, adult_conditions.Burns, adult_conditions.Sepsis,
+    adult_conditions.OpenAbdomen, adult_conditions.Obese, adult_conditions.AcuteKidneyInjury,
+    adult_conditions.AcuteKidneyInjury_NoRRT, adult_conditions.AcuteKidneyInjury_IntermittentRRT,
+    adult_conditions.AcuteKidneyInjury_CRRT, adult_conditions.ChronicKidneyFailure,
+    adult_conditions.ChronicKidneyFailure_MaintenanceHD, adult_conditions.AcuteLiverFailure,
+    adult_conditions.HeartFailure,
+]
+
+
+def make_patient(kind: str, i: int, rng: random.Random, conditions: int = 0):
+    name = f"{kind}_{i}"
+    if kind == "adult":
+        active = rng.sample(ADULT_CONDITIONS, conditions)
+        return AdultPatient(name, rng.randint(18, 90), rng.uniform(150, 195), rng.uniform(45, 130),
+                            rng.random() < 0.5, {condition: True for condition in active})
+    if kind == "child":
+        return ChildPatient(name, rng.randint(1, 17), rng.uniform(75, 180), rng.uniform(9, 70), rng.random() < 0.5,
+                            conditions={ChildrenCriticalIllness: rng.random() < 0.3})
+    if kind == "term_infant":
+        return TermInfantPatient(name, rng.randint(0, 40), rng.uniform(45, 60), rng.uniform(2.5, 5), rng.random() < 0.5)
+    return PretermInfantPatient(name, rng.randint(0, 40), rng.uniform(30, 45), rng.uniform(0.5, 2.5), rng.random() < 0.5)
+
+
+def make_census(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    kinds = ["adult"] * 6 + ["child"] * 2 + ["term_infant", "preterm_infant"]
+    return [make_patient(rng.choice(kinds), i, rng, conditions=rng.randint(0, 3)) for i in range(n)]
+
+
+def measure(fn, repeat: int):
+    """Wall time per call (median, p95) and peak traced memory of one extra call."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    times.sort()
+    return {
+        "median_s": statistics.median(times),
+        "p95_s": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "peak_bytes": peak,
+    }
+
+
+def single_patient_cases(days: int, repeat: int):
+    rng = random.Random(1)
+    for kind in ("adult", "child", "term_infant", "preterm_infant"):
+        patient = make_patient(kind, 0, rng)
+        yield f"single/{kind}", 1, measure(lambda: TpnPlanner(patient, days).generate_daily_plan(), repeat)
+    for count in (4, len(ADULT_CONDITIONS)):
+        patient = make_patient("adult", 0, rng, conditions=count)
+        yield f"single/adult_{count}_conditions", 1, measure(lambda: TpnPlanner(patient, days).generate_daily_plan(), repeat)
+
+
+def batch_cases(days: int, sizes, repeat: int):
+    for n in sizes:
+        census = make_census(n)
+        yield f"batch/census_{n}", n, measure(lambda: BatchPlanner(days).plan(census), repeat)
+    rng = random.Random(2)
+    heavy = [make_patient("adult", i, rng, conditions=rng.randint(5, len(ADULT_CONDITIONS))) for i in range(sizes[0])]
+    yield f"batch/conditions_heavy_{len(heavy)}", len(heavy), measure(lambda: BatchPlanner(days).plan(heavy), repeat)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per batch case")
+    parser.add_argument("--single-repeat", type=int, default=200, help="timed runs per single-patient case")
+    args = parser.parse_args()
+
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, n, stats in single_patient_cases(args.days, args.single_repeat):
+            results.append({"case": name, "patients": n, **stats})
+        for name, n, stats in batch_cases(args.days, args.sizes, args.repeat):
+            results.append({"case": name, "patients": n, "patients_per_s": n / stats["median_s"], **stats})
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "days": args.days,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for row in results:
+        print(f"{row['case']:<32} {row['median_s'] * 1e3:10.3f} ms  peak {row['peak_bytes'] / 1e6:8.2f} MB")
+    print(f"written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
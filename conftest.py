@@ -0,0 +1 @@
+"""Makes the repository root importable (modules.*) when running pytest."""
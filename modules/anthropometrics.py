@@ -0,0 +1,54 @@
+"""Body-size measures computed on NumPy arrays (or plain floats) in one pass.
+
+Heights are in cm and weights in kg; male is True for male patients.
+"""
+from dataclasses import dataclass
+import numpy as np
+from typing import Optional
+
+
+@dataclass
+class Anthropometrics:
+    ibw: np.ndarray
+    bmi: np.ndarray
+    percentage_ibw: np.ndarray
+
+
+def ideal_body_weight(height, male):
+    """Devine IBW: 50 kg (male) or 45.5 kg (female) + 2.3 kg per inch over 5 ft."""
+    base = np.where(male, 50, 45.5)
+    return base + 2.3 * ((np.asarray(height) / 2.54) - 60)
+
+
+def body_mass_index(weight, height):
+    return np.asarray(weight) / ((np.asarray(height) / 100) ** 2)
+
+
+def percentage_ibw(weight, ibw):
+    return (np.asarray(weight) / ibw) * 100
+
+
+def adjusted_body_weight(weight, ibw, factor: float = 0.4):
+    """ABW: IBW plus factor times the weight above IBW."""
+    return ibw + factor * (np.asarray(weight) - ibw)
+
+
+def measure(height, weight, male) -> Anthropometrics:
+    ibw = ideal_body_weight(height, male)
+    return Anthropometrics(ibw=ibw, bmi=body_mass_index(weight, height), percentage_ibw=percentage_ibw(weight, ibw))
+
+
+def dosing_weight(weight, ibw, obese_threshold: Optional[float] = None):
+    """Weight that per-kg doses are multiplied by.
+
+    IBW where it is known (non-zero), else actual weight, else 1. With obese_threshold set,
+    patients above that %IBW are dosed on adjusted body weight instead.
+    """
+    weight = np.asarray(weight, dtype=float)
+    ibw = np.asarray(ibw, dtype=float)
+    dose = np.where(ibw != 0, ibw, np.where(weight != 0, weight, 1.0))
+    if obese_threshold is not None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            obese = (ibw != 0) & (percentage_ibw(weight, ibw) > obese_threshold)
+        dose = np.where(obese, adjusted_body_weight(weight, ibw), dose)
+    return dose
@@ -0,0 +1,143 @@
+"""Read patient census files in chunks and turn their rows into patients.
+
+A census has one row per patient with the columns
+    patient_id, population, age, height, weight, gender
+plus one column per condition key (see modules.conditions.registry), e.g. sepsis or
+critically_ill. population is adult, child, term_infant or preterm_infant (default adult);
+gender is M/F or a boolean, True meaning male; condition cells are booleans, 1/0 or y/n.
+Missing condition columns count as False, so building a patient never prompts.
+"""
+from concurrent.futures import Executor
+from typing import Dict, Iterator, List, Optional, Type
+import numpy as np
+import pandas as pd
+from modules.conditions.registry import ADULT_CONDITIONS, CHILD_CONDITIONS, ConditionRegistry
+from modules.patients.adult_patient import AdultPatient
+from modules.patients.child_patient import ChildPatient
+from modules.patients.preterm_infant_patient import PretermInfantPatient
+from modules.patients.term_infant_patient import TermInfantPatient
+from modules.planner import batch_planner
+from modules.planner.batch_planner import BatchPlan, BatchPlanner
+from modules.planner.hooks import NULL_HOOKS, PlannerHooks
+
+POPULATIONS: Dict[str, type] = {
+    "adult": AdultPatient,
+    "child": ChildPatient,
+    "term_infant": TermInfantPatient,
+    "preterm_infant": PretermInfantPatient,
+}
+POPULATION_CONDITIONS: Dict[str, Dict[str, type]] = {
+    "adult": ADULT_CONDITIONS,
+    "child": CHILD_CONDITIONS,
+}
+_REGISTRIES: Dict[str, ConditionRegistry] = {}
+REQUIRED_COLUMNS = ("patient_id", "age", "height", "weight", "gender")
+_TRUE = {"1", "true", "t", "yes", "y", "m", "male"}
+
+
+def read_census(path: str, chunk_size: int = 10_000) -> Iterator[pd.DataFrame]:
+    """Yield the census as DataFrames of at most chunk_size rows (CSV or Parquet by extension)."""
+    if path.endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("reading Parquet census files requires pyarrow") from exc
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype={"patient_id": str})
+
+
+def flag(value) -> bool:
+    """Census cell as a boolean; blank cells are False."""
+    if value is None or (isinstance(value, float) and value != value):
+        return False
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE
+    return bool(value)
+
+
+def flags(column: pd.Series) -> np.ndarray:
+    """flag() of every cell of a census column."""
+    if pd.api.types.is_bool_dtype(column):
+        return column.to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(column):
+        return column.fillna(0).to_numpy() != 0
+    return column.astype(str).str.strip().str.lower().isin(_TRUE).to_numpy()
+
+
+def patients_from_frame(df: pd.DataFrame) -> List:
+    """Patients for every row of a census chunk."""
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"census is missing columns: {', '.join(missing)}")
+    populations = df["population"].fillna("adult") if "population" in df.columns else pd.Series("adult", index=df.index)
+    patients = []
+    for population, row in zip(populations, df.to_dict("records")):
+        patient_type = POPULATIONS.get(population)
+        if patient_type is None:
+            raise ValueError(f"patient {row['patient_id']}: unknown population '{population}'")
+        condition_types: Dict[str, Type] = POPULATION_CONDITIONS.get(population, {})
+        patients.append(patient_type(
+            name=str(row["patient_id"]),
+            age=row["age"],
+            height=float(row["height"]),
+            weight=float(row["weight"]),
+            gender=flag(row["gender"]),
+            conditions={condition: flag(row.get(key)) for key, condition in condition_types.items()},
+        ))
+    return patients
+
+
+def _registry(population: str) -> ConditionRegistry:
+    registry = _REGISTRIES.get(population)
+    if registry is None:
+        registry = _REGISTRIES[population] = ConditionRegistry(POPULATION_CONDITIONS.get(population, {}), precompute_size=1)
+    return registry
+
+
+def plan_frame(planner: BatchPlanner, df: pd.DataFrame) -> BatchPlan:
+    """Plan a census chunk straight from its columns, without a patient object per row."""
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"census is missing columns: {', '.join(missing)}")
+    populations = (df["population"].fillna("adult") if "population" in df.columns
+                   else pd.Series("adult", index=df.index)).to_numpy()
+    unknown = set(populations) - set(POPULATIONS)
+    if unknown:
+        raise ValueError(f"unknown population(s): {', '.join(sorted(map(str, unknown)))}")
+
+    conditions = np.empty(len(df), dtype=object)
+    for population in set(populations):
+        rows = populations == population
+        registry = _registry(population)
+        masks = np.zeros(rows.sum(), dtype=np.int64)
+        for key, bit in registry.bits.items():
+            if key in df.columns:
+                masks |= np.where(flags(df[key])[rows], bit, 0)
+        sets = {mask: registry.types_for(mask) for mask in np.unique(masks).tolist()}
+        conditions[rows] = [sets[mask] for mask in masks.tolist()]
+    return planner.plan_columns(
+        [POPULATIONS[population] for population in populations],
+        df["patient_id"].astype(str).tolist(),
+        df["age"].to_numpy(),
+        df["height"].to_numpy(dtype=float),
+        df["weight"].to_numpy(dtype=float),
+        flags(df["gender"]),
+        conditions.tolist(),
+    )
+
+
+def _plan_frame_chunk(df: pd.DataFrame) -> BatchPlan:
+    return plan_frame(batch_planner.worker_planner(), df)
+
+
+def plan_frame_pool(pool: Executor, df: pd.DataFrame, workers: int, chunk_size: Optional[int] = None,
+                    hooks: PlannerHooks = NULL_HOOKS) -> BatchPlan:
+    """plan_frame() of a census chunk split across a BatchPlanner.process_pool(), keeping row order.
+
+    Create the pool once per run: its workers keep their templates between calls. Stage stats
+    the workers record are merged into hooks (pass the hooks of the planner that made the pool).
+    """
+    parts = [df.iloc[start:start + size] for start, size in batch_planner.chunk_bounds(len(df), workers, chunk_size)]
+    return batch_planner.concat_batches(batch_planner.map_in_workers(pool, _plan_frame_chunk, parts, hooks))
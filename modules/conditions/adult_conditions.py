@@ -71,7 +71,7 @@ class Sepsis(CriticallyIllAdult):
     name: str = "Sepsis"
     description: str = "Higher protein need for wound healing and tissue repair."
     target = {
-        "micro": {
+        "macro": {
             "amino_acids": {
                 "replace": NutrientPlan("g", "kg", goal_range=[0, 0])
             }
@@ -232,12 +232,10 @@ class HeartFailure(CardiacDisease):
     name: str = "Heart Disease"
     description: str = "Nutrition plan for patients with cardiac disease."
     target = {
-        "energy": {
-            "kcal": {
-                "replace": NutrientPlan("kcal", "kg", goal_range=[20, 25])
-            }
-        },
         "macro": {
+            "energy": {
+                "replace": NutrientPlan("kcal", "kg", goal_range=[20, 25])
+            },
             "amino_acids": {
                 "replace": NutrientPlan("g", "kg", goal_range=[1.0, 1.5])
             },
@@ -248,6 +246,8 @@ class HeartFailure(CardiacDisease):
         "electrolyte": {
             "sodium": {"restrict": 0},
             "potassium": {"replace": None},
+        },
+        "trace_elements": {
             "zinc": {"replace": NutrientPlan("mg", "day", goal_range=[2.5, 5])},
             "copper": {"replace": NutrientPlan("mcg", "day", goal_range=[300, 500])},
             "selenium": {"replace": NutrientPlan("mcg", "day", goal_range=[60, 100])},
@@ -1,6 +1,6 @@
-from conditions import Condition
+from modules.conditions.conditions import Condition
 from dataclasses import dataclass
-from ..nutrient_plan import NutrientPlan
+from modules.nutrient_plan import NutrientPlan
 
 @dataclass
 class ChildrenCriticalIllness(Condition):
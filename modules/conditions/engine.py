@@ -0,0 +1,187 @@
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Type
+from modules.conditions.conditions import Condition
+from modules.conditions import adult_conditions, children_conditions  # noqa: F401, registers their classes
+from modules.nutrient_plan import NutrientPlan
+from modules import guidelines
+
+OPERATIONS = ("replace", "restrict", "add_fixed", "note")
+CATEGORIES = ("macro", "electrolyte", "vitamins", "trace_elements")
+
+# Condition targets use one naming scheme, the patient base plans another
+NUTRIENT_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "amino_acids": ("protein_amino_acids",),
+    "protein": ("amino_acids", "protein_amino_acids"),
+    "lipids": ("lipid_emulsion",),
+    "lipid": ("lipids", "lipid_emulsion"),
+    "glucose": ("dextrose",),
+}
+
+@dataclass(frozen=True)
+class PatchOp:
+    """One operation of a condition's target on a single nutrient."""
+    category: str
+    nutrient: str
+    operation: str
+    value: object
+    condition: Type[Condition]
+
+
+@dataclass(frozen=True)
+class Patch:
+    """Merged effect of all active conditions on a single nutrient."""
+    category: str
+    nutrient: str
+    replacement: Optional[NutrientPlan] = None
+    drop: bool = False  # a condition replaced the nutrient with None
+    limit: Optional[float] = None
+    notes: Tuple[str, ...] = ()
+    sources: Tuple[str, ...] = ()  # names of the conditions merged into this patch
+
+
+_compiled: Dict[Type[Condition], Tuple[PatchOp, ...]] = {}
+
+
+def precedence(condition_type: Type[Condition]) -> Tuple[int, str]:
+    """More specific (deeper) condition classes win conflicting replacements; name breaks ties."""
+    return len(condition_type.__mro__), condition_type.__name__
+
+
+def _normalize(plan: NutrientPlan) -> NutrientPlan:
+    if isinstance(plan.guidelines, str):
+        return replace(plan, guidelines=[plan.guidelines])
+    return plan
+
+
+def register_condition(condition_type: Type[Condition]) -> Tuple[PatchOp, ...]:
+    """Compile a condition class's target dict into a tuple of PatchOps.
+
+    Unknown categories and operations raise ValueError; nutrients are checked against each
+    patient's base plan when the patches are applied (see locate()).
+    """
+    ops: List[PatchOp] = []
+    for category, nutrients in (condition_type.target or {}).items():
+        if category not in CATEGORIES:
+            raise ValueError(f"{condition_type.__name__}: unknown category '{category}'")
+        for nutrient, operations in nutrients.items():
+            for operation, value in operations.items():
+                if operation not in OPERATIONS:
+                    raise ValueError(f"{condition_type.__name__}: unknown operation '{operation}' on {category}.{nutrient}")
+                if isinstance(value, NutrientPlan):
+                    value = _normalize(value)
+                ops.append(PatchOp(category, nutrient, operation, value, condition_type))
+    _compiled[condition_type] = tuple(ops)
+    return _compiled[condition_type]
+
+
+def compiled_ops(condition_type: Type[Condition]) -> Tuple[PatchOp, ...]:
+    ops = _compiled.get(condition_type)
+    if ops is None:
+        ops = register_condition(condition_type)
+    return ops
+
+
+@lru_cache(maxsize=None)
+def resolve_conditions(condition_types: FrozenSet[Type[Condition]]) -> Tuple[Patch, ...]:
+    """Merge the ops of several conditions into one Patch per nutrient.
+
+    replace: the most specific condition wins; restrict: the lowest limit wins;
+    add_fixed/note: notes are kept in precedence order.
+    """
+    ops = [op for condition in sorted(condition_types, key=precedence) for op in compiled_ops(condition)]
+    merged: Dict[Tuple[str, str], Dict[str, object]] = {}
+    for op in ops:
+        fields = merged.setdefault((op.category, op.nutrient), {"replacement": None, "drop": False, "limit": None, "notes": (), "sources": ()})
+        if op.condition.__name__ not in fields["sources"]:
+            fields["sources"] += (op.condition.__name__,)
+        if op.operation == "replace":
+            fields["replacement"] = op.value
+            fields["drop"] = op.value is None
+        elif op.operation == "restrict":
+            fields["limit"] = op.value if fields["limit"] is None else min(fields["limit"], op.value)
+        else:
+            note = op.value.notes if isinstance(op.value, NutrientPlan) else op.value
+            if note and note not in fields["notes"]:
+                fields["notes"] += (note,)
+    return tuple(Patch(category, nutrient, **fields) for (category, nutrient), fields in sorted(merged.items()))
+
+
+def _clamp(values, limit):
+    if values is None:
+        return None
+    if values and isinstance(values[0], list):
+        return [_clamp(v, limit) for v in values]
+    return [min(v, limit) if v is not None else None for v in values]
+
+
+def _locate(nutrients: Dict[str, NutrientPlan], name: str) -> Optional[str]:
+    if name in nutrients:
+        return name
+    for alias in NUTRIENT_ALIASES.get(name, ()):
+        if alias in nutrients:
+            return alias
+    return None
+
+
+def locate(plan: Dict[str, Dict[str, NutrientPlan]], patch: Patch) -> str:
+    """Name of the plan entry a patch lands on; raises ValueError if the plan has none."""
+    name = _locate(plan.get(patch.category, {}), patch.nutrient)
+    if name is None:
+        raise ValueError(f"{', '.join(patch.sources) or 'condition'}: the plan has no {patch.category}.{patch.nutrient}")
+    return name
+
+
+def apply_patches(plan: Dict[str, Dict[str, NutrientPlan]], patches: Iterable[Patch]):
+    """Apply resolved patches to a copy_plan() copy of a plan, replacing entries in place.
+
+    A patch whose target the plan does not have raises ValueError instead of being skipped.
+    """
+    for patch in patches:
+        name = locate(plan, patch)
+        nutrients = plan[patch.category]
+        if patch.drop:
+            del nutrients[name]
+            continue
+        current = patch.replacement or nutrients[name]
+        if patch.limit is not None:
+            current = replace(
+                current,
+                initial_range=_clamp(current.initial_range, patch.limit),
+                goal_range=_clamp(current.goal_range, patch.limit),
+                daily_intake_range=_clamp(current.daily_intake_range, patch.limit),
+            )
+        if patch.notes:
+            notes = tuple(n for n in (current.notes,) if n) + patch.notes
+            current = replace(current, notes="; ".join(dict.fromkeys(notes)))
+        nutrients[name] = current
+
+
+def patch_targets(plan: Dict[str, Dict[str, NutrientPlan]], patches: Iterable[Patch]) -> Dict[Tuple[str, str], Tuple[Patch, ...]]:
+    """Patches grouped by the (category, nutrient) entry of plan they land on, in application order."""
+    targets: Dict[Tuple[str, str], Tuple[Patch, ...]] = {}
+    for patch in patches:
+        row = patch.category, locate(plan, patch)
+        targets[row] = targets.get(row, ()) + (patch,)
+    return targets
+
+
+def apply_conditions(plan: Dict[str, Dict[str, NutrientPlan]], condition_types: Iterable[Type[Condition]]):
+    """Apply every active condition to a copy_plan() copy of a plan."""
+    apply_patches(plan, resolve_conditions(frozenset(condition_types)))
+
+
+def _register_all(condition_type: Type[Condition]):
+    for subclass in condition_type.__subclasses__():
+        register_condition(subclass)
+        _register_all(subclass)
+
+
+_register_all(Condition)
+
+
+@guidelines.on_change
+def _recompile():
+    _compiled.clear()
+    resolve_conditions.cache_clear()
+    _register_all(Condition)
@@ -0,0 +1,81 @@
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, Tuple, Type
+from modules.conditions.conditions import Condition
+from modules.conditions import adult_conditions, children_conditions
+from modules.conditions.engine import Patch, resolve_conditions
+from modules import guidelines
+
+
+class ConditionRegistry:
+    """Maps condition keys (e.g. worksheet checkbox keys) to Condition classes.
+
+    A combination of keys is addressed by a bitmask, bit i standing for the i-th key.
+    Resolved patches are cached per mask; every single condition and every pair is
+    resolved up front so toggling a checkbox is a dict lookup. Resolving also warms
+    resolve_conditions, so planners of patients with those conditions hit its cache.
+    """
+
+    def __init__(self, conditions: Dict[str, Type[Condition]], precompute_size: int = 2):
+        self.keys: Tuple[str, ...] = tuple(conditions)
+        self.types: Tuple[Type[Condition], ...] = tuple(conditions.values())
+        self.bits: Dict[str, int] = {key: 1 << i for i, key in enumerate(self.keys)}
+        self._patches: Dict[int, Tuple[Patch, ...]] = {}
+        self._version = guidelines.version()
+        self.precompute(precompute_size)
+
+    def mask(self, keys: Iterable[str]) -> int:
+        mask = 0
+        for key in keys:
+            mask |= self.bits[key]
+        return mask
+
+    def selected(self, mask: int) -> Tuple[str, ...]:
+        return tuple(key for i, key in enumerate(self.keys) if mask >> i & 1)
+
+    def types_for(self, mask: int) -> FrozenSet[Type[Condition]]:
+        return frozenset(condition for i, condition in enumerate(self.types) if mask >> i & 1)
+
+    def conditions(self, mask: int) -> Dict[Type[Condition], bool]:
+        """Patient conditions dict for a mask."""
+        return {condition: True for condition in self.types_for(mask)}
+
+    def patches(self, mask: int) -> Tuple[Patch, ...]:
+        """Merged patches of the conditions in mask, resolved once per mask."""
+        if self._version != guidelines.version():
+            self._patches.clear()
+            self._version = guidelines.version()
+        patches = self._patches.get(mask)
+        if patches is None:
+            patches = self._patches[mask] = resolve_conditions(self.types_for(mask))
+        return patches
+
+    def precompute(self, size: int = 2):
+        """Resolve every combination of up to size conditions."""
+        self._patches.clear()
+        for n in range(1, size + 1):
+            for bits in combinations(self.bits.values(), n):
+                self.patches(sum(bits))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+ADULT_CONDITIONS: Dict[str, Type[Condition]] = {
+    "tbi": adult_conditions.TraumaticBrainInjury,
+    "burns": adult_conditions.Burns,
+    "sepsis": adult_conditions.Sepsis,
+    "open_abdomen": adult_conditions.OpenAbdomen,
+    "aki": adult_conditions.AcuteKidneyInjury,
+    "aki_no_rrt": adult_conditions.AcuteKidneyInjury_NoRRT,
+    "aki_intermittent_rrt": adult_conditions.AcuteKidneyInjury_IntermittentRRT,
+    "aki_crrt": adult_conditions.AcuteKidneyInjury_CRRT,
+    "ckd": adult_conditions.ChronicKidneyFailure,
+    "ckd_hd": adult_conditions.ChronicKidneyFailure_MaintenanceHD,
+    "obese": adult_conditions.Obese,
+    "liver_failure": adult_conditions.AcuteLiverFailure,
+    "heart_failure": adult_conditions.HeartFailure,
+}
+
+CHILD_CONDITIONS: Dict[str, Type[Condition]] = {
+    "critically_ill": children_conditions.ChildrenCriticalIllness,
+}
@@ -0,0 +1,181 @@
+"""Base plans of every patient bracket compiled into a memory-mapped binary store.
+
+The store is a directory holding one .npy file per NutrientPlanTable column plus
+index.json (string vocabulary and base_plan_key -> row range). Columns are opened with
+mmap_mode="r", so every worker process reading the same store shares its pages.
+
+Build it after editing any get_base_plan:
+    python -m modules.guideline_store build guidelines.store
+and activate it with use_store(path); TpnPatient.cached_base_plan() then reads base plans
+from the store and only falls back to get_base_plan() for keys the store does not cover.
+index.json records a hash of the base plans the store was compiled from, and use_store()
+refuses a store whose hash no longer matches the guideline tables.
+"""
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+from typing import Dict, Hashable, List, Optional, Tuple
+from modules import guidelines
+from modules.nutrient_plan import NutrientPlan
+from modules.nutrient_plan_table import NutrientPlanTable
+
+FORMAT_VERSION = 2
+ARRAY_COLUMNS = (
+    "plan_ids", "category_codes", "nutrient_codes", "measurement_unit_codes", "reference_unit_codes",
+    "guideline_codes", "note_codes", "ranges", "days_to_goal", "daily_offsets", "daily_values", "has_daily",
+)
+
+# (age, weight) points that between them reach every base_plan_key of each population
+BRACKET_SAMPLES: Dict[str, List[Tuple[float, float]]] = {
+    "AdultPatient": [(40, 70)],
+    "ChildPatient": [(age, weight) for age in (0.1, 0.5, 1.5, 3, 7, 11, 15) for weight in (20, 50)],
+    "TermInfantPatient": [(age, 3.5) for age in (2, 5, 10, 30)],
+    "PretermInfantPatient": [(age, weight) for age in range(29) for weight in (0.8, 1.2, 2.0)],
+}
+
+_active: Optional["GuidelineStore"] = None
+
+
+def _plain(value):
+    """JSON-stable form of a key part: numpy scalars unwrapped, integral floats as ints."""
+    if isinstance(value, (tuple, list)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def key_string(key: Tuple[Hashable, ...]) -> str:
+    """Store key of a base_plan_key(): 'ClassName|[bracket, ...]'."""
+    return f"{key[0].__name__}|{json.dumps(_plain(key[1:]))}"
+
+
+def _encode(value):
+    return list(value) if isinstance(value, tuple) else value
+
+
+def _decode(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class GuidelineStore:
+    """Read-only view of a compiled store."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "index.json")) as f:
+            index = json.load(f)
+        if index["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported guideline store format {index['format']}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAY_COLUMNS}
+        self.table = NutrientPlanTable(**arrays, strings=[_decode(s) for s in index["strings"]])
+        self.rows: Dict[str, Tuple[int, int]] = {key: tuple(span) for key, span in index["keys"].items()}
+        self.source: str = index["source"]  # source_hash() of the plans it was compiled from
+
+    def __contains__(self, key: Tuple[Hashable, ...]) -> bool:
+        return key_string(key) in self.rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def base_plan(self, key: Tuple[Hashable, ...]) -> Optional[Dict[str, Dict[str, NutrientPlan]]]:
+        """Base plan stored for a base_plan_key(), or None if the store does not cover it."""
+        span = self.rows.get(key_string(key))
+        if span is None:
+            return None
+        table = self.table
+        plan: Dict[str, Dict[str, NutrientPlan]] = {}
+        for i in range(*span):
+            category = table.strings[table.category_codes[i]]
+            plan.setdefault(category, {})[table.strings[table.nutrient_codes[i]]] = table.row(i).to_plan()
+        return plan
+
+
+def source_plans() -> Dict[str, Dict[str, Dict[str, NutrientPlan]]]:
+    """Base plan of every bracket in BRACKET_SAMPLES, by store key."""
+    from modules.patients.adult_patient import AdultPatient
+    from modules.patients.child_patient import ChildPatient
+    from modules.patients.preterm_infant_patient import PretermInfantPatient
+    from modules.patients.term_infant_patient import TermInfantPatient
+
+    plans: Dict[str, Dict[str, Dict[str, NutrientPlan]]] = {}
+    for patient_type in (AdultPatient, ChildPatient, TermInfantPatient, PretermInfantPatient):
+        for age, weight in BRACKET_SAMPLES[patient_type.__name__]:
+            patient = patient_type(name="bracket", age=age, height=100.0, weight=weight, gender=True, conditions={})
+            key = key_string(patient.base_plan_key())
+            if key not in plans:
+                plans[key] = patient.get_base_plan()
+    return plans
+
+
+def source_hash(plans: Optional[Dict[str, Dict[str, Dict[str, NutrientPlan]]]] = None) -> str:
+    """Content hash of source_plans(); any edit of a guideline table changes it."""
+    if plans is None:
+        plans = source_plans()
+    content = {key: {category: {nutrient: vars(entry) for nutrient, entry in nutrients.items()}
+                     for category, nutrients in plan.items()}
+               for key, plan in plans.items()}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def build_store(path: str) -> GuidelineStore:
+    """Compile the base plan of every bracket in BRACKET_SAMPLES into a store at path."""
+    plans = source_plans()
+    table = NutrientPlanTable.from_plans(list(plans.values()))
+    starts = np.searchsorted(table.plan_ids, np.arange(len(plans) + 1))
+    os.makedirs(path, exist_ok=True)
+    for name in ARRAY_COLUMNS:
+        np.save(os.path.join(path, f"{name}.npy"), getattr(table, name))
+    index = {
+        "format": FORMAT_VERSION,
+        "source": source_hash(plans),
+        "strings": [_encode(s) for s in table.strings],
+        "keys": {key: [int(starts[i]), int(starts[i + 1])] for i, key in enumerate(plans)},
+    }
+    with open(os.path.join(path, "index.json"), "w") as f:
+        json.dump(index, f, ensure_ascii=False)
+    return GuidelineStore(path)
+
+
+def use_store(path: Optional[str]) -> Optional[GuidelineStore]:
+    """Serve base plans from the store at path (None switches the store off).
+
+    Raises ValueError if the store was compiled from guideline tables that have changed since.
+    """
+    global _active
+    store = GuidelineStore(path) if path else None
+    if store is not None and store.source != source_hash():
+        raise ValueError(f"{path} was built from other guideline tables; rebuild it with "
+                         f"python -m modules.guideline_store build {path}")
+    guidelines.invalidate()  # drop base plans and results built from the previous source
+    _active = store
+    return _active
+
+
+def active_store() -> Optional[GuidelineStore]:
+    return _active
+
+
+@guidelines.on_change
+def _drop_store():
+    # Runtime guideline edits make the compiled tables stale
+    global _active
+    _active = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile or inspect the binary guideline store.")
+    parser.add_argument("command", choices=("build", "info"))
+    parser.add_argument("path")
+    args = parser.parse_args()
+    store = build_store(args.path) if args.command == "build" else GuidelineStore(args.path)
+    status = "current" if store.source == source_hash() else "stale, rebuild it"
+    print(f"{args.path}: {len(store)} base plans, {len(store.table)} nutrient rows ({status})")
+
+
+if __name__ == "__main__":
+    main()
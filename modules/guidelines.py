@@ -0,0 +1,23 @@
+from typing import Callable, List
+
+# Bumped whenever guideline tables (base plans, condition targets) are edited at runtime
+_version = 0
+_listeners: List[Callable[[], None]] = []
+
+
+def version() -> int:
+    return _version
+
+
+def on_change(callback: Callable[[], None]) -> Callable[[], None]:
+    """Register a callback that drops data derived from the guideline tables."""
+    _listeners.append(callback)
+    return callback
+
+
+def invalidate():
+    """Call after changing guideline tables so no cache serves plans built from the old ones."""
+    global _version
+    _version += 1
+    for callback in _listeners:
+        callback()
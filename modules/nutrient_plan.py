@@ -1,5 +1,8 @@
 from dataclasses import dataclass
-from typing import List, Optional
+import math
+import sys
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 
 @dataclass
 class NutrientPlan:
@@ -10,4 +13,89 @@ class NutrientPlan:
     days_to_goal: Optional[int] = None
     daily_intake_range: Optional[List[List[float]]] = None # dành cho các range dinh dưỡng không theo quy luật tăng cố định
     guidelines: Optional[List[str]] = None #e.g: ASPEN 2020, ESPEN 2018
-    notes: Optional[str] = None # dành cho các dinh dưỡng ko có định nghĩa range cụ thể mà chỉ lưu ý miệng
\ No newline at end of file
+    notes: Optional[str] = None # dành cho các dinh dưỡng ko có định nghĩa range cụ thể mà chỉ lưu ý miệng
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def _pair(values: Optional[List[float]]) -> Tuple[float, float]:
+    if not values:
+        return math.nan, math.nan
+    return tuple(math.nan if v is None else float(v) for v in (values[0], values[-1]))
+
+
+def _unpair(low: float, high: float) -> Optional[List[float]]:
+    if math.isnan(low) and math.isnan(high):
+        return None
+    return [None if math.isnan(v) else v for v in (low, high)]
+
+
+def _guidelines(guidelines) -> Optional[Tuple[str, ...]]:
+    if guidelines is None:
+        return None
+    if isinstance(guidelines, str):
+        guidelines = [guidelines]
+    return tuple(_intern(g) for g in guidelines)
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenNutrientPlan:
+    """Immutable, slotted NutrientPlan with ranges stored as float pairs (NaN = no range)."""
+    measurement_unit: str
+    reference_unit: str
+    initial_low: float = math.nan
+    initial_high: float = math.nan
+    goal_low: float = math.nan
+    goal_high: float = math.nan
+    days_to_goal: Optional[int] = None
+    daily_intake_range: Optional[Tuple[Tuple[float, float], ...]] = None
+    guidelines: Optional[Tuple[str, ...]] = None
+    notes: Optional[str] = None
+
+    @classmethod
+    def from_plan(cls, plan: NutrientPlan) -> "FrozenNutrientPlan":
+        return cls(
+            _intern(plan.measurement_unit),
+            _intern(plan.reference_unit),
+            *_pair(plan.initial_range),
+            *_pair(plan.goal_range),
+            days_to_goal=plan.days_to_goal,
+            daily_intake_range=tuple(_pair(day) for day in plan.daily_intake_range) if plan.daily_intake_range is not None else None,
+            guidelines=_guidelines(plan.guidelines),
+            notes=_intern(plan.notes),
+        )
+
+    def to_plan(self) -> NutrientPlan:
+        return NutrientPlan(
+            self.measurement_unit,
+            self.reference_unit,
+            _unpair(self.initial_low, self.initial_high),
+            _unpair(self.goal_low, self.goal_high),
+            self.days_to_goal,
+            [list(day) for day in self.daily_intake_range] if self.daily_intake_range is not None else None,
+            list(self.guidelines) if self.guidelines is not None else None,
+            self.notes,
+        )
+
+
+def freeze_plan(plan: Dict[str, Dict[str, NutrientPlan]]) -> Mapping[str, Mapping[str, FrozenNutrientPlan]]:
+    """Read-only view of a plan dict with frozen entries, safe to share between planners."""
+    return MappingProxyType({
+        category: MappingProxyType({nutrient: FrozenNutrientPlan.from_plan(entry) for nutrient, entry in nutrients.items()})
+        for category, nutrients in plan.items()
+    })
+
+
+def copy_plan(plan: Mapping[str, Mapping[str, Union[NutrientPlan, FrozenNutrientPlan]]]) -> Dict[str, Dict[str, NutrientPlan]]:
+    """Editable copy of a plan: new category dicts, with frozen entries thawed into new NutrientPlans.
+
+    NutrientPlan entries are shared with plan (copy-on-write): edit the copy by assigning new
+    entries (e.g. dataclasses.replace), never by mutating a shared NutrientPlan in place.
+    """
+    return {
+        category: {nutrient: entry.to_plan() if isinstance(entry, FrozenNutrientPlan) else entry
+                   for nutrient, entry in nutrients.items()}
+        for category, nutrients in plan.items()
+    }
@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+import numpy as np
+from typing import Dict, Hashable, List, Optional, Sequence
+from modules.nutrient_plan import FrozenNutrientPlan, NutrientPlan
+
+
+class _Vocab:
+    """Assigns a small integer code to each distinct (interned) value."""
+
+    def __init__(self):
+        self.values: List[Hashable] = []
+        self.codes: Dict[Hashable, int] = {}
+
+    def code(self, value: Hashable) -> int:
+        if value not in self.codes:
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+        return self.codes[value]
+
+
+@dataclass
+class NutrientPlanTable:
+    """Many NutrientPlans, possibly from many plan dicts, stored column by column.
+
+    Strings (category, nutrient, units, guidelines, notes) are dictionary-encoded;
+    ranges live in one (n, 4) float array [initial_low, initial_high, goal_low, goal_high]
+    with NaN for a missing range, and daily_intake_range rows are a CSR-style
+    offsets/values pair. Categories without nutrients hold no rows, so they are not rebuilt.
+    """
+    plan_ids: np.ndarray  # which plan dict each row belongs to
+    category_codes: np.ndarray
+    nutrient_codes: np.ndarray
+    measurement_unit_codes: np.ndarray
+    reference_unit_codes: np.ndarray
+    guideline_codes: np.ndarray
+    note_codes: np.ndarray
+    ranges: np.ndarray
+    days_to_goal: np.ndarray  # -1 for None
+    daily_offsets: np.ndarray  # rows i use daily_values[daily_offsets[i]:daily_offsets[i + 1]]
+    daily_values: np.ndarray
+    has_daily: np.ndarray  # False where daily_intake_range is None
+    strings: List[Hashable]  # vocabulary shared by every *_codes column
+    plan_count: Optional[int] = None  # number of plan dicts, None to count those with rows
+
+    def __len__(self) -> int:
+        return len(self.plan_ids)
+
+    @classmethod
+    def from_plans(cls, plan_dicts: Sequence[Dict[str, Dict[str, NutrientPlan]]]) -> "NutrientPlanTable":
+        vocab = _Vocab()
+        columns: Dict[str, list] = {name: [] for name in (
+            "plan_ids", "category_codes", "nutrient_codes", "measurement_unit_codes", "reference_unit_codes",
+            "guideline_codes", "note_codes", "ranges", "days_to_goal", "has_daily")}
+        offsets, daily = [0], []
+        for plan_id, plan_dict in enumerate(plan_dicts):
+            for category, nutrients in plan_dict.items():
+                for nutrient, plan in nutrients.items():
+                    row = FrozenNutrientPlan.from_plan(plan)
+                    columns["plan_ids"].append(plan_id)
+                    columns["category_codes"].append(vocab.code(category))
+                    columns["nutrient_codes"].append(vocab.code(nutrient))
+                    columns["measurement_unit_codes"].append(vocab.code(row.measurement_unit))
+                    columns["reference_unit_codes"].append(vocab.code(row.reference_unit))
+                    columns["guideline_codes"].append(vocab.code(row.guidelines))
+                    columns["note_codes"].append(vocab.code(row.notes))
+                    columns["ranges"].append((row.initial_low, row.initial_high, row.goal_low, row.goal_high))
+                    columns["days_to_goal"].append(-1 if row.days_to_goal is None else row.days_to_goal)
+                    columns["has_daily"].append(row.daily_intake_range is not None)
+                    daily.extend(row.daily_intake_range or ())
+                    offsets.append(len(daily))
+        codes = {name: np.array(columns[name], dtype=np.int32) for name in (
+            "plan_ids", "category_codes", "nutrient_codes", "measurement_unit_codes", "reference_unit_codes",
+            "guideline_codes", "note_codes", "days_to_goal")}
+        return cls(
+            **codes,
+            ranges=np.array(columns["ranges"], dtype=float).reshape(-1, 4),
+            daily_offsets=np.array(offsets, dtype=np.int32),
+            daily_values=np.array(daily, dtype=float).reshape(-1, 2),
+            has_daily=np.array(columns["has_daily"], dtype=bool),
+            strings=vocab.values,
+            plan_count=len(plan_dicts),
+        )
+
+    def row(self, i: int) -> FrozenNutrientPlan:
+        daily: Optional[tuple] = None
+        if self.has_daily[i]:
+            values = self.daily_values[self.daily_offsets[i]:self.daily_offsets[i + 1]]
+            daily = tuple((float(low), float(high)) for low, high in values)
+        days_to_goal = int(self.days_to_goal[i])
+        return FrozenNutrientPlan(
+            self.strings[self.measurement_unit_codes[i]],
+            self.strings[self.reference_unit_codes[i]],
+            *(float(v) for v in self.ranges[i]),
+            days_to_goal=None if days_to_goal < 0 else days_to_goal,
+            daily_intake_range=daily,
+            guidelines=self.strings[self.guideline_codes[i]],
+            notes=self.strings[self.note_codes[i]],
+        )
+
+    def to_plans(self) -> List[Dict[str, Dict[str, NutrientPlan]]]:
+        """Rebuild the plan dicts this table was made from."""
+        count = self.plan_count if self.plan_count is not None else int(self.plan_ids.max(initial=-1)) + 1
+        plan_dicts: List[Dict[str, Dict[str, NutrientPlan]]] = [{} for _ in range(count)]
+        for i in range(len(self)):
+            category = self.strings[self.category_codes[i]]
+            nutrient = self.strings[self.nutrient_codes[i]]
+            plan_dicts[self.plan_ids[i]].setdefault(category, {})[nutrient] = self.row(i).to_plan()
+        return plan_dicts
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict, Type
+from typing import Dict, Hashable, List, Tuple, Type
 from modules.patients.tpn_patient import TpnPatient
 from modules.conditions.conditions import Condition
 from modules.conditions.adult_conditions import *
@@ -21,44 +21,51 @@ class AdultPatient(TpnPatient):
         )
         self.conditions = conditions or {}
 
+    def base_plan_key(self) -> Tuple[Hashable, ...]:
+        return (type(self),)
+
+    @classmethod
+    def bracket_keys(cls, ages, weights) -> List[Tuple[Hashable, ...]]:
+        return [(cls,)] * len(ages)
+
     def get_base_plan(self) -> Dict[str, Dict[str, NutrientPlan]]:
         return {
             "macro": {
-                "protein_amino_acids": NutrientPlan("g", "kg", [0.8, 1.5], [0.8, 1.5], 0, ["ASPEN 2020"],notes="Additional 15–30 g/L exudate"),
-                "energy": NutrientPlan("kcal", "kg", [20, 30], [20, 30], 0, ["ASPEN 2020"]),
-                "dextrose": NutrientPlan("mg", "kg/min", [4, 5], [4, 5], 0, ["ASPEN 2020"]),
-                "lipid_emulsion": NutrientPlan("g", "kg", [1, 1], [1, 1], 0, ["ASPEN 2020"]),
-                "fluid": NutrientPlan("mL", "kg", [30, 40], [30, 40], 0, ["ASPEN 2020"]),
+                "protein_amino_acids": NutrientPlan("g", "kg", [0.8, 1.5], [0.8, 1.5], 0, guidelines=["ASPEN 2020"], notes="Additional 15–30 g/L exudate"),
+                "energy": NutrientPlan("kcal", "kg", [20, 30], [20, 30], 0, guidelines=["ASPEN 2020"]),
+                "dextrose": NutrientPlan("mg", "kg/min", [4, 5], [4, 5], 0, guidelines=["ASPEN 2020"]),
+                "lipid_emulsion": NutrientPlan("g", "kg", [1, 1], [1, 1], 0, guidelines=["ASPEN 2020"]),
+                "fluid": NutrientPlan("mL", "kg", [30, 40], [30, 40], 0, guidelines=["ASPEN 2020"]),
             },
             "electrolyte": {
-                "calcium": NutrientPlan("mEq", "day", [10, 15], [10, 15], 0, ["ASPEN 2020"]),
-                "magnesium": NutrientPlan("mEq", "day", [8, 20], [8, 20], 0, ["ASPEN 2020"]),
-                "phosphorus": NutrientPlan("mmol", "day", [20, 40], [20, 40], 0, ["ASPEN 2020"]),
-                "sodium": NutrientPlan("mEq", "kg", [1, 2], [1, 2], 0, ["ASPEN 2020"]),
-                "potassium": NutrientPlan("mEq", "kg", [1, 2], [1, 2], 0, ["ASPEN 2020"]),
-                "acetate": NutrientPlan("mEq", "kg", None, None, 0, ["ASPEN 2020"]),
-                "chloride": NutrientPlan("mEq", "kg", None, None, 0, ["ASPEN 2020"]),
+                "calcium": NutrientPlan("mEq", "day", [10, 15], [10, 15], 0, guidelines=["ASPEN 2020"]),
+                "magnesium": NutrientPlan("mEq", "day", [8, 20], [8, 20], 0, guidelines=["ASPEN 2020"]),
+                "phosphorus": NutrientPlan("mmol", "day", [20, 40], [20, 40], 0, guidelines=["ASPEN 2020"]),
+                "sodium": NutrientPlan("mEq", "kg", [1, 2], [1, 2], 0, guidelines=["ASPEN 2020"]),
+                "potassium": NutrientPlan("mEq", "kg", [1, 2], [1, 2], 0, guidelines=["ASPEN 2020"]),
+                "acetate": NutrientPlan("mEq", "kg", None, None, 0, guidelines=["ASPEN 2020"]),
+                "chloride": NutrientPlan("mEq", "kg", None, None, 0, guidelines=["ASPEN 2020"]),
             },
             "vitamins": {
-                "thiamine_B1": NutrientPlan("mg", "day", [6, 6], [6, 6], 0, ["ASPEN 2020"]),
-                "riboflavin_B2": NutrientPlan("mg", "day", [3.6, 3.6], [3.6, 3.6], 0, ["ASPEN 2020"]),
-                "niacin_B3": NutrientPlan("mg", "day", [40, 40], [40, 40], 0, ["ASPEN 2020"]),
-                "folic_acid": NutrientPlan("µg", "day", [600, 600], [600, 600], 0, ["ASPEN 2020"]),
-                "pantothenic_acid": NutrientPlan("mg", "day", [15, 15], [15, 15], 0, ["ASPEN 2020"]),
-                "pyridoxine_B6": NutrientPlan("mg", "day", [6, 6], [6, 6], 0, ["ASPEN 2020"]),
-                "cyanocobalamin_B12": NutrientPlan("µg", "day", [5, 5], [5, 5], 0, ["ASPEN 2020"]),
-                "biotin": NutrientPlan("µg", "day", [60, 60], [60, 60], 0, ["ASPEN 2020"]),
-                "ascorbic_acid_C": NutrientPlan("mg", "day", [200, 200], [200, 200], 0, ["ASPEN 2020"]),
-                "vitamin_A": NutrientPlan("µg", "day", [990, 990], [990, 990], 0, ["ASPEN 2020"]),
-                "vitamin_D": NutrientPlan("µg", "day", [5, 5], [5, 5], 0, ["ASPEN 2020"]),
-                "vitamin_E": NutrientPlan("mg", "day", [10, 10], [10, 10], 0, ["ASPEN 2020"]),
-                "vitamin_K": NutrientPlan("µg", "day", [150, 150], [150, 150], 0, ["ASPEN 2020"]),
+                "thiamine_B1": NutrientPlan("mg", "day", [6, 6], [6, 6], 0, guidelines=["ASPEN 2020"]),
+                "riboflavin_B2": NutrientPlan("mg", "day", [3.6, 3.6], [3.6, 3.6], 0, guidelines=["ASPEN 2020"]),
+                "niacin_B3": NutrientPlan("mg", "day", [40, 40], [40, 40], 0, guidelines=["ASPEN 2020"]),
+                "folic_acid": NutrientPlan("µg", "day", [600, 600], [600, 600], 0, guidelines=["ASPEN 2020"]),
+                "pantothenic_acid": NutrientPlan("mg", "day", [15, 15], [15, 15], 0, guidelines=["ASPEN 2020"]),
+                "pyridoxine_B6": NutrientPlan("mg", "day", [6, 6], [6, 6], 0, guidelines=["ASPEN 2020"]),
+                "cyanocobalamin_B12": NutrientPlan("µg", "day", [5, 5], [5, 5], 0, guidelines=["ASPEN 2020"]),
+                "biotin": NutrientPlan("µg", "day", [60, 60], [60, 60], 0, guidelines=["ASPEN 2020"]),
+                "ascorbic_acid_C": NutrientPlan("mg", "day", [200, 200], [200, 200], 0, guidelines=["ASPEN 2020"]),
+                "vitamin_A": NutrientPlan("µg", "day", [990, 990], [990, 990], 0, guidelines=["ASPEN 2020"]),
+                "vitamin_D": NutrientPlan("µg", "day", [5, 5], [5, 5], 0, guidelines=["ASPEN 2020"]),
+                "vitamin_E": NutrientPlan("mg", "day", [10, 10], [10, 10], 0, guidelines=["ASPEN 2020"]),
+                "vitamin_K": NutrientPlan("µg", "day", [150, 150], [150, 150], 0, guidelines=["ASPEN 2020"]),
             },
             "trace_elements": {
-                "chromium": NutrientPlan("µg", "day", [0, 10], [0, 10], 0, ["ASPEN 2020"]),
-                "copper": NutrientPlan("mg", "day", [0.3, 0.5], [0.3, 0.5], 0, ["ASPEN 2020"]),
-                "manganese": NutrientPlan("µg", "day", [55, 55], [55, 55], 0, ["ASPEN 2020"]),
-                "selenium": NutrientPlan("µg", "day", [60, 100], [60, 100], 0, ["ASPEN 2020"]),
-                "zinc": NutrientPlan("mg", "day", [3, 5], [3, 5], 0, ["ASPEN 2020"]),
+                "chromium": NutrientPlan("µg", "day", [0, 10], [0, 10], 0, guidelines=["ASPEN 2020"]),
+                "copper": NutrientPlan("mg", "day", [0.3, 0.5], [0.3, 0.5], 0, guidelines=["ASPEN 2020"]),
+                "manganese": NutrientPlan("µg", "day", [55, 55], [55, 55], 0, guidelines=["ASPEN 2020"]),
+                "selenium": NutrientPlan("µg", "day", [60, 100], [60, 100], 0, guidelines=["ASPEN 2020"]),
+                "zinc": NutrientPlan("mg", "day", [3, 5], [3, 5], 0, guidelines=["ASPEN 2020"]),
             }
         }
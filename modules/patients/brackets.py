@@ -0,0 +1,34 @@
+from bisect import bisect_left
+import numpy as np
+from typing import Sequence
+
+
+def below(value: float) -> float:
+    """Breakpoint for a strict "< value" test; BracketIndex breakpoints are inclusive upper bounds."""
+    return float(np.nextafter(value, -np.inf))
+
+
+class BracketIndex:
+    """Sorted breakpoints of one patient attribute (age, weight, ...).
+
+    Breakpoints are inclusive upper bounds: value v falls in bracket i when
+    breakpoints[i - 1] < v <= breakpoints[i], and in bracket len(breakpoints) above the last.
+    Use below(x) for brackets that end just before x (a "< x" test).
+    """
+
+    def __init__(self, *breakpoints: float):
+        self.breakpoints = tuple(float(b) for b in breakpoints)
+        if list(self.breakpoints) != sorted(self.breakpoints):
+            raise ValueError(f"breakpoints must be sorted: {breakpoints}")
+        self._array = np.array(self.breakpoints)
+
+    def __len__(self) -> int:
+        return len(self.breakpoints) + 1
+
+    def __call__(self, value: float) -> int:
+        """Bracket id of one value."""
+        return bisect_left(self.breakpoints, value)
+
+    def assign(self, values: Sequence[float]) -> np.ndarray:
+        """Bracket ids of many values at once."""
+        return np.searchsorted(self._array, np.asarray(values, dtype=float), side="left")
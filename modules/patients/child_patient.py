@@ -1,78 +1,84 @@
 from dataclasses import dataclass
-from tpn_patient import TpnPatient
-from ..nutrient_plan import NutrientPlan
-from typing import List, Dict
+from modules.patients.tpn_patient import TpnPatient
+from modules.nutrient_plan import NutrientPlan
+from typing import Dict, Hashable, List, Tuple
+from modules.patients.brackets import BracketIndex, below
+from modules import anthropometrics
+import numpy as np
 from ..conditions.children_conditions import ChildrenCriticalIllness
+
+# Age brackets (years): ≤0.25 | <1 | ≤2 | ≤5 | ≤10 | ≤12 | older
+AGE_BRACKETS = BracketIndex(0.25, below(1), 2, 5, 10, 12)
+# Weight brackets (kg): ≤40 | heavier
+WEIGHT_BRACKETS = BracketIndex(40)
+
+# Ranges per age bracket, in AGE_BRACKETS order
+#                        ≤0.25        <1           ≤2          ≤5          ≤10         ≤12         older
+AMINO_ACIDS =          ((1.5, 2.5),  (1.5, 2.5),  (1.5, 2.5), (1.5, 2.5), (1.5, 2.5), (0.8, 2),   (0.8, 2))
+GLUCOSE_INITIAL =      ((1.5, 2.5),  (1.5, 2.5),  (1.5, 2.5), (1.5, 2.5), (1.5, 2.5), (2.5, 3),   (2.5, 3))
+GLUCOSE_GOAL =         ((8, 10),     (8, 10),     (8, 10),    (8, 10),    (8, 10),    (5, 6),     (5, 6))
+LIPIDS_INITIAL =       ((1, 2),      (1, 2),      (1, 2),     (1, 2),     (1, 2),     (1, 1),     (1, 1))
+LIPIDS_GOAL =          ((2, 2.5),    (2, 2.5),    (2, 2.5),   (2, 2.5),   (2, 2.5),   (1, 2),     (1, 2))
+FLUID =                ((120, 150),  (120, 150),  (80, 120),  (80, 100),  (60, 80),   (60, 80),   (50, 70))
+SODIUM =               ((2, 3),      (2, 3),      (1, 3),     (1, 3),     (1, 3),     (1, 3),     (1, 3))
+CALCIUM =              ((0.5, 0.5),  (0.5, 0.5),  (0.25, 0.4), (0.25, 0.4), (0.25, 0.4), (0.25, 0.4), (0.25, 0.4))
+MAGNESIUM =            ((0.15, 0.15), (0.15, 0.15), (0.1, 0.1), (0.1, 0.1), (0.1, 0.1), (0.1, 0.1), (0.1, 0.1))
+ZINC =                 ((250, 250),  (100, 100),  (50, 50),   (50, 50),   (50, 50),   (50, 50),   (50, 50))
+
+# Ranges per weight bracket, in WEIGHT_BRACKETS order
+#                        ≤40          heavier
+COPPER =               ((20, 20),    (200, 500))
+MANGANESE =            ((1, 1),      (40, 100))
+SELENIUM =             ((2, 2),      (40, 60))
+CHROMIUM =             ((0.2, 0.2),  (5, 15))
+
+
 @dataclass
 class ChildPatient(TpnPatient):
     age: float
     weight: float
 
     def __post_init__(self):
-        self.conditions = {ChildrenCriticalIllness: self.ask_condition("Children (Critically Ill)")}
+        if self.conditions is None:
+            self.conditions = {ChildrenCriticalIllness: self.ask_condition("Children (Critically Ill)")}
 
     def ask_condition(self, name: str) -> bool:
         answer = input(f"Is the patient {name}? [y/n]: ").strip().lower()
         return answer == "y"
 
+    def base_plan_key(self) -> Tuple[Hashable, ...]:
+        return type(self), AGE_BRACKETS(self.age), WEIGHT_BRACKETS(self.weight)
+
+    @classmethod
+    def bracket_keys(cls, ages, weights) -> List[Tuple[Hashable, ...]]:
+        return [(cls, age, weight) for age, weight in zip(AGE_BRACKETS.assign(ages).tolist(), WEIGHT_BRACKETS.assign(weights).tolist())]
+
+    @classmethod
+    def dosing_weights(cls, heights, weights, male) -> np.ndarray:
+        # __post_init__ does not compute an IBW for children, so they are dosed on actual weight
+        return anthropometrics.dosing_weight(weights, np.zeros(len(weights)))
+
     def get_base_plan(self) -> Dict[str, Dict[str, "NutrientPlan"]]:
+        _, age, weight = self.base_plan_key()
         energy = NutrientPlan("kcal", "kg", [90, 120], [90, 120], 0, guidelines=["ESPEN 2018"])
-        amino_acids = NutrientPlan(
-            "g", "kg",
-            [1.5, 2.5] if self.age <= 10 else [0.8, 2],
-            [1.5, 2.5] if self.age <= 10 else [0.8, 2],
-            0,
-            guidelines=["ASPEN 2020"]
-        )
-        glucose = NutrientPlan(
-            "g", "kg",
-            [1.5, 2.5] if self.age <= 10 else [2.5, 3],
-            [8, 10] if self.age <= 10 else [5, 6],
-            0,
-            guidelines=["ASPEN 2020"]
-        )
-        lipids = NutrientPlan(
-            "g", "kg",
-            [1, 2] if self.age <= 10 else [1, 1],
-            [2, 2.5] if self.age <= 10 else [1, 2],
-            0,
-            guidelines=["ASPEN 2020"]
-        )
-        fluid = NutrientPlan(
-            "mL", "kg",
-            [120, 150] if self.age < 1 else
-            [80, 120] if self.age <= 2 else
-            [80, 100] if self.age <= 5 else
-            [60, 80] if self.age <= 12 else
-            [50, 70],
-            [120, 150] if self.age < 1 else
-            [80, 120] if self.age <= 2 else
-            [80, 100] if self.age <= 5 else
-            [60, 80] if self.age <= 12 else
-            [50, 70],
-            0,
-            guidelines=["ESPEN 2018"]
-        )
-        sodium = NutrientPlan("mmol", "kg", [2, 3] if self.age < 1 else [1, 3], [2, 3] if self.age < 1 else [1, 3], 0, guidelines=["ESPEN 2018"])
+        amino_acids = NutrientPlan("g", "kg", list(AMINO_ACIDS[age]), list(AMINO_ACIDS[age]), 0, guidelines=["ASPEN 2020"])
+        glucose = NutrientPlan("g", "kg", list(GLUCOSE_INITIAL[age]), list(GLUCOSE_GOAL[age]), 0, guidelines=["ASPEN 2020"])
+        lipids = NutrientPlan("g", "kg", list(LIPIDS_INITIAL[age]), list(LIPIDS_GOAL[age]), 0, guidelines=["ASPEN 2020"])
+        fluid = NutrientPlan("mL", "kg", list(FLUID[age]), list(FLUID[age]), 0, guidelines=["ESPEN 2018"])
+        sodium = NutrientPlan("mmol", "kg", list(SODIUM[age]), list(SODIUM[age]), 0, guidelines=["ESPEN 2018"])
         potassium = NutrientPlan("mmol", "kg", [1, 3], [1, 3], 0, guidelines=["ESPEN 2018"])
-        calcium = NutrientPlan("mmol", "kg", [0.5, 0.5] if self.age < 1 else [0.25, 0.4], [0.5, 0.5] if self.age < 1 else [0.25, 0.4], 0, guidelines=["ESPEN 2018"])
-        magnesium = NutrientPlan("mmol", "kg", [0.15, 0.15] if self.age < 1 else [0.1, 0.1], [0.15, 0.15] if self.age < 1 else [0.1, 0.1], 0, guidelines=["ESPEN 2018"])
+        calcium = NutrientPlan("mmol", "kg", list(CALCIUM[age]), list(CALCIUM[age]), 0, guidelines=["ESPEN 2018"])
+        magnesium = NutrientPlan("mmol", "kg", list(MAGNESIUM[age]), list(MAGNESIUM[age]), 0, guidelines=["ESPEN 2018"])
         iron = NutrientPlan("µg", "kg", [50, 100], [50, 100], 0, guidelines=["ESPEN 2018"])
         chloride = NutrientPlan("µg", "kg", [50, 100], [50, 100], 0, guidelines=["ESPEN 2018"])
         phosphorus = NutrientPlan("µg", "kg", [50, 100], [50, 100], 0, guidelines=["ESPEN 2028"])
         acetate = NutrientPlan("mmol", "kg", notes="Use as needed to maintain acid–base balance", guidelines=["ASPEN 2020"])
 
-        zinc = NutrientPlan("µg", "kg", [250, 250] if self.age <= 0.25 else [100, 100] if self.age < 1 else [50, 50],
-                            [250, 250] if self.age <= 0.25 else [100, 100] if self.age < 1 else [50, 50],
-                            0, guidelines=["ESPEN 2018"])
-        copper = NutrientPlan("µg", "kg", [20, 20] if self.weight <= 40 else [200, 500],
-                              [20, 20] if self.weight <= 40 else [200, 500], 0, guidelines=["ASPEN 2020"])
-        manganese = NutrientPlan("µg", "kg", [1, 1] if self.weight <= 40 else [40, 100],
-                                 [1, 1] if self.weight <= 40 else [40, 100], 0, guidelines=["ASPEN 2020"])
-        selenium = NutrientPlan("µg", "kg", [2, 2] if self.weight <= 40 else [40, 60],
-                                [2, 2] if self.weight <= 40 else [40, 60], 0, guidelines=["ASPEN 2020"])
-        chromium = NutrientPlan("µg", "day", [0.2, 0.2] if self.weight <= 40 else [5, 15],
-                                [0.2, 0.2] if self.weight <= 40 else [5, 15], 0, guidelines=["ASPEN 2020"])
+        zinc = NutrientPlan("µg", "kg", list(ZINC[age]), list(ZINC[age]), 0, guidelines=["ESPEN 2018"])
+        copper = NutrientPlan("µg", "kg", list(COPPER[weight]), list(COPPER[weight]), 0, guidelines=["ASPEN 2020"])
+        manganese = NutrientPlan("µg", "kg", list(MANGANESE[weight]), list(MANGANESE[weight]), 0, guidelines=["ASPEN 2020"])
+        selenium = NutrientPlan("µg", "kg", list(SELENIUM[weight]), list(SELENIUM[weight]), 0, guidelines=["ASPEN 2020"])
+        chromium = NutrientPlan("µg", "day", list(CHROMIUM[weight]), list(CHROMIUM[weight]), 0, guidelines=["ASPEN 2020"])
         iodine = NutrientPlan("µg", "kg", [1, 1], [1, 1], 0, guidelines=["ESPEN 2018"])
         molybdenum = NutrientPlan("µg", "kg", [0.25, 0.25], [0.25, 0.25], 0, guidelines=["ESPEN 2018"])
 
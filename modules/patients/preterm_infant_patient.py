@@ -1,59 +1,92 @@
 from dataclasses import dataclass
-from tpn_patient import TpnPatient
-from ..nutrient_plan import NutrientPlan
-from typing import List, Dict
+from modules.patients.tpn_patient import TpnPatient
+from modules.nutrient_plan import NutrientPlan
+from typing import Dict, Hashable, List, Tuple
+import numpy as np
+from modules.patients.brackets import BracketIndex, below
+from modules import anthropometrics
 
-dataclass
+# Age brackets (days): ≤4 | older
+AGE_BRACKETS = BracketIndex(4)
+# Weight brackets (kg): <1.0 | ≤1.5 | heavier
+WEIGHT_BRACKETS = BracketIndex(below(1.0), 1.5)
+IRON_TARGET_DAY = 28
+
+
+# Ranges per age bracket, in AGE_BRACKETS order
+#                        ≤4           older
+DAYS_TO_GOAL =         (4,           0)
+AMINO_ACIDS_INITIAL =  ((1.5, 2),    (3, 4))
+AMINO_ACIDS_GOAL =     ((3, 4),      (3, 4))
+GLUCOSE_INITIAL =      ((6, 9),      (9, 16))
+GLUCOSE_GOAL =         ((9, 16),     (9, 16))
+LIPIDS_INITIAL =       ((1, 2),      (3, 4))
+LIPIDS_GOAL =          ((3, 4),      (3, 4))
+
+# daily_intake_range per weight bracket, in WEIGHT_BRACKETS order (<1.0, ≤1.5, heavier)
+FLUID = (
+    ((80, 100), (100, 120), (120, 140), (140, 160), (160, 180)),
+    ((70, 90), (90, 110), (110, 130), (130, 150), (160, 180)),
+    ((60, 80), (80, 100), (100, 120), (120, 140), (140, 160)),
+)
+SODIUM = (
+    ((0, 3), (0, 3), (0, 5), (2, 7)),
+    ((0, 3), (0, 3), (0, 5), (2, 7)),
+    ((0, 3), (0, 3), (0, 3), (2, 5)),
+)
+
+
+def _days(table: Tuple[Tuple[float, float], ...]) -> List[List[float]]:
+    return [list(day) for day in table]
+
+
+@dataclass
 class PretermInfantPatient(TpnPatient):
+    def __post_init__(self):
+        # The Devine IBW is an adult formula (negative at infant heights), so infants are dosed on actual weight
+        super().__post_init__()
+        self.ibw = 0.0
+        self.percentage_ibw = 0.0
+
+    def base_plan_key(self) -> Tuple[Hashable, ...]:
+        # iron's days_to_goal counts down to day 28, so it is part of the key next to the bracket ids
+        iron_days = IRON_TARGET_DAY - self.age if self.age < IRON_TARGET_DAY else 0
+        return type(self), AGE_BRACKETS(self.age), WEIGHT_BRACKETS(self.weight), iron_days
+
+    @classmethod
+    def bracket_keys(cls, ages, weights) -> List[Tuple[Hashable, ...]]:
+        ages = np.asarray(ages)
+        iron_days = np.where(ages < IRON_TARGET_DAY, IRON_TARGET_DAY - ages, 0).tolist()
+        age_ids = AGE_BRACKETS.assign(ages).tolist()
+        weight_ids = WEIGHT_BRACKETS.assign(weights).tolist()
+        return [(cls, *ids) for ids in zip(age_ids, weight_ids, iron_days)]
+
+    @classmethod
+    def dosing_weights(cls, heights, weights, male) -> np.ndarray:
+        return anthropometrics.dosing_weight(weights, np.zeros(len(weights)))
+
     def get_base_plan(self) -> Dict[str, Dict[str, NutrientPlan]]:
+        _, age, weight, iron_days = self.base_plan_key()
         energy = NutrientPlan(
             "kcal", "kg", [45, 60], [80, 90], 4,
             guidelines=["NICE 2020"],
             notes="Non-protein energy: 35–45 (D1), 65 target; non-nitrogen ratio 20–30 kcal/g amino acid"
         )
         amino_acids = NutrientPlan(
-            "g", "kg", [1.5, 2], [3, 4], 4,
-            guidelines=["NICE 2020"]
-        ) if self.age <= 4 else NutrientPlan(
-            "g", "kg", [3, 4], [3, 4], 0,
+            "g", "kg", list(AMINO_ACIDS_INITIAL[age]), list(AMINO_ACIDS_GOAL[age]), DAYS_TO_GOAL[age],
             guidelines=["NICE 2020"]
         )
         glucose = NutrientPlan(
-            "g", "kg", [6, 9], [9, 16], 4,
-            guidelines=["NICE 2020"]
-        ) if self.age <= 4 else NutrientPlan(
-            "g", "kg", [9, 16], [9, 16], 0,
+            "g", "kg", list(GLUCOSE_INITIAL[age]), list(GLUCOSE_GOAL[age]), DAYS_TO_GOAL[age],
             guidelines=["NICE 2020"]
         )
         lipids = NutrientPlan(
-            "g", "kg", [1, 2], [3, 4], 4,
-            guidelines=["NICE 2020"]
-        ) if self.age <= 4 else NutrientPlan(
-            "g", "kg", [3, 4], [3, 4], 0,
+            "g", "kg", list(LIPIDS_INITIAL[age]), list(LIPIDS_GOAL[age]), DAYS_TO_GOAL[age],
             guidelines=["NICE 2020"]
         )
 
-        if self.weight > 1.5:
-            fluid = NutrientPlan("mL", "kg",
-                daily_intake_range=[[60, 80], [80, 100], [100, 120], [120, 140], [140, 160]],
-                guidelines=["ESPEN 2018"])
-            sodium = NutrientPlan("mmol", "kg",
-                daily_intake_range=[[0, 3], [0, 3], [0, 3], [2, 5]],
-                guidelines=["ESPEN 2018"])
-        elif self.weight < 1.0:
-            fluid = NutrientPlan("mL", "kg",
-                daily_intake_range=[[80, 100], [100, 120], [120, 140], [140, 160], [160, 180]],
-                guidelines=["ESPEN 2018"])
-            sodium = NutrientPlan("mmol", "kg",
-                daily_intake_range=[[0, 3], [0, 3], [0, 5], [2, 7]],
-                guidelines=["ESPEN 2018"])
-        else:
-            fluid = NutrientPlan("mL", "kg",
-                daily_intake_range=[[70, 90], [90, 110], [110, 130], [130, 150], [160, 180]],
-                guidelines=["ESPEN 2018"])
-            sodium = NutrientPlan("mmol", "kg",
-                daily_intake_range=[[0, 3], [0, 3], [0, 5], [2, 7]],
-                guidelines=["ESPEN 2018"])
+        fluid = NutrientPlan("mL", "kg", daily_intake_range=_days(FLUID[weight]), guidelines=["ESPEN 2018"])
+        sodium = NutrientPlan("mmol", "kg", daily_intake_range=_days(SODIUM[weight]), guidelines=["ESPEN 2018"])
 
         potassium = NutrientPlan("mmol", "kg",
             daily_intake_range=[[0, 3], [2, 3]],
@@ -69,7 +102,7 @@ class PretermInfantPatient(TpnPatient):
         )
         iron = NutrientPlan(
             "µg", "kg",
-            [0, 0], [225, 250], 28 - self.age if self.age < 28 else 0,
+            [0, 0], [225, 250], iron_days,
             guidelines=["ESPEN 2018", "NICE 2020"]
         )
         chloride = NutrientPlan(
@@ -1,11 +1,43 @@
 from dataclasses import dataclass
-from tpn_patient import TpnPatient
-from ..nutrient_plan import NutrientPlan
-from typing import List, Dict
+from modules.patients.tpn_patient import TpnPatient
+from modules.nutrient_plan import NutrientPlan
+from typing import Dict, Hashable, List, Tuple
+from modules.patients.brackets import BracketIndex, below
+from modules import anthropometrics
+import numpy as np
+
+# Age brackets: ≤3 | ≤6 | <28 | older
+AGE_BRACKETS = BracketIndex(3, 6, below(28))
+
+# Ranges per age bracket, in AGE_BRACKETS order
+#                ≤3            ≤6            <28           older
+MAGNESIUM =    ((0.1, 0.2),   (0.1, 0.2),   (0.15, 0.15), (0.15, 0.15))
+IRON =         ((0, 0),       (0, 0),       (0, 0),       (0.5, 4))
+PHOSPHORUS =   ((0.7, 1.3),   (0.7, 1.3),   (0.5, 0.5),   (0.5, 0.5))
+ZINC =         ((250, 250),   (100, 100),   (100, 100),   (100, 100))
+
 
 @dataclass
 class TermInfantPatient(TpnPatient):
+    def __post_init__(self):
+        # The Devine IBW is an adult formula (negative at infant heights), so infants are dosed on actual weight
+        super().__post_init__()
+        self.ibw = 0.0
+        self.percentage_ibw = 0.0
+
+    def base_plan_key(self) -> Tuple[Hashable, ...]:
+        return type(self), AGE_BRACKETS(self.age)
+
+    @classmethod
+    def bracket_keys(cls, ages, weights) -> List[Tuple[Hashable, ...]]:
+        return [(cls, age) for age in AGE_BRACKETS.assign(ages).tolist()]
+
+    @classmethod
+    def dosing_weights(cls, heights, weights, male) -> np.ndarray:
+        return anthropometrics.dosing_weight(weights, np.zeros(len(weights)))
+
     def get_base_plan(self) -> Dict[str, Dict[str, NutrientPlan]]:
+        _, age = self.base_plan_key()
         energy = NutrientPlan(
             "kcal", "kg", [45, 60], [80, 90], 4,
             guidelines=["NICE 2020"],
@@ -49,15 +81,15 @@ class TermInfantPatient(TpnPatient):
         )
         magnesium = NutrientPlan(
             "mmol", "kg",
-            [0.1, 0.2] if self.age <= 6 else [0.15, 0.15],
-            [0.1, 0.2] if self.age <= 6 else [0.15, 0.15],
+            list(MAGNESIUM[age]),
+            list(MAGNESIUM[age]),
             0,
             guidelines=["ESPEN 2018"]
         )
         iron = NutrientPlan(
             "mg", "kg",
-            [0, 0] if self.age < 28 else [0.5, 4],
-            [0, 0] if self.age < 28 else [0.5, 4],
+            list(IRON[age]),
+            list(IRON[age]),
             0,
             guidelines=["ESPEN 2018", "NICE 2020"]
         )
@@ -68,8 +100,8 @@ class TermInfantPatient(TpnPatient):
         )
         phosphorus = NutrientPlan(
             "mmol", "kg",
-            [0.7, 1.3] if self.age <= 6 else [0.5, 0.5],
-            [0.7, 1.3] if self.age <= 6 else [0.5, 0.5],
+            list(PHOSPHORUS[age]),
+            list(PHOSPHORUS[age]),
             0,
             guidelines=["ESPEN 2028"]
         )
@@ -81,8 +113,8 @@ class TermInfantPatient(TpnPatient):
 
         zinc = NutrientPlan(
             "µg", "kg",
-            [250, 250] if self.age <= 3 else [100, 100],
-            [250, 250] if self.age <= 3 else [100, 100],
+            list(ZINC[age]),
+            list(ZINC[age]),
             0,
             guidelines=["ESPEN 2018"]
         )
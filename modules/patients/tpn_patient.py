@@ -1,6 +1,19 @@
 from dataclasses import dataclass
 from ..conditions.conditions import Condition
-from typing import List
+from ..nutrient_plan import FrozenNutrientPlan, freeze_plan
+from .. import anthropometrics, guideline_store, guidelines
+import numpy as np
+from typing import Dict, Hashable, List, Mapping, Tuple
+
+# Base plans shared by every patient with the same base_plan_key(), frozen so no caller can edit them
+_base_plan_cache: Dict[Tuple[Hashable, ...], Mapping[str, Mapping[str, FrozenNutrientPlan]]] = {}
+
+
+@guidelines.on_change
+def clear_base_plan_cache():
+    _base_plan_cache.clear()
+
+
 @dataclass
 class TpnPatient:
     name: str
@@ -14,6 +27,42 @@ class TpnPatient:
     conditions: List[Condition] = None
 
     def __post_init__(self):
-        self.ibw = 50 + 2.3 * ((self.height / 2.54) - 60) if self.gender else 45.5 + 2.3 * ((self.height / 2.54) - 60)
-        self.bmi = self.weight / ((self.height / 100) ** 2)
-        self.percentage_ibw = (self.weight / self.ibw) * 100
+        body = anthropometrics.measure(self.height, self.weight, self.gender)
+        self.ibw = float(body.ibw)
+        self.bmi = float(body.bmi)
+        self.percentage_ibw = float(body.percentage_ibw)
+
+    def base_plan_key(self) -> Tuple[Hashable, ...]:
+        """Inputs that decide get_base_plan(); patients with equal keys share a base plan."""
+        return type(self), self.age, self.weight
+
+    @classmethod
+    def bracket_keys(cls, ages, weights) -> List[Tuple[Hashable, ...]]:
+        """base_plan_key() for arrays of ages and weights, without building patients."""
+        return [(cls, age, weight) for age, weight in zip(np.asarray(ages).tolist(), np.asarray(weights).tolist())]
+
+    @classmethod
+    def base_plan_keys(cls, patients: List["TpnPatient"]) -> List[Tuple[Hashable, ...]]:
+        """base_plan_key() of many patients of this class, with brackets assigned in bulk."""
+        return cls.bracket_keys([patient.age for patient in patients], [patient.weight for patient in patients])
+
+    @classmethod
+    def dosing_weights(cls, heights, weights, male) -> np.ndarray:
+        """Reference (dosing) weight for arrays of patients of this class."""
+        return anthropometrics.dosing_weight(weights, anthropometrics.ideal_body_weight(heights, male))
+
+    def cached_base_plan(self) -> Mapping[str, Mapping[str, FrozenNutrientPlan]]:
+        """Memoized get_base_plan(), read from the active guideline store when it covers this key.
+
+        The result is shared and read-only (FrozenNutrientPlan entries); copy_plan() gives an
+        editable copy.
+        """
+        key = self.base_plan_key()
+        plan = _base_plan_cache.get(key)
+        if plan is None:
+            store = guideline_store.active_store()
+            plan = store.base_plan(key) if store is not None else None
+            if plan is None:
+                plan = self.get_base_plan()
+            plan = _base_plan_cache[key] = freeze_plan(plan)
+        return plan
@@ -0,0 +1,302 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+import math
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from modules import guideline_store, guidelines
+from modules.planner import plan_engine
+from modules.planner.hooks import NULL_HOOKS, PlannerHooks
+from modules.planner.notes import PlanNote
+from modules.planner.tpn_planner import TpnPlanner, active_conditions, reference_value
+
+
+# (category, nutrient, unit, per): a nutrient planned in different units by different templates gets one row per unit
+Row = Tuple[str, str, str, str]
+
+
+def template_key(patient) -> Tuple[Hashable, ...]:
+    """Key of the inputs that decide a patient's base plan and condition patches."""
+    return patient.base_plan_key(), active_conditions(patient)
+
+
+def template_keys(patients: Sequence) -> List[Tuple[Hashable, ...]]:
+    """template_key() of every patient, assigning brackets per patient class in bulk."""
+    by_type: Dict[type, List] = {}
+    for patient in patients:
+        by_type.setdefault(type(patient), []).append(patient)
+    base_keys = {patient_type: iter(patient_type.base_plan_keys(group)) for patient_type, group in by_type.items()}
+    return [(next(base_keys[type(patient)]), active_conditions(patient)) for patient in patients]
+
+
+@dataclass
+class BatchPlan:
+    """Daily plans of many patients as one patient x nutrient x day array.
+
+    Rows are (category, nutrient, unit, per) labels, so a nutrient that patients of different
+    populations are planned for in different units has a row per unit (NaN for the others).
+    """
+    patient_ids: List[str]
+    categories: List[str]
+    nutrients: List[str]
+    units: List[str]
+    per: List[str]
+    values: np.ndarray
+    # Distinct note sets, shared by every patient whose plan produced the same notes
+    note_sets: List[Tuple[PlanNote, ...]] = field(default_factory=list)
+    note_index: Optional[np.ndarray] = None  # per patient, index into note_sets
+
+    @property
+    def total_days(self) -> int:
+        return self.values.shape[2]
+
+    def frame(self, i: int) -> pd.DataFrame:
+        """Pivoted plan of the i-th patient, same shape as TpnPlanner.generate_daily_plan."""
+        df = plan_engine.to_frame(self, self.values[i])
+        if df.index.has_duplicates:
+            raise ValueError(f"patient {self.patient_ids[i]} has values for one nutrient in several units")
+        return df
+
+    def units_of(self, i: int) -> Dict[Tuple[str, str], Tuple[str, str]]:
+        """(category, nutrient) -> (unit, per) of the rows the i-th patient has values in."""
+        planned = np.flatnonzero(~np.all(np.isnan(self.values[i]), axis=1))
+        return {(self.categories[r], self.nutrients[r]): (self.units[r], self.per[r]) for r in planned.tolist()}
+
+    def notes(self, i: int) -> Tuple[PlanNote, ...]:
+        """Notes of the i-th patient's plan."""
+        if self.note_index is None:
+            return ()
+        return self.note_sets[self.note_index[i]]
+
+    def to_long(self) -> pd.DataFrame:
+        """Long format: one row per (patient, nutrient, day) with a value."""
+        n_patients, n_nutrients, n_days = self.values.shape
+        per_patient = n_nutrients * n_days
+        df = pd.DataFrame({
+            "Patient": np.repeat(np.asarray(self.patient_ids, dtype=object), per_patient),
+            "Category": np.tile(np.repeat(np.asarray(self.categories, dtype=object), n_days), n_patients),
+            "Nutrient": np.tile(np.repeat(np.asarray(self.nutrients, dtype=object), n_days), n_patients),
+            "Day": np.tile(np.arange(1, n_days + 1), n_patients * n_nutrients),
+            "Value": self.values.reshape(-1),
+            "Unit": np.tile(np.repeat(np.asarray(self.units, dtype=object), n_days), n_patients),
+            "Per": np.tile(np.repeat(np.asarray(self.per, dtype=object), n_days), n_patients),
+        })
+        return df.dropna(subset=["Value"]).reset_index(drop=True)
+
+
+class BatchPlanner:
+    """Plan many patients at once, sharing one packed template per distinct base plan.
+
+    Templates are dropped wholesale when guidelines.invalidate() is called.
+    """
+
+    def __init__(self, total_days: int = 7, hooks: Optional[PlannerHooks] = None):
+        self.total_days = total_days
+        self.hooks = hooks or NULL_HOOKS
+        self.templates: Dict[Tuple[Hashable, ...], Tuple[plan_engine.PackedPlan, np.ndarray, Tuple[PlanNote, ...]]] = {}
+        self._version = guidelines.version()
+
+    def template(self, patient) -> Tuple[plan_engine.PackedPlan, np.ndarray, Tuple[PlanNote, ...]]:
+        """Packed plan, unscaled daily values and notes for the patient's template key."""
+        if self._version != guidelines.version():
+            self.templates.clear()
+            self._version = guidelines.version()
+        key = template_key(patient)
+        if key not in self.templates:
+            planner = TpnPlanner(patient, self.total_days, hooks=self.hooks)
+            packed = planner.prepare()
+            with self.hooks.span("schedule"):
+                self.templates[key] = packed, plan_engine.daily_values(packed, self.total_days), tuple(planner.notes)
+        return self.templates[key]
+
+    def process_pool(self, workers: int) -> ProcessPoolExecutor:
+        """Process pool whose workers each keep a BatchPlanner for total_days (and map the active
+        guideline store), so templates are reused by every chunk sent to the pool.
+
+        Workers record with hooks built from self.hooks.worker_config(); map_in_workers() merges
+        what they recorded back into the caller's hooks. Workers hold the guidelines of the moment
+        the pool was made, so after guidelines.invalidate() the pool refuses work: make a new one.
+        """
+        store = guideline_store.active_store()
+        initargs = (self.total_days, store.path if store is not None else None, self.hooks.worker_config(),
+                    guidelines.version())
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs)
+
+    def plan(self, patients: Sequence, workers: Optional[int] = None, chunk_size: Optional[int] = None,
+             pool: Optional[Executor] = None) -> BatchPlan:
+        """Plan all patients and return a patient x nutrient x day BatchPlan.
+
+        With workers > 1 the patients are split into chunks planned in a process pool;
+        results keep the input order. Pass a pool from process_pool() to reuse it across
+        calls; workers then only sizes the chunks.
+        """
+        if (pool is None and (workers is None or workers <= 1)) or len(patients) <= 1:
+            return self.plan_serial(patients)
+        chunks = [list(patients[i:i + size]) for i, size in chunk_bounds(len(patients), workers, chunk_size)]
+        if pool is not None:
+            return concat_batches(map_in_workers(pool, _plan_chunk, chunks, self.hooks))
+        with self.process_pool(workers) as pool:
+            return concat_batches(map_in_workers(pool, _plan_chunk, chunks, self.hooks))
+
+    def plan_serial(self, patients: Sequence) -> BatchPlan:
+        """Plan all patients in this process."""
+        with self.hooks.span("batch_group"):
+            keys = template_keys(patients)
+        ref = np.array([reference_value(patient) for patient in patients], dtype=float)
+        return self._assemble([patient.name for patient in patients], keys, ref, lambda i: patients[i])
+
+    def plan_columns(self, patient_types: Sequence[type], patient_ids: Sequence[str], ages, heights, weights, male,
+                     conditions: Optional[Sequence[frozenset]] = None) -> BatchPlan:
+        """Plan patients given as columns (one entry per patient) without a patient object per row.
+
+        patient_types holds each patient's class and conditions each patient's set of active
+        condition types. Brackets and dosing weights are computed per class on whole arrays;
+        only one patient per distinct template is built, to plan that template.
+        """
+        ages, heights, weights, male = (np.asarray(column) for column in (ages, heights, weights, male))
+        if conditions is None:
+            conditions = [frozenset()] * len(patient_ids)
+        keys: List[Tuple[Hashable, ...]] = [()] * len(patient_ids)
+        ref = np.empty(len(patient_ids))
+        with self.hooks.span("batch_group"):
+            by_type: Dict[type, List[int]] = {}
+            for i, patient_type in enumerate(patient_types):
+                by_type.setdefault(patient_type, []).append(i)
+            for patient_type, idx in by_type.items():
+                idx = np.asarray(idx)
+                for i, base_key in zip(idx.tolist(), patient_type.bracket_keys(ages[idx], weights[idx])):
+                    keys[i] = base_key, conditions[i]
+                ref[idx] = patient_type.dosing_weights(heights[idx], weights[idx], male[idx])
+
+        def patient_at(i: int):
+            return patient_types[i](
+                name=str(patient_ids[i]), age=ages[i].item(), height=float(heights[i]), weight=float(weights[i]),
+                gender=bool(male[i]), conditions={condition: True for condition in conditions[i]})
+
+        return self._assemble([str(patient_id) for patient_id in patient_ids], keys, ref, patient_at)
+
+    def _assemble(self, patient_ids: List[str], keys: List[Tuple[Hashable, ...]], ref: np.ndarray, patient_at) -> BatchPlan:
+        """Group patients by template key, plan one template per group and scale it by ref."""
+        groups: Dict[Tuple[Hashable, ...], List[int]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(key, []).append(i)
+
+        with self.hooks.span("batch_templates"):
+            templates = {key: self.template(patient_at(idx[0])) for key, idx in groups.items()}
+
+        row_keys = sorted({row for packed, _, _ in templates.values() for row in _rows(packed)})
+        row_index = {row: i for i, row in enumerate(row_keys)}
+
+        values = np.full((len(patient_ids), len(row_keys), self.total_days), np.nan)
+        note_ids: Dict[Tuple[PlanNote, ...], int] = {}
+        note_index = np.zeros(len(patient_ids), dtype=np.int32)
+        with self.hooks.span("batch_scale"):
+            for key, idx in groups.items():
+                packed, daily, notes = templates[key]
+                idx = np.asarray(idx)
+                note_index[idx] = note_ids.setdefault(notes, len(note_ids))
+                target = np.array([row_index[row] for row in _rows(packed)], dtype=int)
+                factor = plan_engine.row_factors(packed, ref[idx])
+                values[idx[:, None], target[None, :]] = plan_engine.round3(daily[None, :, :] * factor[:, :, None])
+
+        return BatchPlan(
+            patient_ids=patient_ids,
+            **_labels(row_keys),
+            values=values,
+            note_sets=list(note_ids),
+            note_index=note_index,
+        )
+
+
+def _rows(plan) -> List[Row]:
+    """Row labels of a PackedPlan or BatchPlan."""
+    return list(zip(plan.categories, plan.nutrients, plan.units, plan.per))
+
+
+def _labels(row_keys: Sequence[Row]) -> Dict[str, List[str]]:
+    """BatchPlan label fields for sorted row keys."""
+    return {field: [row[i] for row in row_keys] for i, field in enumerate(("categories", "nutrients", "units", "per"))}
+
+
+def concat_batches(batches: Sequence[BatchPlan]) -> BatchPlan:
+    """Concatenate BatchPlans along the patient axis, aligning their nutrient rows."""
+    row_keys = sorted({row for batch in batches for row in _rows(batch)})
+    row_index = {row: i for i, row in enumerate(row_keys)}
+
+    total_days = batches[0].total_days if batches else 0
+    values = np.full((sum(len(b.patient_ids) for b in batches), len(row_keys), total_days), np.nan)
+    patient_ids: List[str] = []
+    note_ids: Dict[Tuple[PlanNote, ...], int] = {}
+    note_index = np.zeros(len(values), dtype=np.int32)
+    for batch in batches:
+        start = len(patient_ids)
+        stop = start + len(batch.patient_ids)
+        target = np.array([row_index[row] for row in _rows(batch)], dtype=int)
+        values[start:stop, target] = batch.values
+        if batch.note_index is None:
+            note_index[start:stop] = note_ids.setdefault((), len(note_ids))
+        else:
+            remap = np.array([note_ids.setdefault(notes, len(note_ids)) for notes in batch.note_sets], dtype=np.int32)
+            note_index[start:stop] = remap[batch.note_index]
+        patient_ids.extend(batch.patient_ids)
+
+    return BatchPlan(
+        patient_ids=patient_ids,
+        **_labels(row_keys),
+        values=values,
+        note_sets=list(note_ids),
+        note_index=note_index,
+    )
+
+
+def chunk_bounds(n: int, workers: Optional[int], chunk_size: Optional[int] = None) -> List[Tuple[int, int]]:
+    """(start, size) of the chunks n items are split into for a pool of workers."""
+    if chunk_size is None:
+        # A few chunks per worker balances load without paying pickling per patient
+        chunk_size = max(1, math.ceil(n / ((workers or 1) * 4)))
+    return [(start, min(chunk_size, n - start)) for start in range(0, n, chunk_size)]
+
+
+_worker_planner: Optional[BatchPlanner] = None
+_pool_version: Optional[int] = None  # caller's guidelines.version() when the worker's pool was made
+
+
+def _init_worker(total_days: int, store_path: Optional[str] = None,
+                 hooks_config: Optional[Tuple[type, Dict[str, Any]]] = None, version: Optional[int] = None):
+    # One planner per worker process so templates are reused across chunks; workers map the same store
+    global _worker_planner, _pool_version
+    _pool_version = version
+    if store_path is not None and guideline_store.active_store() is None:
+        guideline_store.use_store(store_path)
+    hooks = hooks_config[0](**hooks_config[1]) if hooks_config is not None else None
+    _worker_planner = BatchPlanner(total_days, hooks=hooks)
+
+
+def worker_planner() -> BatchPlanner:
+    """BatchPlanner of the current process_pool() worker process."""
+    return _worker_planner
+
+
+def _in_worker(function: Callable, version: int, chunk):
+    # The worker's hooks snapshot travels back with each result
+    if version != _pool_version:
+        raise RuntimeError("guidelines changed since this process pool was made; use a new process_pool()")
+    return function(chunk), _worker_planner.hooks.snapshot()
+
+
+def map_in_workers(pool: Executor, function: Callable, chunks: Sequence, hooks: PlannerHooks = NULL_HOOKS) -> List:
+    """pool.map(function, chunks) on a process_pool(), merging the stage stats the workers
+    recorded meanwhile into hooks.
+
+    Raises RuntimeError if guidelines.invalidate() was called since the pool was made.
+    """
+    results = []
+    for result, snapshot in pool.map(partial(_in_worker, function, guidelines.version()), chunks):
+        hooks.merge(snapshot)
+        results.append(result)
+    return results
+
+
+def _plan_chunk(patients: List) -> BatchPlan:
+    return _worker_planner.plan_serial(patients)
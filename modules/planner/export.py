@@ -0,0 +1,83 @@
+"""Bulk export of BatchPlans as Arrow tables or a day-partitioned Parquet dataset.
+
+pyarrow is only needed for these exports and is imported on first use.
+"""
+import os
+import shutil
+import numpy as np
+from typing import Iterable, List, Optional, Sequence
+from modules.planner.batch_planner import BatchPlan
+
+COLUMNS = ("patient_id", "category", "nutrient", "day", "value", "unit", "per")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("Arrow/Parquet export requires pyarrow") from exc
+    return pyarrow
+
+
+def _dictionary(pa, labels: Sequence[str], index: np.ndarray):
+    """Dictionary-encoded column of labels[index] with each distinct label stored once."""
+    distinct, codes = np.unique(np.asarray(labels, dtype=object), return_inverse=True)
+    return pa.DictionaryArray.from_arrays(
+        pa.array(codes[index].astype(np.int32)), pa.array(distinct.tolist(), type=pa.string()))
+
+
+def to_arrow(batch: BatchPlan, first_day: int = 1, days: Optional[Iterable[int]] = None):
+    """One row per (patient, nutrient, day) with a value, as a pyarrow Table.
+
+    first_day is the day number of batch.values[:, :, 0]; days keeps only those day numbers.
+    patient_id, category, nutrient, unit and per are dictionary-encoded. unit and per are those
+    of the template each patient was planned from: BatchPlan rows are keyed per unit, so
+    patients of different populations keep their own units for the same nutrient.
+    """
+    pa = _pyarrow()
+    n_patients, n_nutrients, n_days = batch.values.shape
+    day_numbers = np.arange(first_day, first_day + n_days)
+    present = ~np.isnan(batch.values)
+    if days is not None:
+        present &= np.isin(day_numbers, list(days))[None, None, :]
+    positions = np.flatnonzero(present)
+    patient = positions // (n_nutrients * n_days)
+    row = positions // n_days % n_nutrients
+    return pa.table({
+        "patient_id": _dictionary(pa, batch.patient_ids, patient),
+        "category": _dictionary(pa, batch.categories, row),
+        "nutrient": _dictionary(pa, batch.nutrients, row),
+        "day": pa.array(day_numbers[positions % n_days].astype(np.int16)),
+        "value": pa.array(batch.values.reshape(-1)[positions]),
+        "unit": _dictionary(pa, batch.units, row),
+        "per": _dictionary(pa, batch.per, row),
+    })
+
+
+def write_parquet(batches: Iterable[BatchPlan], root: str, first_day: int = 1,
+                  days: Optional[Iterable[int]] = None) -> List[int]:
+    """Write batches to a Parquet dataset under root, partitioned by day (root/day=N/...).
+
+    Day partitions that are written are replaced; other days already under root are left
+    alone, so an incremental run appends its new days without rewriting history.
+    Returns the day numbers written.
+    """
+    _pyarrow()
+    import pyarrow.parquet as pq
+    written: List[int] = []
+    for part, batch in enumerate(batches):
+        if part == 0:
+            written = list(range(first_day, first_day + batch.total_days))
+            if days is not None:
+                days = set(days)
+                written = [day for day in written if day in days]
+            for day in written:
+                shutil.rmtree(os.path.join(root, f"day={day}"), ignore_errors=True)
+        table = to_arrow(batch, first_day, days)
+        if table.num_rows:
+            pq.write_to_dataset(
+                table, root, partition_cols=["day"],
+                basename_template=f"part-{part}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+    return written
@@ -0,0 +1,185 @@
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from typing import Any, ContextManager, Dict, List, Optional, Tuple
+
+_NULL_SPAN = nullcontext()
+
+
+class PlannerHooks:
+    """Hook interface for timing planner stages. The base class does nothing.
+
+    Hooks cannot be shared with process pool workers, so workers record with their own hooks,
+    built from worker_config(), and send snapshot()s back to be merge()d into these.
+    """
+
+    def span(self, stage: str) -> ContextManager:
+        return _NULL_SPAN
+
+    def worker_config(self) -> Optional[Tuple[type, Dict[str, Any]]]:
+        """(class, kwargs) of the hooks worker processes should record with, None for none."""
+        return None
+
+    def snapshot(self) -> Any:
+        """What was recorded since the last snapshot(), in picklable form; recording starts over."""
+        return None
+
+    def merge(self, snapshot: Any):
+        """Add a snapshot() taken by the worker hooks of another process."""
+
+
+NULL_HOOKS = PlannerHooks()
+
+
+@dataclass
+class StageStats:
+    count: int = 0
+    total: float = 0.0
+    min: float = float("inf")
+    max: float = 0.0
+    peak_bytes: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        self.min = min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+
+    def merge(self, other: "StageStats"):
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.peak_bytes = max(self.peak_bytes, other.peak_bytes)
+
+
+class StatsCollector(PlannerHooks):
+    """Aggregates call count and wall time per stage across every planner sharing it."""
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.setdefault(stage, StageStats()).add(time.perf_counter() - start)
+
+    def report(self) -> Dict[str, dict]:
+        return {
+            stage: {"count": s.count, "total_s": s.total, "mean_s": s.mean, "min_s": s.min, "max_s": s.max,
+                    "peak_bytes": s.peak_bytes}
+            for stage, s in sorted(self.stages.items(), key=lambda item: -item[1].total)
+        }
+
+    def reset(self):
+        self.stages.clear()
+
+    def worker_config(self) -> Optional[Tuple[type, Dict[str, Any]]]:
+        return StatsCollector, {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        stages, self.stages = self.stages, {}
+        return {"stages": stages}
+
+    def merge(self, snapshot: Optional[Dict[str, Any]]):
+        if not snapshot:
+            return
+        for stage, stats in snapshot["stages"].items():
+            self.stages.setdefault(stage, StageStats()).merge(stats)
+
+
+class ProfilingCollector(StatsCollector):
+    """StatsCollector that also runs cProfile and/or records the tracemalloc peak of each stage.
+
+    Nested spans reset the shared tracemalloc peak, so an outer stage's peak only covers
+    the part after its last inner span.
+    """
+
+    def __init__(self, profile: bool = True, trace_memory: bool = True):
+        super().__init__()
+        self.profiler: Optional[cProfile.Profile] = cProfile.Profile() if profile else None
+        self.trace_memory = trace_memory
+        self._started_tracing = False
+        self._depth = 0
+        self._worker_profiles: List[dict] = []  # cProfile stats merged from worker processes
+
+    @contextmanager
+    def span(self, stage: str):
+        if self._depth == 0:
+            if self.profiler is not None:
+                self.profiler.enable()
+            if self.trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self._depth += 1
+        try:
+            with super().span(stage):
+                yield
+        finally:
+            self._depth -= 1
+            if self.trace_memory:
+                stats = self.stages[stage]
+                stats.peak_bytes = max(stats.peak_bytes, tracemalloc.get_traced_memory()[1])
+            if self._depth == 0 and self.profiler is not None:
+                self.profiler.disable()
+
+    def reset(self):
+        super().reset()
+        self._worker_profiles.clear()
+
+    def worker_config(self) -> Optional[Tuple[type, Dict[str, Any]]]:
+        return ProfilingCollector, {"profile": self.profiler is not None, "trace_memory": self.trace_memory}
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = super().snapshot()
+        if self.profiler is not None:
+            self.profiler.create_stats()
+            snapshot["profile"] = self.profiler.stats
+            self.profiler = cProfile.Profile()
+        return snapshot
+
+    def merge(self, snapshot: Optional[Dict[str, Any]]):
+        super().merge(snapshot)
+        if snapshot and snapshot.get("profile"):
+            self._worker_profiles.append(snapshot["profile"])
+
+    def profile_stats(self, sort: str = "cumulative", limit: Optional[int] = 25) -> str:
+        """Formatted cProfile output of everything run inside spans, in this process and merged workers."""
+        if self.profiler is None:
+            return ""
+        self.profiler.create_stats()
+        profiles = [_Profile(stats) for stats in (self.profiler.stats, *self._worker_profiles) if stats]
+        if not profiles:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(*profiles, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def stop(self):
+        """Stop tracemalloc if this collector started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+class _Profile:
+    """cProfile stats dict in the form pstats.Stats.add() loads."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
@@ -0,0 +1,170 @@
+import copy
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from modules.conditions import engine as condition_engine
+from modules.nutrient_plan import FrozenNutrientPlan, NutrientPlan, copy_plan
+from modules.planner import plan_engine
+from modules.planner.hooks import NULL_HOOKS, PlannerHooks
+from modules.planner.notes import PlanNote, format_notes, plan_notes
+from modules.planner.tpn_planner import active_conditions, reference_value
+
+Row = Tuple[str, str]
+
+# Stage -> the stages and inputs it is computed from
+DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    "base_plan": ("age", "weight"),  # through base_plan_key()
+    "patches": ("conditions",),
+    "entries": ("base_plan", "patches"),  # per nutrient
+    "schedules": ("entries", "total_days"),  # per nutrient
+    "reference_value": ("height", "weight", "gender"),
+    "values": ("schedules", "reference_value"),  # per nutrient; only per-kg rows read reference_value
+}
+ANTHROPOMETRIC_FIELDS = ("age", "height", "weight", "gender")
+
+
+@dataclass
+class _RowState:
+    entry: NutrientPlan
+    packed: plan_engine.PackedPlan  # one-row pack of entry
+    daily: np.ndarray  # unscaled values per day
+    values: np.ndarray  # scaled and rounded values per day
+    notes: Tuple[PlanNote, ...]
+
+
+def _entry(plan: Mapping[str, Mapping[str, FrozenNutrientPlan]], row: Row) -> Optional[FrozenNutrientPlan]:
+    return plan.get(row[0], {}).get(row[1])
+
+
+class IncrementalPlanner:
+    """A TpnPlanner that keeps every intermediate stage and, when one input changes,
+    recomputes only the stages (and nutrients) that depend on it; see DEPENDENCIES.
+
+    A weight change that keeps the patient's brackets only rescales per-kg rows; toggling
+    a condition only rebuilds the nutrients its patches land on. Output is identical to
+    TpnPlanner.generate_daily_plan for the same inputs.
+    """
+
+    def __init__(self, patient, total_days: int = 7, hooks: Optional[PlannerHooks] = None):
+        self.patient = copy.copy(patient)
+        self.patient.conditions = dict(patient.conditions or {})
+        self.total_days = total_days
+        self.hooks = hooks or NULL_HOOKS
+        self.base_key = self.patient.base_plan_key()
+        self.base_plan = self.patient.cached_base_plan()
+        self.conditions = active_conditions(self.patient)
+        self.targets = self._targets()
+        self.ref_value = reference_value(self.patient)
+        self.rows: Dict[Row, _RowState] = {}
+        self.recomputed: Set[Row] = set()  # rows rebuilt by the last change
+        self.rescaled: Set[Row] = set()  # rows only rescaled by the last change
+        self._rebuild(self._all_rows())
+
+    def _all_rows(self) -> List[Row]:
+        return [(category, nutrient) for category, nutrients in self.base_plan.items() for nutrient in nutrients]
+
+    def _targets(self) -> Dict[Row, Tuple[condition_engine.Patch, ...]]:
+        with self.hooks.span("resolve_conditions"):
+            patches = condition_engine.resolve_conditions(self.conditions) if self.conditions else ()
+            return condition_engine.patch_targets(self.base_plan, patches)
+
+    def _rebuild(self, rows: Iterable[Row]):
+        """Recompute entry, schedule and values of rows from the base plan and patches."""
+        with self.hooks.span("incremental_rows"):
+            for category, nutrient in rows:
+                row = category, nutrient
+                self.recomputed.add(row)
+                plan = copy_plan({category: {nutrient: self.base_plan[category][nutrient]}})
+                condition_engine.apply_patches(plan, self.targets.get(row, ()))
+                entry = plan[category].get(nutrient)
+                if entry is None:  # dropped by a condition
+                    self.rows.pop(row, None)
+                    continue
+                packed = plan_engine.pack_plan(plan)
+                daily = plan_engine.daily_values(packed, self.total_days)[0]
+                self.rows[row] = _RowState(entry, packed, daily, self._scale(packed, daily), plan_notes(plan))
+
+    def _scale(self, packed: plan_engine.PackedPlan, daily: np.ndarray) -> np.ndarray:
+        return plan_engine.scale_values(packed, daily[None, :], self.ref_value)[0]
+
+    def update(self, total_days: Optional[int] = None, conditions: Optional[Dict] = None, **fields) -> Set[Row]:
+        """Change patient fields (age, height, weight, gender), conditions or total_days.
+
+        Returns the rows whose values changed.
+        """
+        self.recomputed, self.rescaled = set(), set()
+        unknown = set(fields) - set(ANTHROPOMETRIC_FIELDS)
+        if unknown:
+            raise TypeError(f"cannot update {', '.join(sorted(unknown))}")
+        if fields:
+            for name, value in fields.items():
+                setattr(self.patient, name, value)
+            self.patient.__post_init__()
+        dirty: Set[Row] = set()
+
+        base_key = self.patient.base_plan_key()
+        if base_key != self.base_key:
+            old_plan = self.base_plan
+            self.base_key, self.base_plan = base_key, self.patient.cached_base_plan()
+            dirty.update(row for row in self._all_rows() if _entry(old_plan, row) != _entry(self.base_plan, row))
+            for row in [row for row in self.rows if _entry(self.base_plan, row) is None]:
+                del self.rows[row]
+
+        if conditions is not None:
+            self.patient.conditions = dict(conditions)
+        new_conditions = active_conditions(self.patient)
+        if new_conditions != self.conditions or dirty:
+            old_targets = self.targets
+            self.conditions = new_conditions
+            self.targets = self._targets()
+            dirty.update(row for row in old_targets.keys() | self.targets.keys()
+                         if old_targets.get(row) != self.targets.get(row))
+
+        if total_days is not None and total_days != self.total_days:
+            self.total_days = total_days
+            dirty.update(self._all_rows())
+
+        # Rebuilt rows are scaled with the new reference weight, the others are rescaled below
+        ref_value = reference_value(self.patient)
+        rescale = ref_value != self.ref_value
+        self.ref_value = ref_value
+        self._rebuild(row for row in self._all_rows() if row in dirty)
+
+        if rescale:
+            with self.hooks.span("incremental_rescale"):
+                for row, state in self.rows.items():
+                    if state.packed.scale[0] and row not in self.recomputed:
+                        state.values = self._scale(state.packed, state.daily)
+                        self.rescaled.add(row)
+        return self.recomputed | self.rescaled
+
+    def set_condition(self, condition_type, active: bool = True) -> Set[Row]:
+        """Switch one condition on or off."""
+        conditions = dict(self.patient.conditions)
+        conditions[condition_type] = active
+        return self.update(conditions=conditions)
+
+    @property
+    def final_plan(self) -> Dict[str, Dict[str, NutrientPlan]]:
+        plan: Dict[str, Dict[str, NutrientPlan]] = {}
+        for category, nutrient in self._all_rows():
+            state = self.rows.get((category, nutrient))
+            if state is not None:
+                plan.setdefault(category, {})[nutrient] = state.entry
+        return plan
+
+    @property
+    def notes(self) -> List[PlanNote]:
+        return [note for row in self._all_rows() if row in self.rows for note in self.rows[row].notes]
+
+    def formatted_notes(self) -> List[str]:
+        return format_notes(self.notes)
+
+    def generate_daily_plan(self) -> pd.DataFrame:
+        """The current pivoted daily plan, assembled from the cached per-nutrient values."""
+        rows = [row for row in self._all_rows() if row in self.rows]
+        index = pd.MultiIndex.from_tuples(rows, names=["Category", "Nutrient"])
+        matrix = np.array([self.rows[row].values for row in rows]).reshape(len(rows), self.total_days)
+        df = pd.DataFrame(matrix, index=index, columns=pd.Index(range(1, self.total_days + 1), name="Day"))
+        return df.dropna(how="all").sort_index()
@@ -0,0 +1,173 @@
+"""Micro-batching of online plan requests.
+
+Requests that arrive within a short window (or until max_batch of them are waiting) are
+planned together by one BatchPlanner pass, so each pays a share of one vectorized batch
+instead of a TpnPlanner and a pivoted DataFrame of its own.
+
+    async with MicroBatcher(window=0.005, max_batch=256) as batcher:
+        result = await batcher.plan(patient)
+        result.values  # nutrient x day array; result.frame() pivots it on demand
+    batcher.stats()  # p50/p99 latency, throughput, batch sizes
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass
+import time
+import numpy as np
+import pandas as pd
+from typing import Deque, Dict, List, Optional, Tuple
+from modules.planner.batch_planner import BatchPlan, BatchPlanner
+from modules.planner.hooks import PlannerHooks
+from modules.planner.notes import PlanNote
+
+
+@dataclass
+class PlanSlice:
+    """One request's share of a batch."""
+    batch: BatchPlan
+    index: int
+
+    @property
+    def values(self) -> np.ndarray:
+        """nutrient x day values, rows as in batch.categories / batch.nutrients (NaN where absent)."""
+        return self.batch.values[self.index]
+
+    @property
+    def notes(self) -> Tuple[PlanNote, ...]:
+        return self.batch.notes(self.index)
+
+    def frame(self) -> pd.DataFrame:
+        """Pivoted plan, same shape as TpnPlanner.generate_daily_plan."""
+        return self.batch.frame(self.index)
+
+
+class MicroBatcher:
+    """Collects plan requests for up to window seconds or max_batch requests, then plans them as one batch.
+
+    window and max_batch can be changed while running; they apply from the next batch. Batches
+    run one at a time on the executor (the loop's default one if None), and requests arriving
+    meanwhile form the next batch. One BatchPlanner is kept per total_days, so templates are
+    reused across batches.
+    """
+
+    def __init__(self, window: float = 0.005, max_batch: int = 256, executor: Optional[Executor] = None,
+                 hooks: Optional[PlannerHooks] = None, latency_samples: int = 10_000):
+        self.window = window
+        self.max_batch = max_batch
+        self.executor = executor
+        self.hooks = hooks
+        self._planners: Dict[int, BatchPlanner] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self._batch_sizes: Deque[int] = deque(maxlen=latency_samples)
+        self.completed = 0
+        self.failed = 0
+        self._first_submit: Optional[float] = None
+        self._last_done: Optional[float] = None
+
+    async def start(self):
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        """Plan the requests still waiting, then stop collecting."""
+        if self._collector is None:
+            return
+        await self._queue.join()
+        self._collector.cancel()
+        await asyncio.gather(self._collector, return_exceptions=True)
+        self._collector = None
+
+    async def __aenter__(self) -> "MicroBatcher":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def plan(self, patient, total_days: int = 7) -> PlanSlice:
+        if self._collector is None:
+            raise RuntimeError("MicroBatcher is not started")
+        submitted = time.perf_counter()
+        if self._first_submit is None:
+            self._first_submit = submitted
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((patient, total_days, submitted, future))
+        return await future
+
+    def _take(self, batch: List):
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            self._take(batch)
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+                self._take(batch)
+            try:
+                await self._run(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _run(self, requests: List):
+        loop = asyncio.get_running_loop()
+        self._batch_sizes.append(len(requests))
+        by_days: Dict[int, List] = {}
+        for request in requests:
+            by_days.setdefault(request[1], []).append(request)
+        for total_days, group in by_days.items():
+            planner = self._planners.get(total_days)
+            if planner is None:
+                planner = self._planners[total_days] = BatchPlanner(total_days, hooks=self.hooks)
+            try:
+                batch = await loop.run_in_executor(self.executor, planner.plan_serial, [request[0] for request in group])
+            except Exception as exc:
+                self.failed += len(group)
+                for _, _, _, future in group:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            done = time.perf_counter()
+            for i, (_, _, submitted, future) in enumerate(group):
+                if not future.done():  # the caller may have been cancelled
+                    future.set_result(PlanSlice(batch, i))
+                self._latencies.append(done - submitted)
+            self.completed += len(group)
+            self._last_done = done
+
+    def stats(self) -> dict:
+        """Latency percentiles (seconds) over the last latency_samples requests, throughput and batch sizes."""
+        latencies = np.fromiter(self._latencies, dtype=float)
+        sizes = np.fromiter(self._batch_sizes, dtype=float)
+        elapsed = (self._last_done - self._first_submit) if self._last_done is not None else 0.0
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "batches": len(sizes),
+            "mean_batch_size": float(sizes.mean()) if len(sizes) else 0.0,
+            "p50_s": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "p99_s": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            "throughput_per_s": self.completed / elapsed if elapsed > 0 else 0.0,
+            "window_s": self.window,
+            "max_batch": self.max_batch,
+        }
+
+    def reset_stats(self):
+        self._latencies.clear()
+        self._batch_sizes.clear()
+        self.completed = self.failed = 0
+        self._first_submit = self._last_done = None
@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from modules.nutrient_plan import NutrientPlan
+
+
+@dataclass(frozen=True)
+class PlanNote:
+    """A note attached to one nutrient of a plan; formatted only when asked for."""
+    category: str
+    nutrient: str
+    guideline: Optional[str]
+    text: str
+
+    def format(self) -> str:
+        return f"{self.category} - {self.nutrient}: {self.text}"
+
+    def __str__(self) -> str:
+        return self.format()
+
+
+def plan_notes(plan_dict: Dict[str, Dict[str, NutrientPlan]]) -> Tuple[PlanNote, ...]:
+    """Notes of every nutrient in a plan that has one."""
+    notes = []
+    for category, nutrients in plan_dict.items():
+        for nutrient_name, plan in nutrients.items():
+            if plan.notes:
+                guidelines = plan.guidelines
+                if guidelines is not None and not isinstance(guidelines, str):
+                    guidelines = ", ".join(guidelines)
+                notes.append(PlanNote(category, nutrient_name, guidelines, plan.notes))
+    return tuple(notes)
+
+
+def format_notes(notes: Iterable[PlanNote]) -> List[str]:
+    return [note.format() for note in notes]
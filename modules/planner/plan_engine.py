@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+import statistics
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from modules.nutrient_plan import NutrientPlan
+from modules.planner.schedule import schedule_values
+from modules.units import resolve as resolve_units
+
+
+def midpoint(values: Optional[List[float]]) -> Optional[float]:
+    """Midpoint of a range, or None if the range is missing/incomplete."""
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    if all(v is not None for v in values):
+        return round(statistics.mean(values), 3)
+    return None
+
+
+def round3(values: np.ndarray) -> np.ndarray:
+    """Round to 3 decimals like the builtin round(), fixing up near-ties numpy rounds differently."""
+    out = np.round(values, 3)
+    scaled = values * 1000
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        out[ties] = [round(float(v), 3) for v in values[ties]]
+    return out
+
+
+@dataclass
+class PackedPlan:
+    """A plan dict flattened into parallel arrays, one row per nutrient."""
+    categories: List[str]
+    nutrients: List[str]
+    units: List[str]  # unit of the scaled values, see modules.units.resolve
+    per: List[str]  # reference unit of the scaled values, day for per-kg doses
+    initial: np.ndarray  # midpoint of initial_range, NaN if missing
+    goal: np.ndarray  # midpoint of goal_range, falls back to initial
+    days_to_goal: np.ndarray
+    steps: np.ndarray  # midpoints of daily_intake_range, NaN-padded to the longest schedule
+    step_counts: np.ndarray  # 0 for rows without daily_intake_range
+    scale: np.ndarray  # True if the row is multiplied by the reference weight
+    factor: np.ndarray  # constant unit-conversion factor of each row
+
+    def __len__(self) -> int:
+        return len(self.nutrients)
+
+
+def pack_plan(plan_dict: Dict[str, Dict[str, NutrientPlan]]) -> PackedPlan:
+    """Pack every NutrientPlan of a plan dict into arrays."""
+    categories, nutrients, units, per = [], [], [], []
+    initial, goal, days_to_goal, steps, scale, factor = [], [], [], [], [], []
+    for category, plans in plan_dict.items():
+        for nutrient_name, plan in plans.items():
+            init = midpoint(plan.initial_range)
+            end = midpoint(plan.goal_range) or init
+            daily = [midpoint(day) for day in plan.daily_intake_range or ()]
+            conversion = resolve_units(plan.measurement_unit, plan.reference_unit, nutrient_name)
+            categories.append(category)
+            nutrients.append(nutrient_name)
+            units.append(conversion.unit)
+            per.append(conversion.per)
+            initial.append(np.nan if init is None else init)
+            goal.append(np.nan if end is None else end)
+            days_to_goal.append(plan.days_to_goal or 0)
+            steps.append([np.nan if v is None else v for v in daily])
+            scale.append(conversion.per_weight)
+            factor.append(conversion.factor)
+    width = max((len(row) for row in steps), default=0)
+    return PackedPlan(
+        categories=categories,
+        nutrients=nutrients,
+        units=units,
+        per=per,
+        initial=np.array(initial, dtype=float),
+        goal=np.array(goal, dtype=float),
+        days_to_goal=np.array(days_to_goal, dtype=int),
+        steps=np.array([row + [np.nan] * (width - len(row)) for row in steps], dtype=float).reshape(len(steps), width),
+        step_counts=np.array([len(row) for row in steps], dtype=int),
+        scale=np.array(scale, dtype=bool),
+        factor=np.array(factor, dtype=float),
+    )
+
+
+def daily_values(packed: PackedPlan, total_days: int, days: Optional[np.ndarray] = None) -> np.ndarray:
+    """Compute the unscaled nutrient x day matrix from the plan's ramp and step schedules."""
+    start = np.where(np.isnan(packed.initial), packed.goal, packed.initial)
+    values = schedule_values(start, packed.goal, packed.days_to_goal, packed.steps, packed.step_counts, total_days, days)
+    return round3(values)
+
+
+def row_factors(packed: PackedPlan, ref_value) -> np.ndarray:
+    """Per-row multiplier: the unit-conversion factor, times the reference weight for per-kg rows.
+
+    ref_value may be an array of weights, giving one row of factors per weight.
+    """
+    ref_value = np.asarray(ref_value, dtype=float)[..., None]
+    return np.where(packed.scale, packed.factor * ref_value, packed.factor)
+
+
+def scale_values(packed: PackedPlan, values: np.ndarray, ref_value: float) -> np.ndarray:
+    """Convert the unscaled nutrient x day matrix into each row's target unit (see modules.units)."""
+    return round3(values * row_factors(packed, ref_value)[:, None])
+
+
+def daily_matrix(packed: PackedPlan, total_days: int, ref_value: float, days: Optional[np.ndarray] = None) -> np.ndarray:
+    """Compute the nutrient x day matrix of scaled values, optionally for some days only."""
+    return scale_values(packed, daily_values(packed, total_days, days), ref_value)
+
+
+def to_frame(packed: PackedPlan, matrix: np.ndarray) -> pd.DataFrame:
+    """Build the pivoted (Category, Nutrient) x Day frame from a matrix."""
+    index = pd.MultiIndex.from_arrays([packed.categories, packed.nutrients], names=["Category", "Nutrient"])
+    columns = pd.Index(range(1, matrix.shape[1] + 1), name="Day")
+    df = pd.DataFrame(matrix, index=index, columns=columns)
+    return df.dropna(how="all").sort_index()
+
+
+def frame_rows(packed: PackedPlan):
+    """Row order and (Category, Nutrient) index of the rows that have any value, sorted like to_frame()."""
+    start = np.where(np.isnan(packed.initial), packed.goal, packed.initial)
+    has_values = ~np.isnan(start) | np.any(~np.isnan(packed.steps), axis=1)
+    order = np.array(sorted(np.flatnonzero(has_values), key=lambda i: (packed.categories[i], packed.nutrients[i])), dtype=int)
+    index = pd.MultiIndex.from_arrays([[packed.categories[i] for i in order], [packed.nutrients[i] for i in order]],
+                                      names=["Category", "Nutrient"])
+    return order, index
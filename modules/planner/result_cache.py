@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+from modules import guidelines
+from modules.planner.tpn_planner import active_conditions, reference_value
+
+
+class PlanResultCache:
+    """Bounded LRU cache of generated plans keyed by a patient-parameter fingerprint.
+
+    Entries are dropped wholesale when guidelines.invalidate() is called.
+    """
+
+    def __init__(self, maxsize: int = 1024, weight_resolution: float = 0.1):
+        self.maxsize = maxsize
+        self.weight_resolution = weight_resolution
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._version = guidelines.version()
+
+    def fingerprint(self, patient, total_days: int) -> Tuple[Hashable, ...]:
+        """(base-plan key, dosing weight in resolution steps, active conditions, total_days)."""
+        weight_step = round(reference_value(patient) / self.weight_resolution)
+        return patient.base_plan_key(), weight_step, active_conditions(patient), total_days
+
+    def _check_version(self):
+        if self._version != guidelines.version():
+            self._entries.clear()
+            self._version = guidelines.version()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        self._check_version()
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> Any:
+        self._check_version()
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one entry, or every entry if no key is given."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+    def __len__(self) -> int:
+        return len(self._entries)
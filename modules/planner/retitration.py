@@ -0,0 +1,127 @@
+import copy
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+from modules.planner import plan_engine
+from modules.planner.schedule import schedule_values
+from modules.planner.tpn_planner import TpnPlanner, reference_value
+
+FLUID_NUTRIENTS = ("fluid",)
+
+
+@dataclass
+class Observation:
+    """What actually happened on one day of a running plan."""
+    day: int  # 1-based plan day
+    delivered_volume: Optional[float] = None  # mL actually infused that day
+    weight: Optional[float] = None  # kg measured that day
+
+
+class RetitrationPlanner:
+    """Revises a running plan from daily observations, recomputing only the days after each one.
+
+    - delivered_volume below the planned fluid volume means the patient got that fraction of
+      every nutrient; ramping rows restart from the delivered amount and reach their goal
+      over the ramp days that were left (rows already at goal re-titrate over their own
+      days_to_goal, at least one day). Day-indexed daily_intake_range rows keep their steps.
+    - weight updates the patient's dosing weight; per-kg rows are rescaled from the next day.
+      A weight that moves the patient into another bracket (another base_plan_key()) re-plans
+      the remaining days from the new base plan.
+    Days up to the observed day are history and never change.
+    """
+
+    def __init__(self, planner: TpnPlanner):
+        self.observations: List[Observation] = []
+        self.patient = copy.copy(planner.patient)
+        self.total_days = planner.total_days
+        self.ref_value = reference_value(self.patient)
+        self._load(planner)
+
+    def _load(self, planner: TpnPlanner):
+        """Take packed rows and schedules from planner; values are (re)computed for every day."""
+        self.planner = planner
+        self.base_key = planner.patient.base_plan_key()
+        self.packed = planner.prepare()
+        self.daily = plan_engine.daily_values(self.packed, self.total_days)  # unscaled, revised in place
+        self.values = plan_engine.scale_values(self.packed, self.daily, self.ref_value)
+        self.ramp_length = np.where(self.packed.days_to_goal > 0, self.packed.days_to_goal, max(self.total_days - 1, 0))
+        self.ramp_start = np.zeros(len(self.packed), dtype=int)  # 0-based day each row's current ramp starts
+        self.order, self.index = plan_engine.frame_rows(self.packed)
+        fluid = [i for i, nutrient in enumerate(self.packed.nutrients) if nutrient in FLUID_NUTRIENTS]
+        self.fluid_row = fluid[0] if fluid else None
+
+    def _replan(self, day: int):
+        """Re-plan from the patient's new base plan, keeping days up to day as they were.
+
+        Rows only the new plan has start without history; rows it lacks are dropped.
+        """
+        old_rows = {row: i for i, row in enumerate(zip(self.packed.categories, self.packed.nutrients))}
+        old_daily, old_values = self.daily, self.values
+        self._load(TpnPlanner(self.patient, self.total_days))
+        history = np.arange(day)
+        self.values[:, history] = np.nan
+        for i, row in enumerate(zip(self.packed.categories, self.packed.nutrients)):
+            old = old_rows.get(row)
+            if old is not None:
+                self.daily[i, history] = old_daily[old, history]
+                self.values[i, history] = old_values[old, history]
+
+    @property
+    def last_observed_day(self) -> int:
+        return self.observations[-1].day if self.observations else 0
+
+    def planned_volume(self, day: int) -> Optional[float]:
+        """Planned fluid volume in mL for a 1-based day, or None if the plan has no fluid row."""
+        if self.fluid_row is None:
+            return None
+        return self.daily[self.fluid_row, day - 1] * plan_engine.row_factors(self.packed, self.ref_value)[self.fluid_row]
+
+    def observe(self, observation: Observation) -> pd.DataFrame:
+        """Apply one day's observation and return the revised remaining days."""
+        day = observation.day
+        if not self.last_observed_day < day <= self.total_days:
+            raise ValueError(f"day {day} must be after day {self.last_observed_day} and within {self.total_days} days")
+        self.observations.append(observation)
+        remaining = np.arange(day, self.total_days)  # 0-based days after the observed one
+
+        planned = self.planned_volume(day)
+        fraction = 1.0
+        if observation.delivered_volume is not None and planned:
+            fraction = min(observation.delivered_volume / planned, 1.0)
+
+        if observation.weight is not None:
+            self.patient.weight = observation.weight
+            self.patient.__post_init__()
+            self.ref_value = reference_value(self.patient)
+            if self.patient.base_plan_key() != self.base_key:
+                self._replan(day)
+
+        if fraction < 1.0:
+            self._restart_ramps(day, fraction, remaining)
+
+        if len(remaining):
+            self.values[:, remaining] = plan_engine.scale_values(self.packed, self.daily[:, remaining], self.ref_value)
+        return self.frame(remaining)
+
+    def _restart_ramps(self, day: int, fraction: float, remaining: np.ndarray):
+        ramps = (self.packed.step_counts == 0) & (self.ramp_length > 0)
+        delivered = self.daily[:, day - 1] * fraction
+        # Ramp days left after the observed day; rows already at goal start a fresh titration
+        left = self.ramp_start + self.ramp_length - (day - 1)
+        at_goal = (left <= 0) | (self.daily[:, day - 1] == self.packed.goal)
+        left = np.maximum(np.where(at_goal, self.packed.days_to_goal, left), 1)
+        offsets = remaining - (day - 1)  # 1 = the day after the observation
+        revised = schedule_values(
+            delivered, self.packed.goal, left, self.packed.steps[:, :0], np.zeros(len(self.packed), dtype=int),
+            self.total_days, offsets)
+        rows = np.flatnonzero(ramps & ~np.isnan(self.packed.goal))
+        self.daily[np.ix_(rows, remaining)] = plan_engine.round3(revised[rows])
+        self.ramp_start[rows] = day - 1
+        self.ramp_length[rows] = left[rows]
+
+    def frame(self, days: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """The current plan (or some 0-based days of it) as a (Category, Nutrient) x Day frame."""
+        if days is None:
+            days = np.arange(self.total_days)
+        return pd.DataFrame(self.values[np.ix_(self.order, days)], index=self.index, columns=pd.Index(days + 1, name="Day"))
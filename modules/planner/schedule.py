@@ -0,0 +1,50 @@
+from functools import lru_cache
+import numpy as np
+from typing import Optional, Tuple
+
+
+def _indices(days_to_goal: np.ndarray, step_counts: np.ndarray, total_days: int, day: np.ndarray):
+    ramp_length = np.where(days_to_goal > 0, days_to_goal, max(total_days - 1, 0))
+    ramp_index = np.minimum(day[None, :], ramp_length[:, None])
+    last_step = np.maximum(step_counts - 1, 0)
+    step_index = np.minimum(day[None, :], last_step[:, None])
+    return ramp_index, ramp_length, step_index
+
+
+@lru_cache(maxsize=256)
+def schedule_indices(days_to_goal: Tuple[int, ...], step_counts: Tuple[int, ...], total_days: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-day index matrices for a plan shape, shared by every plan with that shape.
+
+    Returns (ramp_index, ramp_length, step_index):
+    - ramp rows reach their goal after days_to_goal days and plateau there; rows without
+      days_to_goal ramp linearly across total_days. Day i's value is
+      start + ramp_index[:, i] * (goal - start) / ramp_length.
+    - step rows (daily_intake_range) use step step_index[:, i], holding the last step.
+    """
+    ramp_index, ramp_length, step_index = _indices(
+        np.asarray(days_to_goal, dtype=int), np.asarray(step_counts, dtype=int), total_days, np.arange(total_days))
+    for array in (ramp_index, ramp_length, step_index):
+        array.flags.writeable = False
+    return ramp_index, ramp_length, step_index
+
+
+def schedule_values(start: np.ndarray, goal: np.ndarray, days_to_goal: np.ndarray,
+                    steps: np.ndarray, step_counts: np.ndarray, total_days: int,
+                    days: Optional[np.ndarray] = None) -> np.ndarray:
+    """Unrounded nutrient x day values for ramp and step schedules.
+
+    days selects 0-based day offsets to compute (e.g. one streaming chunk); by default
+    the whole plan is computed from the cached index matrices.
+    """
+    if days is None:
+        ramp_index, ramp_length, step_index = schedule_indices(
+            tuple(days_to_goal.tolist()), tuple(step_counts.tolist()), total_days)
+    else:
+        ramp_index, ramp_length, step_index = _indices(days_to_goal, step_counts, total_days, days)
+    step = np.divide(goal - start, ramp_length, out=np.zeros_like(goal), where=ramp_length > 0)
+    values = start[:, None] + ramp_index * step[:, None]
+    values = np.where(ramp_length[:, None] == 0, goal[:, None], values)
+    if steps.shape[1]:
+        stepped = np.take_along_axis(steps, step_index, axis=1)
+        values = np.where(step_counts[:, None] > 0, stepped, values)
+    return values
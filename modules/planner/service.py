@@ -0,0 +1,201 @@
+"""Asyncio service layer for planning patients from several front-ends at once.
+
+PlanningService queues requests on a bounded asyncio.Queue and runs TpnPlanner in an
+executor. Concurrent requests for the same patient fingerprint share one computation.
+PlanningClient is an in-process client that takes and returns plain dicts:
+
+    async with PlanningService() as service:
+        response = await PlanningClient(service).plan({"patient_id": "A1", "age": 54, ...})
+"""
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+import pandas as pd
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+from modules.census import POPULATION_CONDITIONS, POPULATIONS, flag
+from modules.planner.notes import PlanNote, format_notes
+from modules.planner.result_cache import PlanResultCache
+from modules.planner.tpn_planner import TpnPlanner, active_conditions, reference_value
+
+
+class ServiceBusy(RuntimeError):
+    """The request queue is full and the caller asked not to wait."""
+
+
+@dataclass
+class PlanResult:
+    frame: pd.DataFrame
+    notes: Tuple[PlanNote, ...]
+
+
+def fingerprint(patient, total_days: int) -> Tuple[Hashable, ...]:
+    """Inputs that decide a patient's plan; requests with equal fingerprints are coalesced."""
+    return patient.base_plan_key(), reference_value(patient), active_conditions(patient), total_days
+
+
+def compute_plan(patient, total_days: int) -> Tuple[pd.DataFrame, Tuple[PlanNote, ...]]:
+    """Plan one patient; runs in the executor, so it must stay picklable for process pools."""
+    planner = TpnPlanner(patient, total_days)
+    return planner.generate_daily_plan(), tuple(planner.notes)
+
+
+class PlanningService:
+    """Plans patients on an executor behind a bounded queue, coalescing identical requests.
+
+    max_pending bounds the queue: plan() waits for room (backpressure), or raises ServiceBusy
+    with wait=False. concurrency workers drain the queue; by default each owns one thread of
+    a private ThreadPoolExecutor. A ProcessPoolExecutor may be passed instead.
+    """
+
+    def __init__(self, max_pending: int = 64, concurrency: int = 2, executor: Optional[Executor] = None,
+                 cache: Optional[PlanResultCache] = None):
+        self.max_pending = max_pending
+        self.concurrency = concurrency
+        self.cache = cache
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._inflight: Dict[Tuple[Hashable, ...], asyncio.Future] = {}
+        self.submitted = 0
+        self.computed = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+        self.rejected = 0
+
+    async def start(self):
+        if self._workers:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="tpn-plan")
+        self._queue = asyncio.Queue(self.max_pending)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Finish the queued requests, then stop the workers (and the executor if it is ours)."""
+        if not self._workers:
+            return
+        await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._owns_executor:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def __aenter__(self) -> "PlanningService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def plan(self, patient, total_days: int = 7, wait: bool = True) -> PlanResult:
+        """Plan a patient. Each caller gets its own copy of the frame."""
+        if not self._workers:
+            raise RuntimeError("PlanningService is not started")
+        self.submitted += 1
+        if self.cache is not None:
+            cache_key = self.cache.fingerprint(patient, total_days)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                self.cache_hits += 1
+                return PlanResult(entry[0].copy(), entry[1])
+
+        key = fingerprint(patient, total_days)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            if not wait and self._queue.full():
+                self.rejected += 1
+                raise ServiceBusy(f"{self.max_pending} plan requests already pending")
+            future = asyncio.get_running_loop().create_future()
+            # Nobody may be left to await a failed computation
+            future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            await self._queue.put((key, patient, total_days, future))
+            # Registered only once queued, so a caller cancelled while waiting for room never
+            # leaves behind a future that nothing will resolve. Callers queued meanwhile for the
+            # same key run their own computation.
+            self._inflight.setdefault(key, future)
+        # shield: a cancelled caller must not cancel the computation other callers share
+        frame, notes = await asyncio.shield(future)
+        if self.cache is not None:
+            self.cache.put(cache_key, (frame, notes))
+        return PlanResult(frame.copy(), notes)
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            key, patient, total_days, future = await self._queue.get()
+            try:
+                result = await loop.run_in_executor(self._executor, compute_plan, patient, total_days)
+                self.computed += 1
+                future.set_result(result)
+            except Exception as exc:
+                future.set_exception(exc)
+            finally:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {"submitted": self.submitted, "computed": self.computed, "coalesced": self.coalesced,
+                "cache_hits": self.cache_hits, "rejected": self.rejected, "pending": self.pending,
+                "in_flight": len(self._inflight)}
+
+
+def patient_from_request(request: dict):
+    """Patient for a request dict with the census columns (see modules.census).
+
+    conditions is a list of condition keys, e.g. ["sepsis", "aki"].
+    """
+    population = request.get("population") or "adult"
+    patient_type = POPULATIONS.get(population)
+    if patient_type is None:
+        raise ValueError(f"patient {request.get('patient_id')}: unknown population '{population}'")
+    condition_types = POPULATION_CONDITIONS.get(population, {})
+    requested = set(request.get("conditions") or ())
+    unknown = requested - set(condition_types)
+    if unknown:
+        raise ValueError(f"patient {request.get('patient_id')}: unknown condition(s) {', '.join(sorted(unknown))}")
+    return patient_type(
+        name=str(request["patient_id"]),
+        age=request["age"],
+        height=float(request["height"]),
+        weight=float(request["weight"]),
+        gender=flag(request["gender"]),
+        conditions={condition: key in requested for key, condition in condition_types.items()},
+    )
+
+
+class PlanningClient:
+    """In-process client: the dict-in, dict-out calls a front-end would make over the wire."""
+
+    def __init__(self, service: PlanningService):
+        self.service = service
+
+    async def plan(self, request: dict) -> dict:
+        """Plan one request; the response holds the plan as {"Category.Nutrient": [day values]}."""
+        total_days = int(request.get("days", 7))
+        result = await self.service.plan(patient_from_request(request), total_days, wait=request.get("wait", True))
+        return {
+            "patient_id": str(request["patient_id"]),
+            "days": total_days,
+            "plan": {f"{category}.{nutrient}": [None if pd.isna(value) else value for value in row]
+                     for (category, nutrient), row in zip(result.frame.index, result.frame.to_numpy().tolist())},
+            "notes": format_notes(result.notes),
+        }
+
+    async def plan_many(self, requests: Iterable[dict]) -> List[dict]:
+        """Plan requests concurrently; a failed request's response is {"patient_id", "error"}."""
+        requests = list(requests)
+        responses = await asyncio.gather(*(self.plan(request) for request in requests), return_exceptions=True)
+        return [{"patient_id": str(request.get("patient_id")), "error": str(response)}
+                if isinstance(response, Exception) else response
+                for request, response in zip(requests, responses)]
@@ -1,106 +1,123 @@
-from copy import deepcopy
-import statistics
+import numpy as np
 import pandas as pd
-from typing import List, Optional
-from modules.nutrient_plan import NutrientPlan
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+from modules.nutrient_plan import copy_plan
+from modules.planner import plan_engine
+from modules.planner.hooks import NULL_HOOKS, PlannerHooks
+from modules.planner.notes import PlanNote, format_notes, plan_notes
+from modules.conditions import engine as condition_engine
+
+if TYPE_CHECKING:  # result_cache imports this module
+    from modules.planner.result_cache import PlanResultCache
+
+
+def reference_value(patient) -> float:
+    """Return IBW or weight if available, else 1 (anthropometrics.dosing_weight for one patient)."""
+    return patient.ibw or patient.weight or 1
+
+
+def active_conditions(patient) -> frozenset:
+    """Condition types switched on for a patient."""
+    conditions = getattr(patient, "conditions", None) or {}
+    return frozenset(condition for condition, active in conditions.items() if active)
+
 
 class TpnPlanner:
-    def __init__(self, patient, total_days: int = 7):
+    def __init__(self, patient, total_days: int = 7, cache: Optional["PlanResultCache"] = None,
+                 hooks: Optional[PlannerHooks] = None, patches: Optional[Tuple[condition_engine.Patch, ...]] = None):
+        """patches, when given, are the already resolved patches of the patient's conditions
+        (e.g. ConditionRegistry.patches(mask)) and are applied instead of resolving them again."""
         self.patient = patient
         self.total_days = total_days
-        self.base_plan = deepcopy(patient.get_base_plan())
-        self.final_plan = deepcopy(self.base_plan)
-        self.notes: List[str] = []
+        self.cache = cache
+        self.hooks = hooks or NULL_HOOKS
+        self.patches = patches
+        with self.hooks.span("get_base_plan"):
+            self.base_plan = patient.cached_base_plan()  # shared across planners, read-only
+        with self.hooks.span("copy_plan"):
+            self.final_plan = copy_plan(self.base_plan)
+        self.notes: List[PlanNote] = []
+        self.packed: Optional[plan_engine.PackedPlan] = None
 
     def midpoint(self, values: Optional[List[float]]) -> Optional[float]:
-        if not values:
-            return None
-        if len(values) == 1:
-            return values[0]
-        if all(v is not None for v in values):
-            return round(statistics.mean(values), 3)
-        return None
-
-    def interpolate(self, start: Optional[float], end: Optional[float], days: int) -> List[Optional[float]]:
-        """Linearly interpolate between start and end over number of days."""
-        if start is None and end is None:
-            return [None] * days
-        if days <= 1:
-            return [round(end, 3) if end is not None else None]
-        if start is None:
-            return [round(end, 3)] * days
-        if end is None:
-            return [round(start, 3)] * days
-        step = (end - start) / (days - 1)
-        return [round(start + i * step, 3) for i in range(days)]
+        return plan_engine.midpoint(values)
 
     def get_reference_value(self) -> float:
         """Return IBW or weight if available, else 1."""
-        if hasattr(self.patient, "ibw") and self.patient.ibw:
-            return self.patient.ibw
-        if hasattr(self.patient, "weight") and self.patient.weight:
-            return self.patient.weight
-        return 1  # fallback
+        return reference_value(self.patient)
 
     def collect_plan_notes(self, plan_dict):
-        """Collect notes from a plan."""
-        for category, nutrients in plan_dict.items():
-            for nutrient_name, plan in nutrients.items():
-                if plan.notes:
-                    self.notes.append(f"{category} - {nutrient_name}: {plan.notes}")
+        """Collect notes from a plan as PlanNote records."""
+        self.notes.extend(plan_notes(plan_dict))
+
+    def formatted_notes(self) -> List[str]:
+        """Notes collected so far as display strings."""
+        return format_notes(self.notes)
 
     def apply_conditions(self):
         """Apply patient conditions to the final plan."""
-        for condition_type, active in getattr(self.patient, "conditions", {}).items():
-            if not active:
-                continue
-            condition = condition_type()
-            if hasattr(condition, "modify_plan"):
-                condition.modify_plan(self.final_plan, self.patient)
-
-    def generate_daily_plan(self) -> pd.DataFrame:
-        """Generate a daily TPN plan as a pivoted DataFrame."""
-        # Collect notes from base plan
+        if self.patches is not None:
+            condition_engine.apply_patches(self.final_plan, self.patches)
+            return
+        active = active_conditions(self.patient)
+        if active:
+            condition_engine.apply_conditions(self.final_plan, active)
+
+    def prepare(self) -> plan_engine.PackedPlan:
+        """Apply conditions, collect notes and pack the final plan (once per planner)."""
+        if self.packed is None:
+            # Apply all conditions
+            with self.hooks.span("apply_conditions"):
+                self.apply_conditions()
+            with self.hooks.span("collect_notes"):
+                self.collect_plan_notes(self.final_plan)
+            with self.hooks.span("pack_plan"):
+                self.packed = plan_engine.pack_plan(self.final_plan)
+        return self.packed
+
+    def iter_daily_plan(self, chunk_days: int = 1) -> Iterator[pd.DataFrame]:
+        """Yield the plan chunk_days days at a time as (Category, Nutrient) x Day frames.
+
+        Only one chunk is materialized at a time, so memory does not grow with total_days.
+        """
+        packed = self.prepare()
+        ref_value = self.get_reference_value()
+        order, index = plan_engine.frame_rows(packed)
+        for first in range(0, self.total_days, chunk_days):
+            days = np.arange(first, min(first + chunk_days, self.total_days))
+            with self.hooks.span("schedule"):
+                values = plan_engine.daily_values(packed, self.total_days, days)
+            with self.hooks.span("scale"):
+                matrix = plan_engine.scale_values(packed, values, ref_value)
+            yield pd.DataFrame(matrix[order], index=index, columns=pd.Index(days + 1, name="Day"))
+
+    def build_daily_plan(self) -> pd.DataFrame:
+        """Compute the whole pivoted daily plan."""
+        packed = self.prepare()
+        ref_value = self.get_reference_value()
+        with self.hooks.span("schedule"):
+            values = plan_engine.daily_values(packed, self.total_days)
+        with self.hooks.span("scale"):
+            matrix = plan_engine.scale_values(packed, values, ref_value)
 
-        # Apply all conditions
-        self.apply_conditions()
-        self.collect_plan_notes(self.final_plan)
+        # Days as columns, Nutrients as rows
+        with self.hooks.span("to_frame"):
+            return plan_engine.to_frame(packed, matrix)
 
-        ref_value = self.get_reference_value()
-        records = []
-
-        for category, nutrients in self.final_plan.items():
-            for nutrient_name, plan in nutrients.items():
-                # Compute initial and goal values
-                init = self.midpoint(plan.initial_range)
-                goal = self.midpoint(plan.goal_range) or init  # fallback if goal_range missing
-
-                daily_values = self.interpolate(init, goal, self.total_days)
-
-                for day, value in enumerate(daily_values, start=1):
-                    # Scale only if unit is per kg (example: "g/kg" or "mg/kg")
-                    if plan.measurement_unit.lower() in ["g/kg", "mg/kg"]:
-                        scaled_value = round(value * ref_value, 3) if value is not None else None
-                    else:
-                        scaled_value = round(value, 3) if value is not None else None
-
-                    records.append({
-                        "Day": day,
-                        "Category": category,
-                        "Nutrient": nutrient_name,
-                        "Value": scaled_value,
-                        "Unit": plan.measurement_unit,
-                        "Per": plan.measurement_unit
-                    })
-
-        df = pd.DataFrame(records)
-
-        # Print notes
-        if self.notes:
-            print("\n--- Planner Notes ---")
-            for note in self.notes:
-                print("•", note)
-
-        # Pivot table: Days as columns, Nutrients as rows
-        pivoted = df.pivot_table(index=["Category", "Nutrient"], columns="Day", values="Value")
-        return pivoted
+    def generate_daily_plan(self) -> pd.DataFrame:
+        """Generate a daily TPN plan as a pivoted DataFrame, served from the cache when one is set.
+
+        Notes are left in self.notes as PlanNote records; see formatted_notes().
+        """
+        if self.cache is None:
+            return self.build_daily_plan()
+
+        key = self.cache.fingerprint(self.patient, self.total_days)
+        with self.hooks.span("cache_lookup"):
+            entry = self.cache.get(key)
+        if entry is None:
+            # build_daily_plan() fills self.notes as a side effect
+            entry = self.cache.put(key, (self.build_daily_plan(), tuple(self.notes)))
+        else:
+            self.notes = list(entry[1])
+        return entry[0].copy()
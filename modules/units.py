@@ -0,0 +1,71 @@
+"""Resolve a nutrient's (measurement_unit, reference_unit) pair into the units its plan values are shown in.
+
+Per-kg doses become per-day amounts by multiplying by the reference (dosing) weight, per
+kg/min doses are also multiplied by the minutes in a day, mEq of an ion becomes mmol by its
+valence and mcg/ug are spelled µg. Each pair is resolved once; planning then applies the
+factors to the whole nutrient x day matrix.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+MINUTES_PER_DAY = 1440
+
+# Mass units -> grams
+MASS_UNITS: Dict[str, float] = {"kg": 1000.0, "g": 1.0, "mg": 1e-3, "µg": 1e-6, "mcg": 1e-6, "ug": 1e-6}
+# Spelling of equivalent units plan values are reported in
+UNIT_ALIASES: Dict[str, str] = {"mcg": "µg", "ug": "µg", "ml": "mL"}
+# Reference unit -> (multiply by dosing weight, constant factor) to reach a per-day amount
+PER_DAY: Dict[str, Tuple[bool, float]] = {
+    "day": (False, 1.0),
+    "kg": (True, 1.0),
+    "kg/day": (True, 1.0),
+    "kg/h": (True, 24.0),
+    "kg/min": (True, float(MINUTES_PER_DAY)),
+}
+# Charge of the ions dosed in mEq; 1 mmol = valence mEq
+VALENCE: Dict[str, int] = {
+    "sodium": 1,
+    "potassium": 1,
+    "chloride": 1,
+    "acetate": 1,
+    "calcium": 2,
+    "magnesium": 2,
+}
+
+
+@dataclass(frozen=True)
+class UnitConversion:
+    unit: str  # measurement unit of the converted values
+    per: str  # reference unit of the converted values
+    factor: float  # constant multiplier
+    per_weight: bool  # also multiplied by the patient's dosing weight
+
+
+def conversion_factor(from_unit: str, to_unit: str) -> float:
+    """Factor turning an amount in from_unit into to_unit, for mass units (e.g. µg -> mg is 0.001)."""
+    if from_unit == to_unit:
+        return 1.0
+    if from_unit not in MASS_UNITS or to_unit not in MASS_UNITS:
+        raise ValueError(f"cannot convert {from_unit} to {to_unit}")
+    return MASS_UNITS[from_unit] / MASS_UNITS[to_unit]
+
+
+@lru_cache(maxsize=None)
+def resolve(measurement_unit: str, reference_unit: str, nutrient: Optional[str] = None) -> UnitConversion:
+    """Conversion of one (measurement_unit, reference_unit) pair; nutrient picks the valence of mEq units.
+
+    Reference units without a per-day rule, and mEq of ions without a known valence, are left as they are.
+    """
+    unit = UNIT_ALIASES.get(measurement_unit, measurement_unit)
+    factor = 1.0
+    if unit in MASS_UNITS:
+        factor = conversion_factor(measurement_unit, unit)
+    elif unit == "mEq" and nutrient in VALENCE:
+        unit, factor = "mmol", 1.0 / VALENCE[nutrient]
+
+    rule = PER_DAY.get(reference_unit.lower() if reference_unit else reference_unit)
+    if rule is None:
+        return UnitConversion(unit, reference_unit, factor, False)
+    per_weight, per_day = rule
+    return UnitConversion(unit, "day", factor * per_day, per_weight)
@@ -0,0 +1,82 @@
+"""Plan every patient of a census file without any prompts, e.g. from a nightly cron job.
+
+    python plan_census.py census.csv --output plans.csv
+    python plan_census.py census.parquet --output plans.csv --days 14 --workers 4 --notes notes.csv
+    python plan_census.py census.csv --output plans.parquet --first-day 8 --days 7
+
+The census is read in chunks and each chunk is planned by a BatchPlanner and appended to the
+output: a long-format CSV (Patient, Category, Nutrient, Day, Value, Unit, Per), or, for a
+.parquet output, a Parquet dataset directory partitioned by day. Parquet runs replace only
+the days they write, so --first-day lets a nightly run append new days to the dataset.
+"""
+import argparse
+from contextlib import nullcontext
+import os
+import sys
+import time
+import pandas as pd
+from modules import guideline_store
+from modules.census import plan_frame, plan_frame_pool, read_census
+from modules.planner.batch_planner import BatchPlan, BatchPlanner
+from modules.planner.export import write_parquet
+
+
+def note_rows(batch: BatchPlan):
+    for i, patient_id in enumerate(batch.patient_ids):
+        for note in batch.notes(i):
+            yield patient_id, note.category, note.nutrient, note.guideline, note.text
+
+
+def planned_batches(args, planner: BatchPlanner, sizes: list, pool=None):
+    """Plan the census chunk by chunk, appending notes to args.notes and chunk sizes to sizes."""
+    for part, chunk in enumerate(read_census(args.census, args.chunk_size)):
+        if pool is not None:
+            batch = plan_frame_pool(pool, chunk, args.workers, hooks=planner.hooks)
+        else:
+            batch = plan_frame(planner, chunk)
+        if args.notes:
+            notes = pd.DataFrame(note_rows(batch), columns=["Patient", "Category", "Nutrient", "Guideline", "Note"])
+            notes.to_csv(args.notes, mode="a", header=part == 0, index=False)
+        sizes.append(len(batch.patient_ids))
+        yield batch
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("census", help="census CSV or Parquet file")
+    parser.add_argument("--output", required=True, help="long-format plan CSV, or .parquet dataset directory")
+    parser.add_argument("--notes", help="optional CSV of plan notes per patient")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--first-day", type=int, default=1,
+                        help="Parquet output only: write days first-day .. first-day + days - 1")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="census rows planned at a time")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--guideline-store", help="compiled guideline store to read base plans from")
+    args = parser.parse_args(argv)
+    if args.guideline_store:
+        guideline_store.use_store(args.guideline_store)
+    parquet = args.output.endswith(".parquet")
+
+    # Plans always start at day 1 so later days follow the same ramp as an earlier run's
+    planner = BatchPlanner(args.first_day + args.days - 1 if parquet else args.days)
+    for path in (None if parquet else args.output, args.notes):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    start = time.perf_counter()
+    sizes = []
+    # One pool for the whole run, so worker templates carry over from chunk to chunk
+    with planner.process_pool(args.workers) if args.workers > 1 else nullcontext() as pool:
+        batches = planned_batches(args, planner, sizes, pool)
+        if parquet:
+            write_parquet(batches, args.output, days=range(args.first_day, args.first_day + args.days))
+        else:
+            for part, batch in enumerate(batches):
+                batch.to_long().to_csv(args.output, mode="a", header=part == 0, index=False)
+
+    print(f"planned {sum(sizes)} patients in {time.perf_counter() - start:.1f}s -> {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+from modules.conditions.registry import ADULT_CONDITIONS, CHILD_CONDITIONS
+from modules.patients.adult_patient import AdultPatient
+from modules.patients.child_patient import ChildPatient
+from modules.patients.preterm_infant_patient import PretermInfantPatient
+from modules.patients.term_infant_patient import TermInfantPatient
+
+
+def mixed_patients():
+    sepsis, critically_ill = ADULT_CONDITIONS["sepsis"], CHILD_CONDITIONS["critically_ill"]
+    return [
+        AdultPatient("adult", 54, 172, 81, True, {sepsis: True}),
+        AdultPatient("adult-f", 70, 158, 52, False, {}),
+        ChildPatient("child", 6, 115, 21, True, conditions={critically_ill: True}),
+        ChildPatient("child-heavy", 13, 160, 48, False, conditions={critically_ill: False}),
+        TermInfantPatient("term", 2, 55, 4.5, True, {}),
+        TermInfantPatient("term-older", 30, 65, 6.2, False, {}),
+        PretermInfantPatient("preterm", 3, 38, 0.9, True, {}),
+        PretermInfantPatient("preterm-late", 29, 44, 1.8, False, {}),
+    ]
@@ -0,0 +1,43 @@
+import dataclasses
+import pandas as pd
+import pytest
+from modules.nutrient_plan import copy_plan
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+
+@pytest.mark.parametrize("patient", mixed_patients(), ids=lambda patient: patient.name)
+def test_editing_a_plan_leaves_the_cached_base_plan_alone(patient):
+    expected = TpnPlanner(patient, 5).generate_daily_plan()
+    cached = copy_plan(patient.cached_base_plan())
+    assert cached == patient.get_base_plan()
+
+    planner = TpnPlanner(patient, 5)
+    for nutrients in planner.final_plan.values():
+        for entry in nutrients.values():
+            if entry.goal_range:
+                entry.goal_range[0] = 999  # in-place edit of a list
+            entry.days_to_goal = 99  # attribute assignment
+        nutrients.popitem()
+
+    assert copy_plan(patient.cached_base_plan()) == cached
+    pd.testing.assert_frame_equal(TpnPlanner(patient, 5).generate_daily_plan(), expected)
+
+
+def test_cached_base_plan_is_shared_and_read_only():
+    patient = mixed_patients()[0]
+    cached = patient.cached_base_plan()
+    assert patient.cached_base_plan() is cached
+    with pytest.raises(TypeError):
+        cached["macro"] = {}
+    with pytest.raises(TypeError):
+        del cached["macro"]["energy"]
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cached["macro"]["energy"].days_to_goal = 3
+
+
+def test_copies_do_not_share_entries():
+    patient = mixed_patients()[2]
+    first, second = copy_plan(patient.cached_base_plan()), copy_plan(patient.cached_base_plan())
+    assert first == second
+    assert first["macro"]["energy"] is not second["macro"]["energy"]
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules.census import patients_from_frame, plan_frame
+from modules.planner.batch_planner import BatchPlanner, concat_batches
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+
+def assert_matches_tpn_planner(batch, patients, total_days):
+    assert batch.patient_ids == [patient.name for patient in patients]
+    for i, patient in enumerate(patients):
+        planner = TpnPlanner(patient, total_days)
+        expected = planner.generate_daily_plan()
+        pd.testing.assert_frame_equal(batch.frame(i), expected)
+        packed = planner.packed
+        units = dict(zip(zip(packed.categories, packed.nutrients), zip(packed.units, packed.per)))
+        assert batch.units_of(i) == {row: units[row] for row in expected.index}
+        assert batch.notes(i) == tuple(planner.notes)
+
+
+def test_plan_serial_matches_tpn_planner_on_mixed_populations():
+    patients = mixed_patients()
+    assert_matches_tpn_planner(BatchPlanner(5).plan_serial(patients), patients, 5)
+
+
+def test_nutrients_planned_in_different_units_get_separate_rows():
+    batch = BatchPlanner(3).plan_serial(mixed_patients())
+    labels = list(zip(batch.categories, batch.nutrients, batch.units, batch.per))
+    assert len(labels) == len(set(labels))
+    glucose = [(unit, per) for category, nutrient, unit, per in labels if (category, nutrient) == ("macro", "glucose")]
+    assert len(glucose) > 1
+
+
+def test_concat_batches_keeps_units():
+    patients = mixed_patients()
+    planner = BatchPlanner(4)
+    batch = concat_batches([planner.plan_serial(patients[:3]), planner.plan_serial(patients[3:])])
+    assert_matches_tpn_planner(batch, patients, 4)
+
+
+def test_long_format_units_follow_each_patient():
+    patients = mixed_patients()
+    batch = BatchPlanner(2).plan_serial(patients)
+    long = batch.to_long()
+    for i, patient in enumerate(patients):
+        rows = long[long["Patient"] == patient.name]
+        units = {(c, n): (u, p) for c, n, u, p in zip(rows["Category"], rows["Nutrient"], rows["Unit"], rows["Per"])}
+        assert units == batch.units_of(i)
+
+
+def census_frame(patients, populations):
+    return pd.DataFrame({
+        "patient_id": [patient.name for patient in patients],
+        "population": populations,
+        "age": [patient.age for patient in patients],
+        "height": [patient.height for patient in patients],
+        "weight": [patient.weight for patient in patients],
+        "gender": ["M" if patient.gender else "F" for patient in patients],
+        "sepsis": [True, False, False, False, False, False, False, False],
+        "critically_ill": [False, False, True, False, False, False, False, False],
+    })
+
+
+def test_plan_columns_matches_tpn_planner_on_mixed_populations():
+    patients = mixed_patients()
+    df = census_frame(patients, ["adult", "adult", "child", "child", "term_infant", "term_infant",
+                                 "preterm_infant", "preterm_infant"])
+    assert_matches_tpn_planner(plan_frame(BatchPlanner(6), df), patients_from_frame(df), 6)
+
+
+@pytest.mark.parametrize("workers", [2])
+def test_process_pool_matches_serial(workers):
+    patients = mixed_patients() * 3
+    planner = BatchPlanner(3)
+    serial, pooled = planner.plan_serial(patients), planner.plan(patients, workers=workers, chunk_size=5)
+    assert pooled.patient_ids == serial.patient_ids
+    assert (pooled.categories, pooled.nutrients, pooled.units, pooled.per) == \
+        (serial.categories, serial.nutrients, serial.units, serial.per)
+    assert np.array_equal(pooled.values, serial.values, equal_nan=True)
@@ -0,0 +1,59 @@
+import pytest
+from modules.conditions.registry import CHILD_CONDITIONS
+from modules.patients import child_patient, preterm_infant_patient, term_infant_patient
+from modules.patients.brackets import BracketIndex, below
+from modules.patients.child_patient import ChildPatient
+from modules.patients.preterm_infant_patient import PretermInfantPatient
+from modules.patients.term_infant_patient import TermInfantPatient
+
+
+def test_breakpoints_are_inclusive_upper_bounds():
+    index = BracketIndex(3, 6, below(28))
+    values = [0, 3, 3.0001, 6, 6.0001, 27.9999, below(28), 28, 100]
+    expected = [0, 0, 1, 1, 2, 2, 2, 3, 3]
+    assert [index(v) for v in values] == expected
+    assert index.assign(values).tolist() == expected
+    assert len(index) == 4
+
+
+def test_below_is_the_largest_value_under_its_argument():
+    assert below(1.0) < 1.0
+    assert BracketIndex(below(1.0))(below(1.0)) == 0
+    assert BracketIndex(below(1.0))(1.0) == 1
+
+
+def test_unsorted_breakpoints_are_rejected():
+    with pytest.raises(ValueError, match="sorted"):
+        BracketIndex(6, 3)
+
+
+@pytest.mark.parametrize("patient_type, module, attribute, values, expected", [
+    # child weight: ≤40 | heavier
+    (ChildPatient, child_patient, "weight", [40, 40.0001], [0, 1]),
+    # preterm weight: <1.0 | ≤1.5 | heavier
+    (PretermInfantPatient, preterm_infant_patient, "weight", [0.9999, 1.0, 1.5, 1.5001], [0, 1, 1, 2]),
+    # preterm age: ≤4 | older
+    (PretermInfantPatient, preterm_infant_patient, "age", [4, 5], [0, 1]),
+    # term infant age: ≤3 | ≤6 | <28 | older
+    (TermInfantPatient, term_infant_patient, "age", [3, 4, 6, 7, 27, 28], [0, 1, 1, 2, 2, 3]),
+])
+def test_patient_brackets_at_their_boundaries(patient_type, module, attribute, values, expected):
+    index = getattr(module, f"{attribute.upper()}_BRACKETS")
+    assert [index(v) for v in values] == expected
+    assert index.assign(values).tolist() == expected
+
+    attributes = {"age": 10, "weight": 1.2} if patient_type is not ChildPatient else {"age": 8, "weight": 30}
+    patients = []
+    for value in values:
+        attributes[attribute] = value
+        patients.append(patient_type(name="p", height=50, gender=True, conditions={}, **attributes))
+    ages, weights = [p.age for p in patients], [p.weight for p in patients]
+    # the vectorised keys used by the batch planner agree with base_plan_key() on the boundary
+    assert patient_type.bracket_keys(ages, weights) == [p.base_plan_key() for p in patients]
+
+
+def test_child_plan_changes_above_forty_kilograms():
+    conditions = {CHILD_CONDITIONS["critically_ill"]: False}
+    at_limit = ChildPatient("c", 12, 150, 40, True, conditions=conditions).get_base_plan()
+    above = ChildPatient("c", 12, 150, 40.0001, True, conditions=conditions).get_base_plan()
+    assert at_limit != above
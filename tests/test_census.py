@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import plan_census
+from modules.census import plan_frame, plan_frame_pool
+from modules.planner.batch_planner import BatchPlanner
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+POPULATIONS = ["adult", "adult", "child", "child", "term_infant", "term_infant", "preterm_infant", "preterm_infant"]
+
+
+def census(repeat: int = 1) -> pd.DataFrame:
+    patients = mixed_patients()
+    df = pd.DataFrame({
+        "patient_id": [patient.name for patient in patients],
+        "population": POPULATIONS,
+        "age": [patient.age for patient in patients],
+        "height": [patient.height for patient in patients],
+        "weight": [patient.weight for patient in patients],
+        "gender": ["M" if patient.gender else "F" for patient in patients],
+        "sepsis": ["y", "n", "", "", "", "", "", ""],
+        "critically_ill": [0, 0, 1, 0, 0, 0, 0, 0],
+    })
+    df = pd.concat([df] * repeat, ignore_index=True)
+    df["patient_id"] = [f"{patient_id}-{i}" for i, patient_id in enumerate(df["patient_id"])]
+    return df
+
+
+def test_plan_frame_pool_matches_plan_frame():
+    df = census(repeat=4)
+    planner = BatchPlanner(3)
+    serial = plan_frame(planner, df)
+    with planner.process_pool(2) as pool:
+        pooled = [plan_frame_pool(pool, df, workers=2, chunk_size=5) for _ in range(2)]
+    for batch in pooled:
+        assert batch.patient_ids == serial.patient_ids
+        assert (batch.categories, batch.nutrients, batch.units, batch.per) == \
+            (serial.categories, serial.nutrients, serial.units, serial.per)
+        assert np.array_equal(batch.values, serial.values, equal_nan=True)
+
+
+def run(tmp_path, name, *args):
+    source = tmp_path / "census.csv"
+    census(repeat=3).to_csv(source, index=False)
+    output = tmp_path / name
+    assert plan_census.main([str(source), "--output", str(output), "--days", "3", "--chunk-size", "7", *args]) == 0
+    return pd.read_csv(output, dtype={"Patient": str})
+
+
+def test_cli_output_has_each_patients_units(tmp_path):
+    long = run(tmp_path, "plans.csv")
+    patients = mixed_patients()
+    for i, patient in enumerate(patients):
+        planner = TpnPlanner(patient, 3)
+        planner.generate_daily_plan()
+        packed = planner.packed
+        expected = set(zip(packed.categories, packed.nutrients, packed.units, packed.per))
+        rows = long[long["Patient"] == f"{patient.name}-{i}"]
+        assert set(zip(rows["Category"], rows["Nutrient"], rows["Unit"], rows["Per"])) <= expected
+
+
+def test_cli_workers_use_one_pool_per_run(tmp_path, monkeypatch):
+    pools = []
+    process_pool = BatchPlanner.process_pool
+
+    def counting_pool(self, workers):
+        pools.append(workers)
+        return process_pool(self, workers)
+
+    monkeypatch.setattr(BatchPlanner, "process_pool", counting_pool)
+    serial = run(tmp_path, "serial.csv")
+    pooled = run(tmp_path, "pooled.csv", "--workers", "2")
+    assert pools == [2]
+    pd.testing.assert_frame_equal(serial, pooled)
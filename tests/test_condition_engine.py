@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from modules import guidelines
+from modules.census import POPULATION_CONDITIONS, POPULATIONS
+from modules.conditions import adult_conditions, engine
+from modules.conditions.registry import ADULT_CONDITIONS
+from modules.guideline_store import BRACKET_SAMPLES
+from modules.nutrient_plan import NutrientPlan
+from modules.patients.adult_patient import AdultPatient
+from modules.planner.tpn_planner import TpnPlanner
+
+
+def base_plans(patient_type):
+    for age, weight in BRACKET_SAMPLES[patient_type.__name__]:
+        patient = patient_type(name="p", age=age, height=170.0, weight=weight, gender=True, conditions={})
+        yield patient.get_base_plan()
+
+
+@pytest.mark.parametrize("population", sorted(POPULATION_CONDITIONS))
+def test_every_registered_patch_lands_on_a_plan_row(population):
+    for plan in base_plans(POPULATIONS[population]):
+        for condition in POPULATION_CONDITIONS[population].values():
+            for patch in engine.resolve_conditions(frozenset({condition})):
+                assert engine.locate(plan, patch) in plan[patch.category]
+
+
+def test_heart_failure_adjusts_energy_and_trace_elements():
+    planner = TpnPlanner(AdultPatient("a", 60, 170, 70, True, {adult_conditions.HeartFailure: True}), 3)
+    planner.prepare()
+    plan = planner.final_plan
+    assert plan["macro"]["energy"].goal_range == [20, 25]
+    assert plan["trace_elements"]["zinc"].goal_range == [2.5, 5]
+    assert plan["trace_elements"]["copper"].goal_range == [300, 500]
+    assert plan["trace_elements"]["selenium"].goal_range == [60, 100]
+    assert "potassium" not in plan["electrolyte"]
+
+
+def test_overlapping_conditions_resolve_the_same_in_any_order():
+    burns, crrt = ADULT_CONDITIONS["burns"], ADULT_CONDITIONS["aki_crrt"]
+    frames = []
+    for conditions in ({burns: True, crrt: True}, {crrt: True, burns: True}):
+        planner = TpnPlanner(AdultPatient("a", 45, 175, 80, True, conditions), 5)
+        frames.append(planner.generate_daily_plan())  # applies the conditions to final_plan
+        # the more specific AKI (CRRT) replacement wins the amino acid conflict, Burns keeps energy
+        assert planner.final_plan["macro"]["protein_amino_acids"].goal_range == [1.5, 1.7]
+        assert planner.final_plan["macro"]["energy"].goal_range == [22, 25]
+    pd.testing.assert_frame_equal(frames[0], frames[1])
+    assert engine.resolve_conditions(frozenset({burns, crrt})) == engine.resolve_conditions(frozenset({crrt, burns}))
+
+
+def test_patch_on_a_missing_nutrient_raises(monkeypatch):
+    target = {"electrolyte": {"zinc": {"replace": NutrientPlan("mg", "day", goal_range=[2.5, 5])}}}
+    monkeypatch.setattr(adult_conditions.Obese, "target", target)
+    guidelines.invalidate()
+    try:
+        with pytest.raises(ValueError, match="Obese: the plan has no electrolyte.zinc"):
+            TpnPlanner(AdultPatient("a", 60, 170, 70, True, {adult_conditions.Obese: True}), 3).generate_daily_plan()
+    finally:
+        monkeypatch.undo()
+        guidelines.invalidate()
+
+
+def test_unknown_category_is_rejected_at_registration(monkeypatch):
+    monkeypatch.setattr(adult_conditions.Obese, "target", {"micro": {"zinc": {"restrict": 1}}})
+    with pytest.raises(ValueError, match="unknown category 'micro'"):
+        engine.register_condition(adult_conditions.Obese)
+    monkeypatch.undo()
+    engine.register_condition(adult_conditions.Obese)
@@ -0,0 +1,35 @@
+from itertools import combinations
+import pandas as pd
+from modules import guidelines
+from modules.conditions.registry import ADULT_CONDITIONS, ConditionRegistry
+from modules.patients.adult_patient import AdultPatient
+from modules.planner.tpn_planner import TpnPlanner
+
+
+def test_masks_round_trip():
+    registry = ConditionRegistry(ADULT_CONDITIONS, precompute_size=0)
+    mask = registry.mask(["sepsis", "aki_crrt"])
+    assert registry.selected(mask) == ("sepsis", "aki_crrt")
+    assert registry.types_for(mask) == {ADULT_CONDITIONS["sepsis"], ADULT_CONDITIONS["aki_crrt"]}
+
+
+def test_registry_patches_plan_like_patient_conditions():
+    registry = ConditionRegistry(ADULT_CONDITIONS)
+    keys = list(registry.keys)
+    for selected in [()] + [(key,) for key in keys] + list(combinations(keys, 2))[::5]:
+        mask = registry.mask(selected)
+        patient = AdultPatient("a", 50, 170, 70, True, registry.conditions(mask))
+        resolved = TpnPlanner(patient, 3).generate_daily_plan()
+        patched = TpnPlanner(patient, 3, patches=registry.patches(mask))
+        pd.testing.assert_frame_equal(patched.generate_daily_plan(), resolved)
+
+
+def test_patches_are_cached_per_mask_until_guidelines_change():
+    registry = ConditionRegistry(ADULT_CONDITIONS)
+    mask = registry.mask(["burns", "obese"])
+    patches = registry.patches(mask)
+    assert registry.patches(mask) is patches
+    guidelines.invalidate()
+    refreshed = registry.patches(mask)
+    assert refreshed is not patches
+    assert refreshed == patches
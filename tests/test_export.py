@@ -0,0 +1,54 @@
+import os
+import pytest
+from modules.planner.batch_planner import BatchPlanner
+from modules.planner.export import to_arrow, write_parquet
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def expected_units(patients, total_days):
+    units = {}
+    for patient in patients:
+        planner = TpnPlanner(patient, total_days)
+        df = planner.generate_daily_plan()
+        packed = planner.packed
+        labels = dict(zip(zip(packed.categories, packed.nutrients), zip(packed.units, packed.per)))
+        units.update({(patient.name, *row): labels[row] for row in df.index})
+    return units
+
+
+def exported_units(table):
+    columns = [table.column(name).to_pylist() for name in ("patient_id", "category", "nutrient", "unit", "per")]
+    return {(patient, category, nutrient): (unit, per) for patient, category, nutrient, unit, per in zip(*columns)}
+
+
+def test_arrow_units_follow_each_patient_on_mixed_populations():
+    patients = mixed_patients()
+    table = to_arrow(BatchPlanner(3).plan_serial(patients))
+    assert exported_units(table) == expected_units(patients, 3)
+
+
+def test_arrow_values_match_long_format():
+    batch = BatchPlanner(3).plan_serial(mixed_patients())
+    table = to_arrow(batch, first_day=5, days=[6, 7])
+    long = batch.to_long()
+    long = long[long["Day"].isin([2, 3])]
+    assert table.num_rows == len(long)
+    assert sorted(table.column("day").to_pylist()) == sorted((long["Day"] + 4).tolist())
+    assert sorted(table.column("value").to_pylist()) == sorted(long["Value"].tolist())
+
+
+def test_parquet_dataset_keeps_units_and_replaces_written_days(tmp_path):
+    patients = mixed_patients()
+    planner = BatchPlanner(3)
+    root = str(tmp_path / "plans")
+    assert write_parquet([planner.plan_serial(patients[:4]), planner.plan_serial(patients[4:])], root) == [1, 2, 3]
+    assert write_parquet([planner.plan_serial(patients)], root, first_day=1, days=[3]) == [3]
+    assert sorted(os.listdir(root)) == ["day=1", "day=2", "day=3"]
+    table = pq.read_table(root)
+    assert exported_units(table) == expected_units(patients, 3)
+    # day 3 was rewritten once, not appended to
+    assert table.num_rows == to_arrow(planner.plan_serial(patients)).num_rows
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+from modules import guideline_store, guidelines
+from modules.patients.tpn_patient import TpnPatient
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+
+@pytest.fixture
+def store(tmp_path):
+    built = guideline_store.build_store(str(tmp_path / "guidelines.store"))
+    yield built
+    guideline_store.use_store(None)
+
+
+def test_store_holds_the_base_plan_of_every_bracket(store):
+    for patient in mixed_patients():
+        key = patient.base_plan_key()
+        assert key in store
+        assert store.base_plan(key) == patient.get_base_plan()
+    assert store.base_plan((TpnPatient, "not-a-bracket")) is None
+
+
+def test_planner_reads_base_plans_from_the_active_store(store, monkeypatch):
+    expected = [TpnPlanner(patient, 5).generate_daily_plan() for patient in mixed_patients()]
+    guideline_store.use_store(store.path)
+    assert guideline_store.active_store() is not None
+
+    def not_from_store(self):
+        raise AssertionError(f"{self.base_plan_key()} was not read from the store")
+
+    for patient_type in {type(patient) for patient in mixed_patients()}:
+        monkeypatch.setattr(patient_type, "get_base_plan", not_from_store)
+    for patient, frame in zip(mixed_patients(), expected):
+        pd.testing.assert_frame_equal(TpnPlanner(patient, 5).generate_daily_plan(), frame)
+
+
+def test_guideline_change_drops_the_active_store(store):
+    guideline_store.use_store(store.path)
+    guidelines.invalidate()
+    assert guideline_store.active_store() is None
+
+
+def test_unsupported_store_format_is_rejected(store):
+    index = f"{store.path}/index.json"
+    with open(index) as f:
+        text = f.read()
+    with open(index, "w") as f:
+        f.write(text.replace(f'"format": {guideline_store.FORMAT_VERSION}', '"format": 0'))
+    with pytest.raises(ValueError, match="unsupported guideline store format"):
+        guideline_store.GuidelineStore(store.path)
+
+
+def test_store_built_from_other_guidelines_is_refused(store, monkeypatch):
+    from modules.nutrient_plan import NutrientPlan
+    from modules.patients.adult_patient import AdultPatient
+
+    base_plan = AdultPatient.get_base_plan
+
+    def edited_base_plan(self):
+        plan = base_plan(self)
+        plan["macro"]["energy"] = NutrientPlan("kcal", "kg", [10, 10], [10, 10], 0)
+        return plan
+
+    monkeypatch.setattr(AdultPatient, "get_base_plan", edited_base_plan)
+    with pytest.raises(ValueError, match="rebuild it"):
+        guideline_store.use_store(store.path)
+    assert guideline_store.active_store() is None
+    rebuilt = guideline_store.build_store(store.path)
+    assert rebuilt.source != store.source
+    assert guideline_store.use_store(rebuilt.path) is not None
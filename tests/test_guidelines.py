@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+from modules import guidelines
+from modules.conditions import adult_conditions
+from modules.conditions.registry import ADULT_CONDITIONS
+from modules.nutrient_plan import NutrientPlan
+from modules.patients.adult_patient import AdultPatient
+from modules.planner.batch_planner import BatchPlanner
+from modules.planner.result_cache import PlanResultCache
+from modules.planner.tpn_planner import TpnPlanner
+
+
+@pytest.fixture
+def edit_guidelines(monkeypatch):
+    """monkeypatch for guideline tables; the edits are undone and caches dropped afterwards."""
+    yield monkeypatch
+    monkeypatch.undo()
+    guidelines.invalidate()
+
+
+def patient(**conditions):
+    return AdultPatient("a", 50, 170, 70, True, {ADULT_CONDITIONS[key]: True for key in conditions})
+
+
+def test_invalidate_bumps_the_version_and_calls_listeners():
+    calls = []
+    callback = guidelines.on_change(lambda: calls.append(guidelines.version()))
+    try:
+        before = guidelines.version()
+        guidelines.invalidate()
+        assert calls == [before + 1]
+    finally:
+        guidelines._listeners.remove(callback)
+
+
+def test_result_cache_drops_entries_when_guidelines_change():
+    cache = PlanResultCache()
+    planner = TpnPlanner(patient(), 3, cache=cache)
+    planner.generate_daily_plan()
+    key = cache.fingerprint(planner.patient, 3)
+    assert cache.get(key) is not None
+    guidelines.invalidate()
+    assert cache.get(key) is None
+    assert len(cache) == 0
+
+
+def test_cached_plans_follow_edited_base_plans(edit_guidelines):
+    cache = PlanResultCache()
+    before = TpnPlanner(patient(), 3, cache=cache).generate_daily_plan()
+    edit_energy(edit_guidelines, 10)
+    # without invalidate() the memoized base plan and the cached result are still served
+    pd.testing.assert_frame_equal(TpnPlanner(patient(), 3, cache=cache).generate_daily_plan(), before)
+    guidelines.invalidate()
+    after = TpnPlanner(patient(), 3, cache=cache).generate_daily_plan()
+    assert after.loc[("macro", "energy"), 1] == pytest.approx(10 * TpnPlanner(patient(), 3).get_reference_value())
+    assert after.loc[("macro", "energy"), 1] != before.loc[("macro", "energy"), 1]
+
+
+def edit_energy(monkeypatch, kcal_per_kg: float):
+    base_plan = AdultPatient.get_base_plan
+
+    def edited_base_plan(self):
+        plan = base_plan(self)
+        plan["macro"]["energy"] = NutrientPlan("kcal", "kg", [kcal_per_kg] * 2, [kcal_per_kg] * 2, 0)
+        return plan
+
+    monkeypatch.setattr(AdultPatient, "get_base_plan", edited_base_plan)
+
+
+def test_batch_templates_follow_edited_base_plans(edit_guidelines):
+    planner = BatchPlanner(3)
+    before = planner.plan_serial([patient()]).frame(0)
+    edit_energy(edit_guidelines, 10)
+    guidelines.invalidate()
+    after = planner.plan_serial([patient()]).frame(0)
+    pd.testing.assert_frame_equal(after, TpnPlanner(patient(), 3).generate_daily_plan())
+    assert not after.equals(before)
+
+
+def test_process_pool_refuses_work_after_guidelines_change():
+    planner = BatchPlanner(3)
+    with planner.process_pool(2) as pool:
+        planner.plan([patient(), patient(sepsis=True)], pool=pool)
+        guidelines.invalidate()
+        with pytest.raises(RuntimeError, match="new process_pool"):
+            planner.plan([patient(), patient(sepsis=True)], pool=pool)
+    with planner.process_pool(2) as pool:
+        assert len(planner.plan([patient(), patient(sepsis=True)], pool=pool).patient_ids) == 2
+
+
+def test_condition_patches_follow_edited_targets(edit_guidelines):
+    before = TpnPlanner(patient(sepsis=True), 3).generate_daily_plan()
+    edit_guidelines.setattr(adult_conditions.Sepsis, "target", {"macro": {"energy": {"restrict": 5}}})
+    pd.testing.assert_frame_equal(TpnPlanner(patient(sepsis=True), 3).generate_daily_plan(), before)
+    guidelines.invalidate()
+    after = TpnPlanner(patient(sepsis=True), 3).generate_daily_plan()
+    assert not after.equals(before)
+    assert after.loc[("macro", "energy")].max() <= 5 * TpnPlanner(patient(), 3).get_reference_value()
@@ -0,0 +1,82 @@
+import tracemalloc
+import pandas as pd
+from modules.census import plan_frame_pool
+from modules.planner.batch_planner import BatchPlanner, chunk_bounds
+from modules.planner.hooks import NULL_HOOKS, ProfilingCollector, StatsCollector
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+PLANNER_STAGES = {"get_base_plan", "copy_plan", "apply_conditions", "collect_notes", "pack_plan", "schedule", "scale", "to_frame"}
+
+
+def test_null_hooks_record_nothing():
+    with NULL_HOOKS.span("anything"):
+        pass
+    assert NULL_HOOKS.worker_config() is None
+    assert NULL_HOOKS.snapshot() is None
+
+
+def test_stats_collector_times_every_planner_stage():
+    hooks = StatsCollector()
+    patients = mixed_patients()
+    for patient in patients:
+        TpnPlanner(patient, 5, hooks=hooks).generate_daily_plan()
+    report = hooks.report()
+    assert set(report) == PLANNER_STAGES
+    for stage in report.values():
+        assert stage["count"] == len(patients)
+        assert 0 <= stage["min_s"] <= stage["mean_s"] <= stage["max_s"] <= stage["total_s"]
+    hooks.reset()
+    assert hooks.report() == {}
+
+
+def test_profiling_collector_profiles_and_traces_spans():
+    hooks = ProfilingCollector()
+    try:
+        TpnPlanner(mixed_patients()[0], 5, hooks=hooks).generate_daily_plan()
+        assert hooks.report()["to_frame"]["peak_bytes"] > 0
+        assert "daily_values" in hooks.profile_stats(limit=None)
+    finally:
+        hooks.stop()
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiling_collector_without_spans_has_no_profile():
+    assert ProfilingCollector(trace_memory=False).profile_stats() == ""
+
+
+def batch_counts(hooks, patients, **plan_kwargs):
+    BatchPlanner(5, hooks=hooks).plan(patients, **plan_kwargs)
+    return {stage: stats["count"] for stage, stats in hooks.report().items()}
+
+
+def test_process_pool_stage_stats_are_merged_into_the_caller():
+    patients = mixed_patients() * 3
+    serial = batch_counts(StatsCollector(), patients)
+    pooled = batch_counts(StatsCollector(), patients, workers=2, chunk_size=4)
+    chunks = len(chunk_bounds(len(patients), 2, 4))
+    assert pooled["batch_group"] == pooled["batch_scale"] == chunks
+    # every worker plans each template it meets once, so templates are planned at least as often as serially
+    assert set(pooled) == set(serial)
+    assert pooled["pack_plan"] >= serial["pack_plan"]
+
+
+def test_process_pool_profiles_are_merged_into_the_caller():
+    hooks = ProfilingCollector()
+    try:
+        counts = batch_counts(hooks, mixed_patients(), workers=2)
+        assert counts["batch_scale"] == len(chunk_bounds(len(mixed_patients()), 2))
+        assert "daily_values" in hooks.profile_stats(limit=None)
+        assert hooks.report()["batch_scale"]["peak_bytes"] > 0
+    finally:
+        hooks.stop()
+
+
+def test_census_pool_merges_worker_stats():
+    df = pd.DataFrame({"patient_id": ["a", "b", "c", "d"], "age": [40, 50, 60, 70], "height": [160, 170, 180, 190],
+                       "weight": [60, 70, 80, 90], "gender": ["M", "F", "M", "F"]})
+    hooks = StatsCollector()
+    planner = BatchPlanner(3, hooks=hooks)
+    with planner.process_pool(2) as pool:
+        plan_frame_pool(pool, df, 2, chunk_size=2, hooks=hooks)
+    assert hooks.report()["batch_scale"]["count"] == 2
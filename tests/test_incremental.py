@@ -0,0 +1,96 @@
+import copy
+import random
+import numpy as np
+from modules.conditions.registry import ADULT_CONDITIONS, CHILD_CONDITIONS
+from modules.patients.adult_patient import AdultPatient
+from modules.patients.child_patient import ChildPatient
+from modules.patients.preterm_infant_patient import PretermInfantPatient
+from modules.patients.term_infant_patient import TermInfantPatient
+from modules.planner.incremental import IncrementalPlanner
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+
+def assert_same_plan(incremental: IncrementalPlanner, patient):
+    planner = TpnPlanner(patient, incremental.total_days)
+    expected, actual = planner.generate_daily_plan(), incremental.generate_daily_plan()
+    assert expected.index.equals(actual.index)
+    assert expected.columns.equals(actual.columns)
+    assert np.array_equal(expected.to_numpy(), actual.to_numpy(), equal_nan=True)
+    assert planner.notes == incremental.notes
+    packed = planner.packed
+    units = dict(zip(zip(packed.categories, packed.nutrients), zip(packed.units, packed.per)))
+    assert {row: (state.packed.units[0], state.packed.per[0]) for row, state in incremental.rows.items()} == units
+
+
+def test_random_updates_match_tpn_planner():
+    rng = random.Random(3)
+    conditions = list(ADULT_CONDITIONS.values())
+    for _ in range(10):
+        active = {condition: True for condition in rng.sample(conditions, rng.randint(0, 3))}
+        patient = AdultPatient("a", 50, 170, 70, True, dict(active))
+        incremental = IncrementalPlanner(patient, 7)
+        assert_same_plan(incremental, patient)
+        for _ in range(8):
+            r = rng.random()
+            if r < 0.4:
+                condition = rng.choice(conditions)
+                active[condition] = not active.get(condition, False)
+                incremental.set_condition(condition, active[condition])
+            elif r < 0.8:
+                weight, height = rng.uniform(40, 130), rng.choice([160, 170, 185])
+                incremental.update(weight=weight, height=height)
+            else:
+                incremental.update(total_days=rng.randint(1, 12))
+            patient = AdultPatient("a", 50, incremental.patient.height, incremental.patient.weight, True, dict(active))
+            assert_same_plan(incremental, patient)
+
+
+def test_rebuilt_rows_use_new_reference_weight():
+    # One update that both rebuilds rows (condition toggle) and changes the reference weight
+    sepsis, aki = ADULT_CONDITIONS["sepsis"], ADULT_CONDITIONS["aki_crrt"]
+    incremental = IncrementalPlanner(AdultPatient("a", 50, 170, 70, True, {sepsis: True}), 7)
+    incremental.update(height=185, weight=90, conditions={sepsis: False, aki: True})
+    assert incremental.recomputed
+    assert_same_plan(incremental, AdultPatient("a", 50, 185, 90, True, {aki: True}))
+
+
+def test_child_bracket_changes():
+    conditions = {CHILD_CONDITIONS["critically_ill"]: True}
+    incremental = IncrementalPlanner(ChildPatient("c", 3, 100, 15, True, conditions=dict(conditions)), 7)
+    for age, weight in [(0.5, 8), (11, 45), (15, 60), (3, 15)]:
+        incremental.update(age=age, weight=weight)
+        assert_same_plan(incremental, ChildPatient("c", age, 100, weight, True, conditions=dict(conditions)))
+
+
+def test_child_weight_change_within_bracket_rebuilds_nothing():
+    conditions = {CHILD_CONDITIONS["critically_ill"]: False}
+    incremental = IncrementalPlanner(ChildPatient("c", 3, 100, 15, True, conditions=dict(conditions)), 7)
+    incremental.update(weight=16)
+    assert incremental.recomputed == set()
+    assert_same_plan(incremental, ChildPatient("c", 3, 100, 16, True, conditions=dict(conditions)))
+
+
+def test_preterm_age_changes():
+    incremental = IncrementalPlanner(PretermInfantPatient("p", 2, 40, 1.2, True, {}), 10)
+    for age in [3, 5, 27, 30]:
+        incremental.update(age=age)
+        assert_same_plan(incremental, PretermInfantPatient("p", age, 40, 1.2, True, {}))
+
+
+def test_term_infant_age_changes():
+    incremental = IncrementalPlanner(TermInfantPatient("t", 2, 55, 4.5, True, {}), 7)
+    for age in [3, 4, 6, 7, 27, 28, 40]:
+        incremental.update(age=age)
+        assert_same_plan(incremental, TermInfantPatient("t", age, 55, 4.5, True, {}))
+
+
+def test_mixed_population_updates_match_tpn_planner():
+    for patient in mixed_patients():
+        incremental = IncrementalPlanner(patient, 5)
+        assert_same_plan(incremental, patient)
+        changed = copy.copy(patient)
+        changed.age, changed.weight = patient.age + 1, patient.weight * 1.3
+        changed.__post_init__()
+        incremental.update(age=changed.age, weight=changed.weight, total_days=8)
+        assert_same_plan(incremental, changed)
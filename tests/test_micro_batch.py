@@ -0,0 +1,99 @@
+import asyncio
+import pandas as pd
+import pytest
+from modules.planner.batch_planner import BatchPlanner
+from modules.planner.micro_batch import MicroBatcher
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+TIMEOUT = 10
+
+
+def plan_all(batcher: MicroBatcher, requests):
+    """Submit (patient, total_days) requests concurrently and gather their results (or exceptions)."""
+    async def main():
+        async with batcher:
+            tasks = [batcher.plan(patient, total_days) for patient, total_days in requests]
+            return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), TIMEOUT)
+
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_match_tpn_planner():
+    patients = mixed_patients()
+    batcher = MicroBatcher(window=0.05)
+    results = plan_all(batcher, [(patient, 5) for patient in patients])
+    for patient, result in zip(patients, results):
+        planner = TpnPlanner(patient, 5)
+        pd.testing.assert_frame_equal(result.frame(), planner.generate_daily_plan())
+        assert result.notes == tuple(planner.notes)
+    assert batcher.stats()["batches"] == 1
+
+
+def test_batches_hold_at_most_max_batch_requests():
+    batcher = MicroBatcher(window=0.05, max_batch=3)
+    results = plan_all(batcher, [(patient, 3) for patient in mixed_patients()])
+    assert list(batcher._batch_sizes) == [3, 3, 2]
+    assert [result.index for result in results] == [0, 1, 2, 0, 1, 2, 0, 1]
+
+
+def test_requests_outside_the_window_form_their_own_batches():
+    batcher = MicroBatcher(window=0)
+
+    async def main():
+        async with batcher:
+            for patient in mixed_patients()[:3]:
+                await asyncio.wait_for(batcher.plan(patient, 3), TIMEOUT)
+
+    asyncio.run(main())
+    assert list(batcher._batch_sizes) == [1, 1, 1]
+
+
+def test_one_batch_is_planned_per_total_days():
+    patients = mixed_patients()
+    requests = [(patient, 3 if i % 2 else 6) for i, patient in enumerate(patients)]
+    batcher = MicroBatcher(window=0.05)
+    results = plan_all(batcher, requests)
+    assert batcher.stats()["batches"] == 1
+    assert sorted(batcher._planners) == [3, 6]
+    for (patient, total_days), result in zip(requests, results):
+        pd.testing.assert_frame_equal(result.frame(), TpnPlanner(patient, total_days).generate_daily_plan())
+
+
+def test_a_failing_group_fails_only_its_own_requests(monkeypatch):
+    plan_serial = BatchPlanner.plan_serial
+
+    def fail_long_plans(self, patients):
+        if self.total_days > 5:
+            raise ValueError("planning failed")
+        return plan_serial(self, patients)
+
+    monkeypatch.setattr(BatchPlanner, "plan_serial", fail_long_plans)
+    patients = mixed_patients()
+    batcher = MicroBatcher(window=0.05)
+    results = plan_all(batcher, [(patient, 7 if i < 3 else 3) for i, patient in enumerate(patients)])
+    assert all(isinstance(result, ValueError) for result in results[:3])
+    for patient, result in zip(patients[3:], results[3:]):
+        pd.testing.assert_frame_equal(result.frame(), TpnPlanner(patient, 3).generate_daily_plan())
+    stats = batcher.stats()
+    assert (stats["completed"], stats["failed"]) == (len(patients) - 3, 3)
+
+
+def test_plan_requires_a_started_batcher():
+    with pytest.raises(RuntimeError, match="not started"):
+        asyncio.run(MicroBatcher().plan(mixed_patients()[0]))
+
+
+def test_stats_report_latency_percentiles_and_batch_sizes():
+    batcher = MicroBatcher(window=0.05, max_batch=4)
+    plan_all(batcher, [(patient, 3) for patient in mixed_patients()])
+    stats = batcher.stats()
+    assert stats["completed"] == 8
+    assert stats["batches"] == 2
+    assert stats["mean_batch_size"] == 4
+    assert 0 < stats["p50_s"] <= stats["p99_s"]
+    assert stats["throughput_per_s"] > 0
+    assert (stats["window_s"], stats["max_batch"]) == (0.05, 4)
+    batcher.reset_stats()
+    assert batcher.stats()["completed"] == 0
+    assert batcher.stats()["p99_s"] == 0.0
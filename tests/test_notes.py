@@ -0,0 +1,62 @@
+from modules.conditions.registry import ADULT_CONDITIONS
+from modules.nutrient_plan import NutrientPlan
+from modules.patients.adult_patient import AdultPatient
+from modules.planner.batch_planner import BatchPlanner, concat_batches
+from modules.planner.notes import PlanNote, format_notes, plan_notes
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+
+def test_plan_notes_keep_plan_order_and_skip_unnoted_nutrients():
+    plan = {
+        "macro": {
+            "energy": NutrientPlan("kcal", "kg", notes="individualize", guidelines=["ESPEN 2018", "ASPEN 2020"]),
+            "fluid": NutrientPlan("ml", "kg", [30, 40]),
+        },
+        "electrolyte": {
+            "sodium": NutrientPlan("mmol", "kg", notes="watch overload", guidelines="ESPGHAN"),
+            "potassium": NutrientPlan("mmol", "kg", notes="check levels"),
+        },
+    }
+    assert plan_notes(plan) == (
+        PlanNote("macro", "energy", "ESPEN 2018, ASPEN 2020", "individualize"),
+        PlanNote("electrolyte", "sodium", "ESPGHAN", "watch overload"),
+        PlanNote("electrolyte", "potassium", None, "check levels"),
+    )
+
+
+def test_notes_are_formatted_on_request():
+    note = PlanNote("macro", "energy", "ESPEN 2018", "individualize")
+    assert note.format() == str(note) == "macro - energy: individualize"
+    assert format_notes([note, note]) == [note.format()] * 2
+    assert format_notes([]) == []
+
+
+def test_planning_does_not_print(capsys):
+    for patient in mixed_patients():
+        planner = TpnPlanner(patient, 3)
+        planner.generate_daily_plan()
+    assert capsys.readouterr().out == ""
+
+
+def test_condition_notes_are_not_repeated():
+    # Open abdomen adds the same exudate note the adult base plan already carries
+    patient = AdultPatient("a", 50, 170, 70, True, {ADULT_CONDITIONS["open_abdomen"]: True})
+    planner = TpnPlanner(patient, 3)
+    planner.generate_daily_plan()
+    texts = [note.text for note in planner.notes if note.nutrient == "protein_amino_acids"]
+    assert texts == ["Additional 15–30 g/L exudate"]
+
+
+def test_batches_share_one_note_set_per_distinct_plan():
+    patients = mixed_patients()
+    twins = patients + [AdultPatient("twin", 54, 172, 90, True, dict(patients[0].conditions))]
+    batch = BatchPlanner(3).plan_serial(twins)
+    assert batch.notes(len(twins) - 1) is batch.notes(0)
+    assert len(batch.note_sets) == len(set(batch.note_sets))
+    merged = concat_batches([batch, BatchPlanner(3).plan_serial(patients)])
+    assert len(merged.note_sets) == len(batch.note_sets)
+    for i, patient in enumerate(patients):
+        planner = TpnPlanner(patient, 3)
+        planner.generate_daily_plan()
+        assert merged.notes(len(twins) + i) == tuple(planner.notes)
@@ -0,0 +1,44 @@
+from modules.nutrient_plan import FrozenNutrientPlan, NutrientPlan
+from modules.nutrient_plan_table import NutrientPlanTable
+from tests.helpers import mixed_patients
+
+
+def without_empty_categories(plan):
+    return {category: nutrients for category, nutrients in plan.items() if nutrients}
+
+
+def test_base_plans_round_trip():
+    plans = [patient.get_base_plan() for patient in mixed_patients()]
+    table = NutrientPlanTable.from_plans(plans)
+    assert len(table) == sum(len(nutrients) for plan in plans for nutrients in plan.values())
+    assert table.to_plans() == plans
+
+
+def test_ragged_daily_ranges_and_empty_categories_round_trip():
+    plans = [
+        {
+            "macro": {
+                "fluid": NutrientPlan("ml", "kg", daily_intake_range=[[80, 100], [100, 120], [120, 140]], guidelines=["ESPGHAN"]),
+                "sodium": NutrientPlan("mmol", "kg", daily_intake_range=[[0, 3]]),
+                "energy": NutrientPlan("kcal", "kg", [40, 60], [90, 120], 4, notes="ramp"),
+                "empty_schedule": NutrientPlan("g", "kg", daily_intake_range=[]),
+                "open_range": NutrientPlan("g", "kg", goal_range=[None, 5]),
+            },
+            "vitamins": {},
+        },
+        {},
+        {"electrolyte": {"potassium": NutrientPlan("mmol", "kg", daily_intake_range=[[0, 0], [1, 2], [2, 3], [2, 3], [2, 3]])}},
+        {},
+    ]
+    table = NutrientPlanTable.from_plans(plans)
+    assert table.daily_offsets.tolist() == [0, 3, 4, 4, 4, 4, 9]
+    assert table.has_daily.tolist() == [True, True, False, True, False, True]
+    assert [without_empty_categories(plan) for plan in table.to_plans()] == [without_empty_categories(plan) for plan in plans]
+
+
+def test_rows_are_frozen_and_interned():
+    table = NutrientPlanTable.from_plans([patient.get_base_plan() for patient in mixed_patients()[:2]])
+    row = table.row(0)
+    assert isinstance(row, FrozenNutrientPlan)
+    assert row == FrozenNutrientPlan.from_plan(row.to_plan())
+    assert table.strings.count(row.measurement_unit) == 1
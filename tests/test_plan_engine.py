@@ -0,0 +1,63 @@
+import dataclasses
+import numpy as np
+import pandas as pd
+import pytest
+from modules.nutrient_plan import NutrientPlan
+from modules.planner import plan_engine
+from tests.helpers import mixed_patients
+
+
+def interpolate(start, end, days):
+    """TpnPlanner.interpolate before the vectorized engine replaced it."""
+    if start is None and end is None:
+        return [None] * days
+    if days <= 1:
+        return [round(end, 3) if end is not None else None]
+    if start is None:
+        return [round(end, 3)] * days
+    if end is None:
+        return [round(start, 3)] * days
+    step = (end - start) / (days - 1)
+    return [round(start + i * step, 3) for i in range(days)]
+
+
+def per_day_plan(plan_dict, total_days):
+    """The record-per-day loop and pivot_table generate_daily_plan used before the vectorized engine."""
+    records = []
+    for category, nutrients in plan_dict.items():
+        for nutrient, plan in nutrients.items():
+            start = plan_engine.midpoint(plan.initial_range)
+            goal = plan_engine.midpoint(plan.goal_range) or start
+            for day, value in enumerate(interpolate(start, goal, total_days), start=1):
+                records.append({"Day": day, "Category": category, "Nutrient": nutrient, "Value": value})
+    return pd.DataFrame(records).pivot_table(index=["Category", "Nutrient"], columns="Day", values="Value")
+
+
+def linear_plan(plan_dict):
+    """plan_dict without days_to_goal and daily_intake_range, the schedules the old loop did not know."""
+    return {category: {nutrient: dataclasses.replace(plan, days_to_goal=None, daily_intake_range=None)
+                       for nutrient, plan in nutrients.items()}
+            for category, nutrients in plan_dict.items()}
+
+
+@pytest.mark.parametrize("total_days", [1, 2, 7, 30])
+@pytest.mark.parametrize("patient", mixed_patients(), ids=lambda patient: patient.name)
+def test_vectorized_engine_matches_the_per_day_loop(patient, total_days):
+    plan = linear_plan(patient.get_base_plan())
+    packed = plan_engine.pack_plan(plan)
+    frame = plan_engine.to_frame(packed, plan_engine.daily_values(packed, total_days))
+    pd.testing.assert_frame_equal(frame, per_day_plan(plan, total_days), check_names=False)
+
+
+TIES = [0.0005, 0.0015, 0.0025, 1.0125, 2.675, 1.0005, -0.0015, -2.675, 1234.5675, 0.1235, 9.9995]
+
+
+def test_round3_rounds_ties_like_builtin_round():
+    assert plan_engine.round3(np.array(TIES)).tolist() == [round(value, 3) for value in TIES]
+
+
+@pytest.mark.parametrize("start, goal", [(0.0, 0.9), (1.0, 2.0), (2.5, 0.7)])
+def test_interpolated_ties_round_like_the_per_day_loop(start, goal):
+    days = 1801  # steps of a multiple of 0.0005 land on ties every other day
+    packed = plan_engine.pack_plan({"macro": {"energy": NutrientPlan("g", "kg", [start, start], [goal, goal])}})
+    assert plan_engine.daily_values(packed, days)[0].tolist() == interpolate(start, goal, days)
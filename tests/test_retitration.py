@@ -0,0 +1,94 @@
+import copy
+import pandas as pd
+import pytest
+from modules.conditions.registry import CHILD_CONDITIONS
+from modules.patients.child_patient import ChildPatient
+from modules.patients.preterm_infant_patient import PretermInfantPatient
+from modules.patients.term_infant_patient import TermInfantPatient
+from modules.planner.retitration import Observation, RetitrationPlanner
+from modules.planner.tpn_planner import TpnPlanner
+
+
+def child(weight: float):
+    return ChildPatient("c", 10, 140, weight, True, conditions={CHILD_CONDITIONS["critically_ill"]: False})
+
+
+def plan(patient, total_days: int) -> pd.DataFrame:
+    return TpnPlanner(copy.copy(patient), total_days).generate_daily_plan()
+
+
+def test_starts_from_the_planned_course():
+    patient = TermInfantPatient("t", 2, 55, 4.5, True, {})
+    retitration = RetitrationPlanner(TpnPlanner(patient, 10))
+    pd.testing.assert_frame_equal(retitration.frame(), plan(patient, 10))
+
+
+def test_full_delivery_changes_nothing():
+    patient = TermInfantPatient("t", 2, 55, 4.5, True, {})
+    retitration = RetitrationPlanner(TpnPlanner(patient, 10))
+    retitration.observe(Observation(day=2, delivered_volume=retitration.planned_volume(2)))
+    pd.testing.assert_frame_equal(retitration.frame(), plan(patient, 10))
+
+
+def test_under_delivery_restarts_ramps_from_the_delivered_level():
+    patient = TermInfantPatient("t", 2, 55, 4.5, True, {})
+    planned = plan(patient, 10)
+    retitration = RetitrationPlanner(TpnPlanner(patient, 10))
+    retitration.observe(Observation(day=2, delivered_volume=retitration.planned_volume(2) / 2))
+    revised = retitration.frame()
+    pd.testing.assert_frame_equal(revised[[1, 2]], planned[[1, 2]])
+    energy = revised.loc[("macro", "energy")]
+    assert energy[3] < planned.loc[("macro", "energy"), 3]
+    assert energy[10] == planned.loc[("macro", "energy"), 10]
+    # day-indexed fluid steps keep their schedule
+    pd.testing.assert_series_equal(revised.loc[("macro", "fluid")], planned.loc[("macro", "fluid")])
+
+
+def test_days_must_move_forward():
+    retitration = RetitrationPlanner(TpnPlanner(child(20), 5))
+    retitration.observe(Observation(day=2))
+    with pytest.raises(ValueError):
+        retitration.observe(Observation(day=2))
+    with pytest.raises(ValueError):
+        retitration.observe(Observation(day=6))
+
+
+def assert_replanned(retitration, before, after, day, total_days):
+    revised = retitration.frame()
+    old, new = plan(before, total_days), plan(after, total_days)
+    history, remaining = list(range(1, day + 1)), list(range(day + 1, total_days + 1))
+    pd.testing.assert_frame_equal(revised[remaining].dropna(how="all"), new[remaining])
+    shared = old.index.intersection(revised.index)
+    pd.testing.assert_frame_equal(revised.loc[shared, history], old.loc[shared, history])
+
+
+def test_weight_within_bracket_rescales_remaining_days():
+    retitration = RetitrationPlanner(TpnPlanner(child(20), 7))
+    retitration.observe(Observation(day=3, weight=22))
+    assert retitration.base_key == child(22).base_plan_key() == child(20).base_plan_key()
+    assert_replanned(retitration, child(20), child(22), 3, 7)
+
+
+@pytest.mark.parametrize("before, after", [
+    (child(38), child(42)),
+    (PretermInfantPatient("p", 10, 38, 0.9, True, {}), PretermInfantPatient("p", 10, 38, 1.2, True, {})),
+    (PretermInfantPatient("p", 10, 40, 1.4, True, {}), PretermInfantPatient("p", 10, 40, 1.6, True, {})),
+])
+def test_weight_across_a_bracket_replans_from_the_new_base_plan(before, after):
+    assert before.base_plan_key() != after.base_plan_key()
+    retitration = RetitrationPlanner(TpnPlanner(copy.copy(before), 8))
+    retitration.observe(Observation(day=3, weight=after.weight))
+    assert retitration.base_key == after.base_plan_key()
+    assert_replanned(retitration, before, after, 3, 8)
+
+
+def test_under_delivery_after_a_bracket_change_restarts_from_what_was_delivered():
+    before = PretermInfantPatient("p", 10, 38, 0.9, True, {})
+    after = PretermInfantPatient("p", 10, 38, 1.2, True, {})
+    retitration = RetitrationPlanner(TpnPlanner(copy.copy(before), 8))
+    retitration.observe(Observation(day=2, weight=1.2, delivered_volume=retitration.planned_volume(2) / 2))
+    revised, old, new = retitration.frame(), plan(before, 8), plan(after, 8)
+    energy = ("macro", "energy")
+    assert revised.loc[energy, 2] == old.loc[energy, 2]
+    assert revised.loc[energy, 3] < new.loc[energy, 3]
+    assert revised.loc[energy, 8] == new.loc[energy, 8]
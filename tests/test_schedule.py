@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from modules.planner.schedule import schedule_indices, schedule_values
+
+
+def baseline(start, goal, days_to_goal, steps, total_days):
+    """The per-nutrient, per-day loop the schedule arrays replace."""
+    if steps:
+        return [steps[min(day, len(steps) - 1)] for day in range(total_days)]
+    length = days_to_goal if days_to_goal > 0 else total_days - 1
+    if length <= 0:
+        return [goal] * total_days
+    return [start + min(day, length) * (goal - start) / length for day in range(total_days)]
+
+
+def schedules(total_days):
+    """(start, goal, days_to_goal, steps) rows: ramps and steps shorter than, as long as and longer than the plan."""
+    return [
+        (1.0, 3.0, 0, []),
+        (1.0, 3.0, 1, []),
+        (1.0, 3.0, 4, []),
+        (1.0, 3.0, total_days, []),
+        (1.0, 3.0, total_days + 5, []),
+        (2.0, 2.0, 4, []),
+        (0.0, 0.0, 0, [80.0]),
+        (0.0, 0.0, 0, [80.0, 100.0, 120.0]),
+        (0.0, 0.0, 0, [float(v) for v in range(total_days)]),
+        (0.0, 0.0, 0, [float(v) for v in range(total_days + 5)]),
+    ]
+
+
+def packed(rows):
+    width = max(len(steps) for *_, steps in rows)
+    return dict(
+        start=np.array([row[0] for row in rows]),
+        goal=np.array([row[1] for row in rows]),
+        days_to_goal=np.array([row[2] for row in rows]),
+        steps=np.array([steps + [np.nan] * (width - len(steps)) for *_, steps in rows]),
+        step_counts=np.array([len(row[3]) for row in rows]),
+    )
+
+
+@pytest.mark.parametrize("total_days", [1, 2, 4, 7, 90])
+def test_schedules_match_the_per_day_loop(total_days):
+    rows = schedules(total_days)
+    values = schedule_values(**packed(rows), total_days=total_days)
+    expected = np.array([baseline(*row, total_days) for row in rows])
+    np.testing.assert_allclose(values, expected)
+
+
+def test_ramps_plateau_at_their_goal():
+    values = schedule_values(**packed(schedules(7)), total_days=7)
+    assert values[1].tolist() == [1, 3, 3, 3, 3, 3, 3]  # days_to_goal = 1
+    assert values[3][-1] < 3  # days_to_goal = total_days: the goal is one day past the plan
+    assert values[4][-1] < values[3][-1]
+
+
+@pytest.mark.parametrize("total_days", [1, 7, 30])
+def test_streamed_days_match_the_whole_plan(total_days):
+    arrays = packed(schedules(total_days))
+    whole = schedule_values(**arrays, total_days=total_days)
+    for first in range(0, total_days, 3):
+        days = np.arange(first, min(first + 3, total_days))
+        np.testing.assert_array_equal(schedule_values(**arrays, total_days=total_days, days=days), whole[:, days])
+
+
+def test_index_matrices_are_shared_and_read_only():
+    first = schedule_indices((4, 0), (0, 3), 10)
+    assert schedule_indices((4, 0), (0, 3), 10) is first
+    for array in first:
+        assert not array.flags.writeable
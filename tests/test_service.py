@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import pytest
+from modules.conditions.registry import ADULT_CONDITIONS
+from modules.patients.adult_patient import AdultPatient
+from modules.planner import service
+from modules.planner.service import PlanningClient, PlanningService, ServiceBusy, compute_plan
+
+TIMEOUT = 10
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Holds every computation until gate.set(), so requests pile up behind the first ones."""
+    event = threading.Event()
+
+    def gated_compute_plan(patient, total_days):
+        assert event.wait(TIMEOUT)
+        return compute_plan(patient, total_days)
+
+    monkeypatch.setattr(service, "compute_plan", gated_compute_plan)
+    yield event
+    event.set()
+
+
+def patient(height: float = 170, sepsis: bool = False):
+    # Adults share a plan per dosing weight (IBW, from height), so height tells requests apart
+    return AdultPatient("a", 50, height, 70, True, {ADULT_CONDITIONS["sepsis"]: sepsis})
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+def test_identical_concurrent_requests_share_one_computation(gate):
+    async def main():
+        async with PlanningService(concurrency=2) as planning:
+            tasks = [asyncio.create_task(planning.plan(patient(sepsis=True), 5)) for _ in range(10)]
+            tasks.append(asyncio.create_task(planning.plan(patient(height=185), 5)))
+            await settle()
+            gate.set()
+            results = await asyncio.wait_for(asyncio.gather(*tasks), TIMEOUT)
+            return planning.stats(), results
+
+    stats, results = asyncio.run(main())
+    assert stats["computed"] == 2
+    assert stats["coalesced"] == 9
+    assert stats["in_flight"] == 0
+    expected, notes = compute_plan(patient(sepsis=True), 5)
+    for result in results[:10]:
+        assert result.frame.equals(expected)
+        assert result.notes == notes
+    # every caller gets its own copy of the shared frame
+    assert len({id(result.frame) for result in results}) == len(results)
+
+
+def test_full_queue_rejects_callers_that_do_not_wait(gate):
+    async def main():
+        async with PlanningService(max_pending=1, concurrency=1) as planning:
+            first = asyncio.create_task(planning.plan(patient(160)))
+            await settle()  # taken by the worker, which is now held by the gate
+            queued = asyncio.create_task(planning.plan(patient(161)))
+            await settle()
+            with pytest.raises(ServiceBusy):
+                await planning.plan(patient(162), wait=False)
+            gate.set()
+            await asyncio.wait_for(asyncio.gather(first, queued), TIMEOUT)
+            return planning.stats()
+
+    stats = asyncio.run(main())
+    assert stats["rejected"] == 1
+    assert stats["computed"] == 2
+
+
+def test_cancelled_caller_blocked_on_backpressure_strands_nobody(gate):
+    async def main():
+        async with PlanningService(max_pending=1, concurrency=1) as planning:
+            running = asyncio.create_task(planning.plan(patient(160)))
+            await settle()
+            queued = asyncio.create_task(planning.plan(patient(161)))
+            await settle()
+            # Both wait for room in the queue; the first one is then cancelled
+            cancelled = asyncio.create_task(planning.plan(patient(180, sepsis=True)))
+            await settle()
+            same = asyncio.create_task(planning.plan(patient(180, sepsis=True)))
+            await settle()
+            cancelled.cancel()
+            await settle()
+            gate.set()
+            result = await asyncio.wait_for(same, TIMEOUT)
+            await asyncio.wait_for(asyncio.gather(running, queued), TIMEOUT)
+            assert cancelled.cancelled()
+            return result, planning.stats()
+
+    result, stats = asyncio.run(main())
+    assert result.frame.equals(compute_plan(patient(180, sepsis=True), 7)[0])
+    assert stats["in_flight"] == 0
+    assert stats["pending"] == 0
+
+
+def test_failed_computation_reaches_every_coalesced_caller(monkeypatch):
+    def failing_compute_plan(patient, total_days):
+        raise RuntimeError("planning failed")
+
+    monkeypatch.setattr(service, "compute_plan", failing_compute_plan)
+
+    async def main():
+        async with PlanningService() as planning:
+            return await asyncio.wait_for(
+                asyncio.gather(*(planning.plan(patient()) for _ in range(3)), return_exceptions=True), TIMEOUT)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_client_plans_requests_and_reports_errors():
+    request = {"patient_id": "A1", "age": 54, "height": 172, "weight": 81, "gender": "M", "conditions": ["sepsis"],
+               "days": 3}
+
+    async def main():
+        async with PlanningService() as planning:
+            return await PlanningClient(planning).plan_many([request, dict(request, patient_id="B2"),
+                                                            dict(request, patient_id="C3", population="elderly")])
+
+    ok, same, failed = asyncio.run(main())
+    frame, notes = compute_plan(service.patient_from_request(request), 3)
+    assert ok["days"] == 3 and len(ok["plan"]) == len(frame)
+    assert ok["plan"]["macro.energy"] == frame.loc[("macro", "energy")].tolist()
+    assert same["plan"] == ok["plan"] and same["patient_id"] == "B2"
+    assert "unknown population" in failed["error"]
@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+from modules.planner.tpn_planner import TpnPlanner
+from tests.helpers import mixed_patients
+
+
+@pytest.mark.parametrize("patient", mixed_patients(), ids=lambda patient: patient.name)
+@pytest.mark.parametrize("total_days, chunk_days", [(1, 1), (7, 1), (7, 3), (30, 7), (10, 50)])
+def test_streamed_days_concatenate_to_the_daily_plan(patient, total_days, chunk_days):
+    expected = TpnPlanner(patient, total_days).generate_daily_plan()
+    chunks = list(TpnPlanner(patient, total_days).iter_daily_plan(chunk_days))
+    assert [chunk.shape[1] for chunk in chunks[:-1]] == [chunk_days] * (len(chunks) - 1)
+    assert len(chunks) == -(-total_days // chunk_days)
+    pd.testing.assert_frame_equal(pd.concat(chunks, axis=1), expected)
+
+
+def test_streaming_collects_the_same_notes():
+    patient = mixed_patients()[2]
+    planner, streamed = TpnPlanner(patient, 5), TpnPlanner(patient, 5)
+    planner.generate_daily_plan()
+    for _ in streamed.iter_daily_plan():
+        pass
+    assert streamed.notes == planner.notes
@@ -0,0 +1,70 @@
+import os
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+from modules import guidelines
+from modules.nutrient_plan import NutrientPlan
+from modules.patients.adult_patient import AdultPatient
+
+UI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "UI.py")
+
+
+def worksheet() -> AppTest:
+    app = AppTest.from_file(UI, default_timeout=60).run()
+    assert not app.exception
+    return app
+
+
+def calculate(app: AppTest) -> AppTest:
+    app.button[0].click().run()
+    assert not app.exception
+    return app
+
+
+def test_rendered_rows_are_kept_per_session():
+    first = calculate(worksheet())
+    assert first.session_state["rendered_rows"]
+    second = worksheet()
+    assert "rendered_rows" not in second.session_state
+    calculate(second)
+    assert second.session_state["rendered_rows"] is not first.session_state["rendered_rows"]
+
+
+def test_changing_a_plan_input_clears_results_until_recalculated():
+    app = calculate(worksheet())
+    assert len(app.success) == 1
+    app.checkbox(key="ventilator").check().run()  # not a plan input
+    assert len(app.success) == 1
+    app.checkbox(key="sepsis").check().run()
+    assert len(app.success) == 0
+    assert "Inputs changed" in app.info[0].value
+    app.number_input(key="weight").set_value(80.0).run()
+    assert len(app.success) == 0 and len(app.info) == 0
+    calculate(app)
+    assert len(app.success) == 1
+
+
+def results_table(app: AppTest) -> str:
+    return next(block.value for block in app.markdown if "results-table" in block.value and "<tr>" in block.value)
+
+
+def test_cached_results_follow_guideline_changes(monkeypatch):
+    app = calculate(worksheet())
+    before = results_table(app)
+    base_plan = AdultPatient.get_base_plan
+
+    def edited_base_plan(self):
+        plan = base_plan(self)
+        plan["macro"]["energy"] = NutrientPlan("kcal", "kg", [1, 1], [1, 1], 0)
+        return plan
+
+    monkeypatch.setattr(AdultPatient, "get_base_plan", edited_base_plan)
+    guidelines.invalidate()
+    try:
+        app.run()
+        assert not app.exception
+        assert results_table(app) != before
+    finally:
+        monkeypatch.undo()
+        guidelines.invalidate()
@@ -0,0 +1,45 @@
+import pytest
+from modules.units import MINUTES_PER_DAY, UnitConversion, conversion_factor, resolve
+
+
+def test_per_kg_becomes_per_day_by_weight():
+    assert resolve("g", "kg", "amino_acids") == UnitConversion("g", "day", 1.0, True)
+    assert resolve("mL", "kg", "fluid") == UnitConversion("mL", "day", 1.0, True)
+
+
+def test_per_kg_per_minute_is_scaled_to_a_day():
+    assert resolve("mg", "kg/min", "dextrose") == UnitConversion("mg", "day", float(MINUTES_PER_DAY), True)
+    assert MINUTES_PER_DAY == 1440
+
+
+def test_per_day_is_unchanged():
+    assert resolve("mg", "day", "zinc") == UnitConversion("mg", "day", 1.0, False)
+
+
+@pytest.mark.parametrize("nutrient, factor", [("sodium", 1.0), ("potassium", 1.0), ("chloride", 1.0),
+                                              ("calcium", 0.5), ("magnesium", 0.5)])
+def test_milliequivalents_become_millimoles_by_valence(nutrient, factor):
+    assert resolve("mEq", "day", nutrient) == UnitConversion("mmol", "day", factor, False)
+    assert resolve("mEq", "kg", nutrient) == UnitConversion("mmol", "day", factor, True)
+
+
+def test_milliequivalents_of_unknown_ions_are_kept():
+    assert resolve("mEq", "kg", "bicarbonate") == UnitConversion("mEq", "day", 1.0, True)
+
+
+@pytest.mark.parametrize("unit", ["mcg", "ug", "µg"])
+def test_micrograms_are_spelled_one_way(unit):
+    assert resolve(unit, "day", "selenium") == UnitConversion("µg", "day", 1.0, False)
+    assert resolve(unit, "kg", "selenium") == UnitConversion("µg", "day", 1.0, True)
+
+
+def test_unknown_reference_unit_is_left_alone():
+    assert resolve("kcal", "g", "ratio") == UnitConversion("kcal", "g", 1.0, False)
+
+
+def test_mass_conversion_factors():
+    assert conversion_factor("µg", "mg") == pytest.approx(1e-3)
+    assert conversion_factor("mcg", "g") == pytest.approx(1e-6)
+    assert conversion_factor("g", "mg") == pytest.approx(1e3)
+    with pytest.raises(ValueError):
+        conversion_factor("mg", "mL")